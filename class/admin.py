@@ -1,3 +1,59 @@
 from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.forms.models import BaseInlineFormSet
 
-# Register your models here.
+from . import groups, membership
+from .models import Group, GroupMembership
+
+
+class GroupMembershipFormSet(BaseInlineFormSet):
+    def clean(self):
+        super().clean()
+        if any(self.errors) or self.instance.class_ref_id is None:
+            return
+        # The same rules as joins: seats and one group per class
+        students = [
+            form.cleaned_data['student'].pk
+            for form in self.forms
+            if form.cleaned_data.get('student') and not form.cleaned_data.get('DELETE')
+        ]
+        try:
+            groups.check_members(self.instance, students)
+        except groups.GroupError as e:
+            raise ValidationError(str(e))
+
+
+class GroupMembershipInline(admin.TabularInline):
+    model = GroupMembership
+    formset = GroupMembershipFormSet
+    fields = ['student']
+    raw_id_fields = ['student']
+    extra = 0
+
+
+@admin.register(Group)
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ['name', 'class_ref', 'student_count', 'max_students', 'pending_count']
+    list_select_related = ['class_ref']
+    readonly_fields = ['student_count', 'pending_count']
+    raw_id_fields = ['class_ref', 'creator', 'pending_approvals']
+    inlines = [GroupMembershipInline]
+
+    def save_formset(self, request, form, formset, change):
+        memberships = formset.save(commit=False)
+        for group_membership in formset.deleted_objects:
+            group_membership.delete()
+        # Copied from the group, see GroupMembership.class_ref; the group's class may have changed too
+        moved = GroupMembership.objects.filter(group=form.instance).exclude(class_ref_id=form.instance.class_ref_id)
+        # Every member moved with the group, not only the rows on the form, has stale cached memberships
+        moved_ids = list(moved.values_list('student_id', flat=True))
+        moved.update(class_ref_id=form.instance.class_ref_id)
+        for group_membership in memberships:
+            group_membership.class_ref_id = form.instance.class_ref_id
+            group_membership.save()
+        membership.invalidate(*moved_ids, *[m.student_id for m in [*memberships, *formset.deleted_objects]])
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Members and join requests may have changed; bring the counters back in step
+        groups.recount(Group.objects.filter(pk=form.instance.pk))
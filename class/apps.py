@@ -5,4 +5,7 @@ class ClassConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'class'
 
+    def ready(self):
+        from . import signals  # noqa: F401
+
    
@@ -0,0 +1,67 @@
+"""
+Home page summaries.
+
+Each summary covers all of the user's classes at once: every figure comes
+from a grouped aggregate, a subquery or a prefetch covering all of them, so
+the number of queries does not depend on how many classes, groups or
+students there are.
+"""
+from django.db.models import Count, OuterRef, Prefetch, Subquery, Sum
+
+from .models import Class, Group, PurchaseRequest, Wallet
+
+
+def _by_class(queryset, **aggregates):
+    """{class id: {name: value}} from one grouped query over `queryset`."""
+    return {row.pop('class_ref_id'): row for row in queryset.values('class_ref_id').annotate(**aggregates).order_by()}
+
+
+def teacher_dashboard(teacher):
+    """
+    One dict per class taught by `teacher`: id, name, class_code,
+    student_count, group_count, pending_join_count, pending_purchase_count
+    and total_balance.
+    """
+    classes = list(
+        Class.objects.filter(teacher=teacher).annotate(student_count=Count('students'))
+        .order_by('id').values('id', 'name', 'class_code', 'student_count')
+    )
+    if not classes:
+        return []
+    class_ids = [row['id'] for row in classes]
+
+    # Group.pending_count is kept up to date by groups.py, so join requests need no join
+    groups = _by_class(Group.objects.filter(class_ref_id__in=class_ids), group_count=Count('pk'), pending=Sum('pending_count'))
+    purchases = _by_class(PurchaseRequest.objects.filter(class_ref_id__in=class_ids, status='pending'), pending=Count('pk'))
+    wallets = _by_class(Wallet.objects.filter(class_ref_id__in=class_ids), total=Sum('balance'))
+
+    for row in classes:
+        class_groups = groups.get(row['id'], {})
+        row['group_count'] = class_groups.get('group_count', 0)
+        row['pending_join_count'] = class_groups.get('pending') or 0
+        row['pending_purchase_count'] = purchases.get(row['id'], {}).get('pending', 0)
+        row['total_balance'] = wallets.get(row['id'], {}).get('total') or 0
+    return classes
+
+
+def student_home(student):
+    """
+    The classes `student` is enrolled in, each annotated with `balance` (None
+    without a wallet) and `item_count`, and with `my_groups` (the student's
+    group, if any) and `my_pending_purchases` prefetched. Three queries.
+    """
+    balance = Wallet.objects.filter(owner=student, class_ref_id=OuterRef('pk')).values('balance')
+    return (
+        Class.objects.filter(students=student)
+        .select_related('teacher')
+        .annotate(balance=Subquery(balance), item_count=Count('class_items'))
+        .prefetch_related(
+            Prefetch('groups', queryset=Group.objects.filter(students=student).only('id', 'name', 'class_ref_id'), to_attr='my_groups'),
+            Prefetch(
+                'purchaserequest_set',
+                queryset=PurchaseRequest.objects.filter(student=student, status='pending').select_related('item').order_by('requested_at'),
+                to_attr='my_pending_purchases',
+            ),
+        )
+        .order_by('id')
+    )
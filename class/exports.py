@@ -0,0 +1,125 @@
+"""
+Streaming exports of a class's ledger, purchase requests and roster.
+
+Rows are read with `values_list(...).iterator(chunk_size=...)`, a server-side
+cursor on PostgreSQL, and encoded one chunk at a time, so memory use does not
+grow with the size of the export. The header (CSV) is produced before the
+query runs, so the first byte goes out straight away. With `compress`, the
+output is gzipped on the fly and flushed after every chunk.
+"""
+import csv
+import datetime
+import zlib
+from io import StringIO
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import OuterRef, Subquery
+
+from users.models import CustomUser
+from .models import GroupMembership, PurchaseRequest, Transaction, Wallet
+
+CHUNK_SIZE = 2000
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+FORMATS = [CSV, NDJSON]
+
+CONTENT_TYPES = {CSV: 'text/csv', NDJSON: 'application/x-ndjson'}
+
+
+def transactions(class_id, since=None, until=None):
+    """Ledger entries of every wallet in the class, oldest first."""
+    queryset = Transaction.objects.filter(class_ref_id=class_id)
+    if since is not None:
+        queryset = queryset.filter(date__gte=since)
+    if until is not None:
+        queryset = queryset.filter(date__lt=until)
+    return queryset.order_by('date', 'pk').values_list(
+        'id', 'date', 'wallet__owner__email', 'transaction_type', 'amount', 'description',
+    )
+
+
+def purchases(class_id, since=None, until=None):
+    """Purchase requests of the class in every status, oldest first."""
+    queryset = PurchaseRequest.objects.filter(class_ref_id=class_id)
+    if since is not None:
+        queryset = queryset.filter(requested_at__gte=since)
+    if until is not None:
+        queryset = queryset.filter(requested_at__lt=until)
+    return queryset.order_by('requested_at', 'pk').values_list(
+        'id', 'requested_at', 'student__email', 'item__name', 'amount', 'status',
+    )
+
+
+def roster(class_id, since=None, until=None):
+    """Students of the class with their balance and group. The roster has no dates to filter on."""
+    balance = Wallet.objects.filter(owner_id=OuterRef('pk'), class_ref_id=class_id).values('balance')
+    group = GroupMembership.objects.filter(student_id=OuterRef('pk'), class_ref_id=class_id).values('group__name')
+    return (
+        CustomUser.objects.filter(joined_classes=class_id)
+        .annotate(balance=Subquery(balance), group=Subquery(group))
+        .order_by('pk')
+        .values_list('id', 'email', 'first_name', 'last_name', 'balance', 'group')
+    )
+
+
+# kind -> (queryset builder, column names in values_list order)
+KINDS = {
+    'transactions': (transactions, ['id', 'date', 'student', 'type', 'amount', 'description']),
+    'purchases': (purchases, ['id', 'requested_at', 'student', 'item', 'amount', 'status']),
+    'roster': (roster, ['id', 'email', 'first_name', 'last_name', 'balance', 'group']),
+}
+
+
+def content_type(file_format, compress=False):
+    return 'application/gzip' if compress else CONTENT_TYPES[file_format]
+
+
+def filename(kind, class_id, file_format, compress=False):
+    return f"class-{class_id}-{kind}.{file_format}" + ('.gz' if compress else '')
+
+
+def stream(kind, class_id, file_format=CSV, since=None, until=None, compress=False, chunk_size=CHUNK_SIZE):
+    """Yield the export as bytes, one piece per chunk of rows."""
+    build, columns = KINDS[kind]
+    rows = build(class_id, since, until).iterator(chunk_size=chunk_size)
+    encode = _csv_chunks if file_format == CSV else _ndjson_chunks
+    chunks = (text.encode('utf-8') for text in encode(columns, rows, chunk_size))
+    return _gzip(chunks) if compress else chunks
+
+
+def _batches(rows, size):
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _csv_chunks(columns, rows, chunk_size):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for batch in _batches(rows, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime.datetime) else value for value in row] for row in batch
+        )
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(columns, rows, chunk_size):
+    encoder = DjangoJSONEncoder()
+    for batch in _batches(rows, chunk_size):
+        yield ''.join(encoder.encode(dict(zip(columns, row))) + '\n' for row in batch)
+
+
+def _gzip(chunks):
+    # wbits=31 writes a gzip header and trailer rather than a bare zlib stream
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
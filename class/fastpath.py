@@ -0,0 +1,124 @@
+"""
+Read-only serialization fast path for the busiest list endpoints.
+
+Instantiating a ModelSerializer and walking its fields for every row costs
+more than the query behind a list. For the group list, the catalog and the
+purchase queue the rows are read with `.values()` instead and turned into
+plain dicts, each value formatted by the same field instance the serializer
+would use, so the response is byte for byte the same (test_fastpath.py
+compares the two). A change to one of the serializers below needs the same
+change to its ValuesList.
+
+?fields= is honoured by reading and rendering only the selected fields;
+?expand= asks for nested objects, which are left to the serializer.
+"""
+from functools import cached_property
+
+from django.db.models.fields.files import FieldFile
+from rest_framework import serializers
+
+from perksway import sparse
+from users.models import CustomUser
+from .serializers import GroupSerializer, ItemSerializer, PurchaseRequestSerializer, UserSerializer
+
+
+def _same(value):
+    return value
+
+
+class ValuesList:
+    """
+    Serializes `.values()` rows the way `serializer_class` serializes model
+    instances. `lookups` overrides the lookup read for a field, by default its
+    source: a StringRelatedField needs the column its model's __str__ returns,
+    e.g. 'student__email'. A lookup of None leaves the field to the caller.
+    """
+
+    def __init__(self, serializer_class, lookups=None):
+        self.serializer_class = serializer_class
+        self.overrides = lookups or {}
+
+    @cached_property
+    def fields(self):
+        # Built on first use: serializer fields need the app registry
+        model = self.serializer_class.Meta.model
+        fields = []
+        for name, field in self.serializer_class().fields.items():
+            lookup = self.overrides.get(name, field.source)
+            fields.append((name, lookup, _formatter(model, field)))
+        return fields
+
+    def selected(self, names):
+        return self.fields if names is None else [field for field in self.fields if field[0] in names]
+
+    def values(self, queryset, *extra, names=None):
+        """
+        `queryset` as dicts of the serialized lookups, plus `extra` ones (e.g.
+        a pagination ordering). `names` limits them to those fields.
+        """
+        lookups = [lookup for _, lookup, _ in self.selected(names) if lookup]
+        return queryset.values(*lookups, *[lookup for lookup in extra if lookup not in lookups])
+
+    def render(self, rows, names=None):
+        fields = self.selected(names)
+        return [
+            {
+                name: None if lookup is None or row[lookup] is None else formatter(row[lookup])
+                for name, lookup, formatter in fields
+            }
+            for row in rows
+        ]
+
+    def list_response(self, view, queryset, *extra, render=None):
+        """
+        The paginated response of `view` for `queryset`, honouring ?fields= and
+        ?expand=. `extra` are kept for the pagination ordering; `render` stands
+        in for self.render when some fields need more than the row.
+        """
+        options = sparse.options(view.request)
+        # Validates the names, a 400 for unknown ones, whichever path serves them
+        names = list(self.serializer_class(many=True, **options).child.fields)
+        if options['expand']:
+            serializer = self.serializer_class(many=True, **options)
+            page = view.paginate_queryset(sparse.shape(queryset, serializer, *extra))
+            return view.get_paginated_response(self.serializer_class(page, many=True, **options).data)
+        if options['fields'] is None:
+            names = None
+        page = view.paginate_queryset(self.values(queryset, *extra, names=names))
+        return view.get_paginated_response((render or self.render)(page, names))
+
+
+def _formatter(model, field):
+    if isinstance(field, serializers.RelatedField):
+        # Primary keys come as they are; string fields read the __str__ column
+        return _same
+    if isinstance(field, serializers.FileField):
+        model_field = model._meta.get_field(field.source)
+        return lambda name: field.to_representation(FieldFile(None, model_field, name))
+    return field.to_representation
+
+
+GROUPS = ValuesList(GroupSerializer, {'students': None})
+GROUP_STUDENTS = ValuesList(UserSerializer)
+ITEMS = ValuesList(ItemSerializer)
+PURCHASE_REQUESTS = ValuesList(PurchaseRequestSerializer, {
+    # The __str__ of CustomUser, Item and Class
+    'student': 'student__email',
+    'item': 'item__name',
+    'class_ref': 'class_ref__name',
+})
+
+
+def groups(rows, names=None):
+    """Render group rows with their students, read with one more query like GroupSerializer's prefetch."""
+    data = GROUPS.render(rows, names)
+    if names is not None and 'students' not in names:
+        return data
+    # `rows` carry the id even when the response leaves it out
+    members = {}
+    students = CustomUser.objects.filter(joined_groups__in=[row['id'] for row in rows])
+    for row in GROUP_STUDENTS.values(students, 'joined_groups'):
+        members.setdefault(row['joined_groups'], []).append(row)
+    for row, group in zip(rows, data):
+        group['students'] = GROUP_STUDENTS.render(members.get(row['id'], ()))
+    return data
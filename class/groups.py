@@ -0,0 +1,272 @@
+"""
+Group membership service.
+
+A seat is taken with one guarded UPDATE of Group.student_count that only
+succeeds while the group has room, and GroupMembership rows are unique per
+(class, student), so concurrent joins can neither overfill a group nor put a
+student in two groups of a class. Only the group's own row is written, so
+joins to different groups of a class never wait on each other.
+
+Group.pending_count moves in the same transaction as the join requests it
+counts. Membership rows are written directly rather than through
+Group.students, so the membership cache is invalidated here instead of by the
+m2m signals. UPDATEs skip auto_now, so each write here sets Group.updated_at
+itself: the group's ETag (see conditional.py) is derived from it.
+"""
+import heapq
+import random
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from users.models import CustomUser
+from . import membership
+from .models import Group, GroupMembership
+
+PendingApproval = Group.pending_approvals.through
+
+BULK_BATCH_SIZE = 1000
+
+BALANCED = 'balanced'
+RANDOM = 'random'
+PENDING = 'pending'
+STRATEGIES = [BALANCED, RANDOM, PENDING]
+
+
+class GroupError(Exception):
+    pass
+
+
+class GroupFull(GroupError):
+    pass
+
+
+class AlreadyInGroup(GroupError):
+    pass
+
+
+def create_groups(creator, specs):
+    """
+    Create numbered groups for one or more classes in one transaction, with
+    batched INSERTs. Each spec has class_id, number_of_groups,
+    group_name_prefix, max_students and requires_approval. Returns the new
+    groups in the order requested.
+    """
+    new_groups = [
+        Group(
+            name=f"{spec['group_name_prefix']} {i + 1}",
+            class_ref_id=spec['class_id'],
+            creator=creator,
+            max_students=spec['max_students'],
+            requires_approval=spec['requires_approval'],
+        )
+        for spec in specs
+        for i in range(spec['number_of_groups'])
+    ]
+    with transaction.atomic():
+        return Group.objects.bulk_create(new_groups, batch_size=BULK_BATCH_SIZE)
+
+
+def _reserve(group_id, seats):
+    """Take `seats` seats in the group; False if it has fewer left."""
+    has_room = Q(max_students=0) | Q(student_count__lte=F('max_students') - seats)
+    return Group.objects.filter(has_room, pk=group_id).update(
+        student_count=F('student_count') + seats, updated_at=timezone.now(),
+    ) == 1
+
+
+def join(group, student):
+    """
+    Put `student` in `group`, or on its pending approvals if the group requires
+    approval. Returns True if the student joined, False if the request is pending.
+    """
+    if membership.group_in_class(student, group.class_ref_id) is not None:
+        raise AlreadyInGroup("Already in another group in this class.")
+
+    if group.requires_approval:
+        # The seat is only taken when the teacher approves
+        if group.max_students and group.student_count >= group.max_students:
+            raise GroupFull("Group is full.")
+        try:
+            with transaction.atomic():
+                PendingApproval.objects.create(group_id=group.id, customuser_id=student.pk)
+                Group.objects.filter(pk=group.id).update(pending_count=F('pending_count') + 1, updated_at=timezone.now())
+        except IntegrityError:
+            pass  # Already waiting for approval
+        return False
+
+    with transaction.atomic():
+        if not _reserve(group.id, 1):
+            raise GroupFull("Group is full.")
+        try:
+            GroupMembership.objects.create(group=group, student=student, class_ref_id=group.class_ref_id)
+        except IntegrityError:
+            # Joined another group since the cache was loaded; the seat is rolled back
+            raise AlreadyInGroup("Already in another group in this class.")
+    membership.invalidate(student.pk)
+    return True
+
+
+def add_students(group, students):
+    """
+    Add approved `students` to `group` and clear their pending requests for it.
+    Students already in a group of the class are left where they are. Returns
+    the students added; raises GroupFull if the group cannot take all of them.
+    """
+    students = list(students)
+    with transaction.atomic():
+        placed = set(
+            GroupMembership.objects.filter(class_ref_id=group.class_ref_id, student__in=students)
+            .values_list('student_id', flat=True)
+        )
+        added = [student for student in students if student.pk not in placed]
+        if added:
+            if not _reserve(group.id, len(added)):
+                raise GroupFull("Group is full.")
+            try:
+                GroupMembership.objects.bulk_create([
+                    GroupMembership(group=group, student=student, class_ref_id=group.class_ref_id) for student in added
+                ])
+            except IntegrityError:
+                raise AlreadyInGroup("A student joined another group in this class meanwhile.")
+        _drop_requests(group, students)
+    membership.invalidate(*[student.pk for student in added])
+    return added
+
+
+def check_members(group, student_ids):
+    """
+    Raise GroupFull or AlreadyInGroup unless `student_ids` may make up the
+    members of `group`: no more than its max_students, and none of them in
+    another group of its class. For edits made outside join and add_students,
+    such as the admin's.
+    """
+    if group.max_students and len(student_ids) > group.max_students:
+        raise GroupFull(f"Group is full: it takes at most {group.max_students} students.")
+    elsewhere = GroupMembership.objects.filter(class_ref_id=group.class_ref_id, student_id__in=student_ids)
+    if group.pk is not None:
+        elsewhere = elsewhere.exclude(group_id=group.pk)
+    if elsewhere.exists():
+        raise AlreadyInGroup("A student is already in another group in this class.")
+
+
+def decline(group, students):
+    """Drop the pending requests of `students` to join `group`."""
+    with transaction.atomic():
+        _drop_requests(group, students)
+
+
+def _drop_requests(group, students):
+    dropped, _ = PendingApproval.objects.filter(group_id=group.id, customuser__in=students).delete()
+    if dropped:
+        Group.objects.filter(pk=group.id).update(pending_count=F('pending_count') - dropped, updated_at=timezone.now())
+
+
+def recount(groups=None):
+    """
+    Recompute student_count and pending_count of `groups` (default: all) from
+    the membership tables. Returns the number of groups whose counters were wrong.
+    """
+    def count(model):
+        rows = model.objects.filter(group_id=OuterRef('pk')).values('group_id').annotate(n=Count('pk')).values('n')
+        return Coalesce(Subquery(rows), 0)
+
+    groups = Group.objects.all() if groups is None else groups
+    stale = groups.annotate(
+        actual_students=count(GroupMembership), actual_pending=count(PendingApproval),
+    ).exclude(student_count=F('actual_students'), pending_count=F('actual_pending'))
+    return Group.objects.filter(pk__in=stale.values('pk')).update(
+        student_count=count(GroupMembership), pending_count=count(PendingApproval), updated_at=timezone.now(),
+    )
+
+
+def assign(class_id, strategy=BALANCED, seed=None):
+    """
+    Put every student of the class who is not in a group yet into one of its
+    groups, filling the emptiest group with room first.
+
+    RANDOM shuffles the students first (reproducibly, given `seed`). PENDING
+    first honours the students' pending join requests, then fills the rest
+    as BALANCED. The class's groups are locked while the assignment is
+    written, so joins running at the same time wait rather than overfill.
+
+    Returns ({student_id: group_id}, [ids of students no group had room for]);
+    raises AlreadyInGroup if a student joined a group meanwhile.
+    """
+    with transaction.atomic():
+        class_groups = list(
+            Group.objects.select_for_update().filter(class_ref_id=class_id)
+            .order_by('pk').only('pk', 'max_students', 'student_count')
+        )
+        taken = {group.pk: group.student_count for group in class_groups}
+        # A group may hold more than max_students (e.g. filled by the admin); it has no room, not negative room
+        free = {
+            group.pk: max(group.max_students - group.student_count, 0) if group.max_students else None
+            for group in class_groups
+        }
+
+        placed_students = GroupMembership.objects.filter(class_ref_id=class_id).values('student_id')
+        students = list(
+            CustomUser.objects.filter(joined_classes=class_id).exclude(pk__in=placed_students)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        if strategy == RANDOM:
+            random.Random(seed).shuffle(students)
+
+        placed = {}
+        if strategy == PENDING:
+            # Oldest request first, while the requested group has room
+            unplaced = set(students)
+            requests = PendingApproval.objects.filter(group__class_ref_id=class_id).order_by('pk')
+            for student_id, group_id in requests.values_list('customuser_id', 'group_id'):
+                if student_id in unplaced and student_id not in placed and free[group_id] != 0:
+                    placed[student_id] = group_id
+                    taken[group_id] += 1
+                    if free[group_id] is not None:
+                        free[group_id] -= 1
+            students = [student_id for student_id in students if student_id not in placed]
+
+        left = _fill(students, taken, free, placed)
+        if placed:
+            try:
+                GroupMembership.objects.bulk_create(
+                    [GroupMembership(group_id=group_id, student_id=student_id, class_ref_id=class_id)
+                     for student_id, group_id in placed.items()],
+                    batch_size=BULK_BATCH_SIZE,
+                )
+            except IntegrityError:
+                raise AlreadyInGroup("A student joined a group meanwhile, please retry.")
+            now = timezone.now()
+            for group in class_groups:
+                group.student_count = taken[group.pk]
+                group.updated_at = now
+            Group.objects.bulk_update(class_groups, ['student_count', 'updated_at'], batch_size=BULK_BATCH_SIZE)
+            if strategy == PENDING:
+                # Requests of students who now have a group are moot
+                PendingApproval.objects.filter(
+                    group__class_ref_id=class_id, customuser_id__in=GroupMembership.objects.filter(class_ref_id=class_id).values('student_id'),
+                ).delete()
+                recount(Group.objects.filter(class_ref_id=class_id))
+    membership.invalidate(*placed)
+    return placed, left
+
+
+def _fill(students, taken, free, placed):
+    """Give each student the least-filled group with room; returns the students left over."""
+    heap = [(count, group_id) for group_id, count in taken.items() if free[group_id] != 0]
+    heapq.heapify(heap)
+    left = []
+    for student_id in students:
+        if not heap:
+            left.append(student_id)
+            continue
+        count, group_id = heapq.heappop(heap)
+        placed[student_id] = group_id
+        taken[group_id] = count + 1
+        if free[group_id] is not None:
+            free[group_id] -= 1
+        if free[group_id] != 0:
+            heapq.heappush(heap, (count + 1, group_id))
+    return left
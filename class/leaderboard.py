@@ -0,0 +1,78 @@
+"""
+Per-class balance leaderboard.
+
+The whole ranking of a class is built with one query (walking the
+(class_ref, balance) index) and cached, so top-N and "my rank" reads need no
+query until a wallet of the class changes. Every write path that moves a
+balance or creates a wallet calls `invalidate`; the short timeout only bounds
+the damage if one is ever missed.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Wallet
+
+CACHE_TIMEOUT = 30
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+
+def _key(class_id):
+    return f'class-leaderboard:{class_id}'
+
+
+def wallets_by_balance(class_id):
+    return (
+        Wallet.objects.filter(class_ref_id=class_id)
+        .order_by('-balance', 'owner__first_name', 'owner__last_name', 'owner_id')
+        .values_list('owner_id', 'owner__first_name', 'owner__last_name', 'balance')
+    )
+
+
+def ranking(class_id):
+    """
+    Return {'entries': [(rank, student id, first name, last name, balance)],
+    'positions': {student id: index into entries}}, highest balance first.
+    Equal balances share a rank (1, 2, 2, 4).
+    """
+    key = _key(class_id)
+    data = cache.get(key)
+    if data is None:
+        entries, positions = [], {}
+        for position, (owner_id, first_name, last_name, balance) in enumerate(wallets_by_balance(class_id)):
+            rank = entries[-1][0] if entries and entries[-1][4] == balance else position + 1
+            entries.append((rank, owner_id, first_name, last_name, balance))
+            positions[owner_id] = position
+        data = {'entries': entries, 'positions': positions}
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
+
+
+def invalidate(*class_ids):
+    keys = [_key(class_id) for class_id in set(class_ids)]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    # A reader may rebuild the ranking before the write commits, so drop it again afterwards
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _entry(row):
+    rank, owner_id, first_name, last_name, balance = row
+    return {
+        'rank': rank,
+        'student': {'id': owner_id, 'first_name': first_name, 'last_name': last_name},
+        'balance': balance,
+    }
+
+
+def top(class_id, limit=DEFAULT_LIMIT):
+    return [_entry(row) for row in ranking(class_id)['entries'][:limit]]
+
+
+def rank_of(class_id, student_id):
+    """The student's entry, or None if they have no wallet in the class."""
+    data = ranking(class_id)
+    position = data['positions'].get(student_id)
+    return None if position is None else _entry(data['entries'][position])
@@ -0,0 +1,241 @@
+"""
+Wallet ledger.
+
+Every change to a wallet balance goes through this module. Balances are moved
+with a single conditional UPDATE (so concurrent writers never overwrite each
+other) and every movement is recorded as an append-only Transaction row in the
+same database transaction.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Value, When
+
+from . import leaderboard
+from .models import Transaction, Wallet
+
+# Rows per INSERT statement for bulk writes
+BULK_BATCH_SIZE = 1000
+
+# Largest value the amount and balance columns (max_digits=10, decimal_places=2) hold
+MAX_AMOUNT = Decimal('99999999.99')
+
+
+class LedgerError(Exception):
+    pass
+
+
+class InvalidAmount(LedgerError):
+    pass
+
+
+class InsufficientFunds(LedgerError):
+    pass
+
+
+def to_amount(value):
+    """Parse a request value into a positive Decimal with two decimal places."""
+    try:
+        amount = Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        raise InvalidAmount("Invalid amount format. Please provide a valid number.")
+    if not amount.is_finite():
+        raise InvalidAmount("Invalid amount format. Please provide a valid number.")
+    if abs(amount) > MAX_AMOUNT:
+        raise InvalidAmount(f"Amount must not exceed {MAX_AMOUNT}.")
+    return amount.quantize(Decimal('0.01'))
+
+
+def credit(wallet, amount, description=''):
+    """Add `amount` to the wallet and record a credit entry."""
+    return _post(wallet, amount, Transaction.CREDIT, description)
+
+
+def debit(wallet, amount, description=''):
+    """Take `amount` from the wallet, failing if the balance is too low."""
+    return _post(wallet, amount, Transaction.DEBIT, description)
+
+
+def adjust(wallet, amount, description=''):
+    """Credit positive amounts and debit negative ones."""
+    if amount < 0:
+        return debit(wallet, -amount, description)
+    return credit(wallet, amount, description)
+
+
+def _post(wallet, amount, transaction_type, description):
+    if amount <= 0:
+        raise InvalidAmount("Amount must be greater than zero.")
+
+    with transaction.atomic():
+        wallets = Wallet.objects.filter(pk=wallet.pk)
+        if transaction_type == Transaction.DEBIT:
+            # The balance check and the deduction are the same statement, so
+            # two debits can never both pass the check on a stale balance.
+            updated = wallets.filter(balance__gte=amount).update(balance=F('balance') - amount)
+        else:
+            # Likewise a credit only applies if the balance still fits its column
+            updated = wallets.filter(balance__lte=MAX_AMOUNT - amount).update(balance=F('balance') + amount)
+
+        if not updated:
+            if not wallets.exists():
+                raise Wallet.DoesNotExist("Wallet not found.")
+            if transaction_type == Transaction.DEBIT:
+                raise InsufficientFunds("Insufficient balance.")
+            raise InvalidAmount(f"The balance may not exceed {MAX_AMOUNT}.")
+
+        entry = Transaction.objects.create(
+            wallet=wallet,
+            class_ref_id=wallet.class_ref_id,
+            amount=amount,
+            description=description,
+            transaction_type=transaction_type,
+        )
+        wallet.balance = wallets.values_list('balance', flat=True).get()
+
+    leaderboard.invalidate(wallet.class_ref_id)
+    return entry
+
+
+def post_corrections(corrections, description=''):
+    """
+    Record entries for balance changes that bypassed the ledger. `corrections`
+    are (wallet id, class id, amount) triples, amount being the balance minus
+    what the wallet's entries add up to. Balances are left as they are; the
+    entries bring the ledger in line with them. Callers hold the wallets'
+    row locks, as reconciliation does.
+    """
+    return Transaction.objects.bulk_create(
+        [
+            Transaction(
+                wallet_id=wallet_id,
+                class_ref_id=class_id,
+                amount=abs(amount),
+                description=description,
+                transaction_type=Transaction.CREDIT if amount > 0 else Transaction.DEBIT,
+            )
+            for wallet_id, class_id, amount in corrections
+            if amount
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+
+
+def _per_wallet(amounts):
+    """
+    An expression worth amounts[pk] on each wallet row. Wallets are grouped by
+    amount, so the UPDATE needs one WHEN per distinct amount rather than one
+    per wallet.
+    """
+    by_amount = {}
+    for wallet_id, amount in amounts.items():
+        by_amount.setdefault(amount, []).append(wallet_id)
+    if len(by_amount) == 1:
+        return Value(next(iter(by_amount)))
+    return Case(
+        *[When(pk__in=ids, then=Value(amount)) for amount, ids in by_amount.items()],
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+def bulk_debit(debits):
+    """
+    Debit many wallets in a single database transaction.
+
+    `debits` are (wallet, amount, description) triples; a wallet may appear
+    more than once. Each wallet's balance drops by its total in one
+    conditional UPDATE, which raises InsufficientFunds for the whole batch if
+    any balance would go below zero, and one ledger entry per debit is written
+    with one bulk INSERT. Returns the entries.
+    """
+    if not debits:
+        return []
+    if any(amount <= 0 for _, amount, _ in debits):
+        raise InvalidAmount("Amount must be greater than zero.")
+
+    totals = {}
+    for wallet, amount, _ in debits:
+        totals[wallet.pk] = totals.get(wallet.pk, 0) + amount
+    with transaction.atomic():
+        delta = _per_wallet(totals)
+        # The balance check and the deduction are the same statement, as for single debits
+        updated = (
+            Wallet.objects.filter(pk__in=totals)
+            .alias(new_balance=F('balance') - delta)
+            .filter(new_balance__gte=0)
+            .update(balance=F('balance') - delta)
+        )
+        if updated != len(totals):
+            raise InsufficientFunds("Insufficient balance.")
+
+        entries = Transaction.objects.bulk_create(
+            [
+                Transaction(
+                    wallet_id=wallet.pk,
+                    class_ref_id=wallet.class_ref_id,
+                    amount=amount,
+                    description=description,
+                    transaction_type=Transaction.DEBIT,
+                )
+                for wallet, amount, description in debits
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        leaderboard.invalidate(*[wallet.class_ref_id for wallet, _, _ in debits])
+        return entries
+
+
+def bulk_credit(class_id, amounts, description=''):
+    """
+    Credit many wallets of one class in a single database transaction.
+
+    `amounts` maps student ids to positive amounts. Missing wallets are
+    created, balances are moved with one UPDATE and the matching ledger entries
+    are written with one bulk INSERT. Returns {student_id: new_balance}.
+    """
+    if not amounts:
+        return {}
+    amounts = {owner_id: to_amount(amount) for owner_id, amount in amounts.items()}
+    if any(amount <= 0 for amount in amounts.values()):
+        raise InvalidAmount("Amount must be greater than zero.")
+
+    owner_ids = list(amounts)
+    with transaction.atomic():
+        wallets = Wallet.objects.filter(class_ref_id=class_id, owner_id__in=owner_ids)
+        existing = set(wallets.values_list('owner_id', flat=True))
+        # A wallet created concurrently since the read above is skipped here and
+        # picked up by re-reading the ids
+        Wallet.objects.bulk_create(
+            [Wallet(owner_id=owner_id, class_ref_id=class_id) for owner_id in owner_ids if owner_id not in existing],
+            batch_size=BULK_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        wallet_ids = dict(wallets.values_list('owner_id', 'id'))
+
+        delta = _per_wallet({wallet_ids[owner_id]: amount for owner_id, amount in amounts.items()})
+        # As in _post, a wallet whose balance would no longer fit its column is
+        # left alone by the UPDATE; the whole batch is then rolled back
+        updated = (
+            Wallet.objects.filter(pk__in=wallet_ids.values())
+            .alias(new_balance=F('balance') + delta)
+            .filter(new_balance__lte=MAX_AMOUNT)
+            .update(balance=F('balance') + delta)
+        )
+        if updated != len(wallet_ids):
+            raise InvalidAmount(f"The balance may not exceed {MAX_AMOUNT}.")
+
+        Transaction.objects.bulk_create(
+            [
+                Transaction(
+                    wallet_id=wallet_ids[owner_id],
+                    class_ref_id=class_id,
+                    amount=amount,
+                    description=description,
+                    transaction_type=Transaction.CREDIT,
+                )
+                for owner_id, amount in amounts.items()
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        leaderboard.invalidate(class_id)
+        return dict(wallets.values_list('owner_id', 'balance'))
@@ -0,0 +1,90 @@
+import time
+from importlib import import_module
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from perksway.renderers import ORJSONRenderer
+from perksway.testing import seed_class
+
+# The app is called "class", a keyword, so it cannot be imported by name
+class_models = import_module('class.models')
+class_serializers = import_module('class.serializers')
+fastpath = import_module('class.fastpath')
+querysets = import_module('class.querysets')
+
+# The largest page the list endpoints serve
+PAGE = 500
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _endpoints(class_id):
+    """name -> (serializer path, fast path), each returning the data of one page."""
+    groups = class_models.Group.objects.filter(class_ref_id=class_id).order_by('id')[:PAGE]
+    items = class_models.Item.objects.filter(class_ref_id=class_id).order_by('created_at')[:PAGE]
+    pending = class_models.PurchaseRequest.objects.filter(class_ref_id=class_id, status='pending').order_by('requested_at')[:PAGE]
+    return {
+        'all groups': (
+            lambda: class_serializers.GroupSerializer(querysets.groups().filter(pk__in=groups.values('pk')).order_by('id'), many=True).data,
+            lambda: fastpath.groups(fastpath.GROUPS.values(groups)),
+        ),
+        'items': (
+            lambda: class_serializers.ItemSerializer(items, many=True).data,
+            lambda: fastpath.ITEMS.render(fastpath.ITEMS.values(items)),
+        ),
+        'purchase queue': (
+            lambda: class_serializers.PurchaseRequestSerializer(
+                querysets.purchase_requests().filter(pk__in=pending.values('pk')).order_by('requested_at'), many=True,
+            ).data,
+            lambda: fastpath.PURCHASE_REQUESTS.render(fastpath.PURCHASE_REQUESTS.values(pending)),
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the list endpoints' serializer path against the .values() fast path with the orjson "
+        "renderer, and check that both produce the same bytes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true',
+                            help="Seed a large class first; everything is rolled back afterwards.")
+        parser.add_argument('--class', type=int, dest='class_id', help="Benchmark this class instead.")
+        parser.add_argument('--repeat', type=int, default=20, help="Calls per variant; the fastest counts (default: %(default)s).")
+
+    def handle(self, *args, **options):
+        if not options['seed'] and options['class_id'] is None:
+            raise CommandError("Give --class or --seed.")
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    class_id = seed_class(code='BENCH', students=1000, groups=PAGE, group_size=2, items=PAGE, purchases=PAGE)['class'].id
+                else:
+                    class_id = options['class_id']
+                self.run(class_id, options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def run(self, class_id, repeat):
+        for name, (serialized, fast) in _endpoints(class_id).items():
+            before = self.best(lambda: JSONRenderer().render(serialized()), repeat)
+            after = self.best(lambda: ORJSONRenderer().render(fast()), repeat)
+            if JSONRenderer().render(serialized()) != ORJSONRenderer().render(fast()):
+                raise CommandError(f"{name}: the fast path output differs from the serializer's")
+            self.stdout.write(
+                f"{name}: {before * 1000:.1f}ms -> {after * 1000:.1f}ms per page, {before / after:.1f}x the throughput"
+            )
+
+    def best(self, call, repeat):
+        fastest = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            call()
+            fastest = min(fastest, time.perf_counter() - started)
+        return fastest
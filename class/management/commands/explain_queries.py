@@ -0,0 +1,78 @@
+from importlib import import_module
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from perksway.testing import seed_class
+
+# The app is called "class", a keyword, so it cannot be imported by name
+class_models = import_module('class.models')
+query_plans = import_module('class.query_plans')
+
+BACKGROUND_CLASSES = 5
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Run EXPLAIN on the ORM queries behind the views and flag full table scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true',
+                            help="Seed a realistic class first; everything is rolled back afterwards.")
+        parser.add_argument('--strict', action='store_true', help="Exit with an error if any full table scan is found.")
+        parser.add_argument('--path', action='append', dest='paths', help="Only check this query path (repeatable).")
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        flagged = {}
+        try:
+            with transaction.atomic():
+                sample = self.seed() if options['seed'] else self.existing_sample()
+                with connection.cursor() as cursor:
+                    # Give the planner statistics for the data just written
+                    cursor.execute('ANALYZE')
+                flagged = self.check_paths(sample, options['paths'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        if flagged and options['strict']:
+            raise CommandError(f"Full table scans in: {', '.join(sorted(flagged))}")
+
+    def seed(self):
+        # Other classes around the sample one, as in a shared production database
+        for i in range(BACKGROUND_CLASSES):
+            seed_class(code=f'EXPLAIN{i}', students=100, groups=10, items=20, purchases=40)
+        return seed_class(code='EXPLAIN')
+
+    def existing_sample(self):
+        class_obj = class_models.Class.objects.filter(students__isnull=False, groups__isnull=False).first()
+        if class_obj is None:
+            raise CommandError("No class with students and groups found; use --seed.")
+        return {
+            'teacher': class_obj.teacher,
+            'class': class_obj,
+            'students': list(class_obj.students.all()[:1]),
+            'groups': list(class_obj.groups.all()[:20]),
+        }
+
+    def check_paths(self, sample, only=None):
+        flagged = {}
+        for name, build in query_plans.QUERY_PATHS.items():
+            if only and name not in only:
+                continue
+            plan = build(sample).explain()
+            scans = query_plans.full_scans(plan, connection.vendor)
+            if scans is None:
+                self.stdout.write(self.style.WARNING(f"{name}: plans on {connection.vendor} are not checked"))
+            elif scans:
+                flagged[name] = scans
+                self.stdout.write(self.style.ERROR(f"{name}: full scan of {', '.join(scans)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: ok"))
+            if self.verbosity > 1:
+                self.stdout.write(plan)
+        return flagged
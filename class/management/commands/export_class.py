@@ -0,0 +1,50 @@
+from importlib import import_module
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+# The app is called "class", a keyword, so it cannot be imported by name
+exports = import_module('class.exports')
+class_models = import_module('class.models')
+
+
+def _moment(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        moment = timezone.datetime.combine(day, timezone.datetime.min.time())
+    return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+
+
+class Command(BaseCommand):
+    help = "Stream a class's transactions, purchases or roster to a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('class_id', type=int)
+        parser.add_argument('kind', choices=list(exports.KINDS))
+        parser.add_argument('--format', choices=exports.FORMATS, default=exports.CSV, dest='file_format')
+        parser.add_argument('--gzip', action='store_true', help="Compress the output.")
+        parser.add_argument('--since', type=_moment, help="Only rows from this date or time on.")
+        parser.add_argument('--until', type=_moment, help="Only rows before this date or time.")
+        parser.add_argument('-o', '--output', help="File to write (default: standard output).")
+
+    def handle(self, *args, **options):
+        if options['gzip'] and not options['output']:
+            raise CommandError("--gzip needs --output.")
+        if not class_models.Class.objects.filter(pk=options['class_id']).exists():
+            raise CommandError(f"Class {options['class_id']} does not exist.")
+        chunks = exports.stream(
+            options['kind'], options['class_id'], options['file_format'],
+            options['since'], options['until'], options['gzip'],
+        )
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode('utf-8'), ending='')
+            return
+        with open(options['output'], 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        self.stderr.write(f"Wrote {options['output']}.")
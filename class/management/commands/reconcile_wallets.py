@@ -0,0 +1,41 @@
+from importlib import import_module
+
+from django.core.management.base import BaseCommand
+
+# The app is called "class", a keyword, so it cannot be imported by name
+class_models = import_module('class.models')
+reconciliation = import_module('class.reconciliation')
+
+
+class Command(BaseCommand):
+    help = (
+        "Check wallet balances against the ledger entries posted since their last checkpoint, "
+        "report any drift and record new checkpoints."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class', type=int, action='append', dest='class_ids',
+                            help="Only check the wallets of this class (repeatable).")
+        parser.add_argument('--workers', type=int, default=reconciliation.WORKERS,
+                            help="Chunks checked at the same time (default: %(default)s).")
+        parser.add_argument('--chunk-size', type=int, default=reconciliation.CHUNK_SIZE,
+                            help="Wallets per chunk and transaction (default: %(default)s).")
+        parser.add_argument('--repair', action='store_true',
+                            help="Post a ledger entry for the difference of each drifted balance.")
+
+    def handle(self, *args, **options):
+        wallets = class_models.Wallet.objects.all()
+        if options['class_ids']:
+            wallets = wallets.filter(class_ref_id__in=options['class_ids'])
+
+        checked, drift = reconciliation.reconcile(
+            wallets, workers=options['workers'], chunk_size=options['chunk_size'], repair=options['repair'],
+            progress=lambda done: self.stderr.write(f"Checked {done} wallet(s)..."),
+        )
+        for row in drift:
+            self.stdout.write(
+                f"Wallet {row['wallet_id']} (student {row['owner_id']}, class {row['class_id']}): "
+                f"balance {row['balance']}, ledger says {row['expected']}"
+                + (" (correction posted)" if options['repair'] else "")
+            )
+        self.stdout.write(f"Checked {checked} wallet(s), {len(drift)} drifted.")
@@ -0,0 +1,22 @@
+from importlib import import_module
+
+from django.core.management.base import BaseCommand
+
+# The app is called "class", a keyword, so it cannot be imported by name
+class_models = import_module('class.models')
+groups = import_module('class.groups')
+
+
+class Command(BaseCommand):
+    help = "Recompute Group.student_count and Group.pending_count from the membership tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class', type=int, action='append', dest='class_ids',
+                            help="Only repair the groups of this class (repeatable).")
+
+    def handle(self, *args, **options):
+        queryset = class_models.Group.objects.all()
+        if options['class_ids']:
+            queryset = queryset.filter(class_ref_id__in=options['class_ids'])
+        repaired = groups.recount(queryset)
+        self.stdout.write(f"Repaired the counters of {repaired} group(s).")
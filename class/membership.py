@@ -0,0 +1,64 @@
+"""
+Per-user class membership cache.
+
+Authorization checks ask "does this user teach / attend class X?" on almost
+every request. The answer is loaded once per user (two small queries) and kept
+in the cache until a signal in signals.py reports a change to the user's
+classes or groups, so most checks need no query at all. The cache must be
+shared by every worker for those invalidations to reach them (settings.CACHES).
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Class, Group
+
+CACHE_TIMEOUT = 60 * 15
+
+
+def _key(user_id):
+    return f'class-membership:{user_id}'
+
+
+def memberships(user_id):
+    """Return {'taught': {class ids}, 'joined': {class ids}, 'groups': {class id: group id}}."""
+    key = _key(user_id)
+    data = cache.get(key)
+    if data is None:
+        data = {
+            'taught': set(Class.objects.filter(teacher_id=user_id).values_list('id', flat=True)),
+            'joined': set(Class.students.through.objects.filter(customuser_id=user_id).values_list('class_id', flat=True)),
+            'groups': dict(Group.objects.filter(students=user_id).values_list('class_ref_id', 'id')),
+        }
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
+
+
+def invalidate(*user_ids):
+    keys = [_key(user_id) for user_id in set(user_ids)]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    # A reader may load the memberships before the write commits, so drop them again afterwards
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def is_teacher(user, class_id):
+    return user.is_authenticated and int(class_id) in memberships(user.id)['taught']
+
+
+def is_student(user, class_id):
+    return user.is_authenticated and int(class_id) in memberships(user.id)['joined']
+
+
+def is_member(user, class_id):
+    if not user.is_authenticated:
+        return False
+    data = memberships(user.id)
+    return int(class_id) in data['taught'] or int(class_id) in data['joined']
+
+
+def group_in_class(user, class_id):
+    """Id of the user's group in the class, or None."""
+    if not user.is_authenticated:
+        return None
+    return memberships(user.id)['groups'].get(int(class_id))
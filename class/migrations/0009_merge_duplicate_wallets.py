@@ -0,0 +1,37 @@
+# Generated by Django 5.1.1 on 2026-10-17 15:47
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_wallets(apps, schema_editor):
+    """Fold duplicate wallets of a student and class into the oldest one."""
+    Wallet = apps.get_model('class', 'Wallet')
+    Transaction = apps.get_model('class', 'Transaction')
+
+    duplicates = (
+        Wallet.objects.values('owner_id', 'class_ref_id')
+        .annotate(copies=Count('id'))
+        .filter(copies__gt=1)
+    )
+    for pair in duplicates:
+        wallets = Wallet.objects.filter(owner_id=pair['owner_id'], class_ref_id=pair['class_ref_id']).order_by('id')
+        keep = wallets[0]
+        others = wallets.exclude(id=keep.id)
+        keep.balance = wallets.aggregate(total=Sum('balance'))['total']
+        keep.save(update_fields=['balance'])
+        Transaction.objects.filter(wallet__in=others).update(wallet=keep)
+        others.delete()
+
+
+class Migration(migrations.Migration):
+    # Runs on its own so PostgreSQL has no pending trigger events when the
+    # next migration adds the unique constraint
+
+    dependencies = [
+        ('class', '0008_alter_item_class_ref'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_wallets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-17 15:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('class', '0009_merge_duplicate_wallets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['class_ref', 'created_at'], name='item_class_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaserequest',
+            index=models.Index(fields=['class_ref', 'status', 'requested_at'], name='purchase_class_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaserequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['class_ref', 'requested_at'], name='purchase_pending_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['wallet', 'date'], name='transaction_wallet_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='wallet',
+            constraint=models.UniqueConstraint(fields=('owner', 'class_ref'), name='unique_wallet_per_class'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def drop_extra_group_memberships(apps, schema_editor):
+    """Keep only the oldest group membership of a student in each class."""
+    Group = apps.get_model('class', 'Group')
+    Membership = Group.students.through
+
+    duplicates = (
+        Membership.objects.values('customuser_id', 'group__class_ref_id')
+        .annotate(copies=Count('id'))
+        .filter(copies__gt=1)
+    )
+    for pair in duplicates:
+        rows = Membership.objects.filter(
+            customuser_id=pair['customuser_id'], group__class_ref_id=pair['group__class_ref_id'],
+        ).order_by('id')
+        rows.exclude(id=rows[0].id).delete()
+
+
+class Migration(migrations.Migration):
+    # Runs on its own so PostgreSQL has no pending trigger events when the
+    # next migrations alter the table
+
+    dependencies = [
+        ('class', '0010_index_pack'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_extra_group_memberships, migrations.RunPython.noop),
+    ]
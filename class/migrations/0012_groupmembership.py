@@ -0,0 +1,46 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('class', '0011_dedupe_group_students'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Give Group.students an explicit through model on its existing table
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='GroupMembership',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='class.group')),
+                        ('student', models.ForeignKey(db_column='customuser_id', on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'class_group_students',
+                        'unique_together': {('group', 'student')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='group',
+                    name='students',
+                    field=models.ManyToManyField(related_name='joined_groups', through='class.GroupMembership', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='groupmembership',
+            name='class_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='class.class'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='student_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
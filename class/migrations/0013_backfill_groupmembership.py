@@ -0,0 +1,28 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill(apps, schema_editor):
+    Group = apps.get_model('class', 'Group')
+    GroupMembership = apps.get_model('class', 'GroupMembership')
+
+    GroupMembership.objects.update(
+        class_ref_id=Subquery(Group.objects.filter(pk=OuterRef('group_id')).values('class_ref_id')[:1]),
+    )
+    seats = (
+        GroupMembership.objects.filter(group_id=OuterRef('pk'))
+        .values('group_id').annotate(taken=Count('id')).values('taken')
+    )
+    Group.objects.update(student_count=Coalesce(Subquery(seats), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('class', '0012_groupmembership'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('class', '0013_backfill_groupmembership'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='groupmembership',
+            name='class_ref',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='class.class'),
+        ),
+        migrations.AddConstraint(
+            model_name='groupmembership',
+            constraint=models.UniqueConstraint(fields=('class_ref', 'student'), name='one_group_per_class'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_pending(apps, schema_editor):
+    Group = apps.get_model('class', 'Group')
+    Pending = Group.pending_approvals.through
+
+    requests = (
+        Pending.objects.filter(group_id=OuterRef('pk'))
+        .values('group_id').annotate(waiting=Count('id')).values('waiting')
+    )
+    Group.objects.update(pending_count=Coalesce(Subquery(requests), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('class', '0014_groupmembership_one_group_per_class'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='pending_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_pending, migrations.RunPython.noop),
+    ]
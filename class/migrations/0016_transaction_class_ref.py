@@ -0,0 +1,17 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('class', '0015_group_pending_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='class_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='class.class'),
+        ),
+    ]
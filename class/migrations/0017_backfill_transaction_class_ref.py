@@ -0,0 +1,24 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill(apps, schema_editor):
+    Transaction = apps.get_model('class', 'Transaction')
+    Wallet = apps.get_model('class', 'Wallet')
+
+    Transaction.objects.update(
+        class_ref_id=Subquery(Wallet.objects.filter(pk=OuterRef('wallet_id')).values('class_ref_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+    # Runs on its own so PostgreSQL has no pending trigger events when the
+    # next migration alters the table
+
+    dependencies = [
+        ('class', '0016_transaction_class_ref'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
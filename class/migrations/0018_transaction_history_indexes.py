@@ -0,0 +1,29 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('class', '0017_backfill_transaction_class_ref'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='class_ref',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='class.class'),
+        ),
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='transaction_wallet_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['wallet', '-date', '-id'], name='transaction_wallet_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['class_ref', '-date', '-id'], name='transaction_class_recent_idx'),
+        ),
+    ]
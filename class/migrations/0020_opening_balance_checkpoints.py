@@ -0,0 +1,30 @@
+from itertools import islice
+
+from django.db import migrations
+from django.db.models import Max
+
+
+def open_checkpoints(apps, schema_editor):
+    # Balances set before the ledger existed have no entries to check them
+    # against, so each wallet starts from a checkpoint of its current balance
+    Wallet = apps.get_model('class', 'Wallet')
+    BalanceCheckpoint = apps.get_model('class', 'BalanceCheckpoint')
+
+    wallets = Wallet.objects.annotate(last_transaction_id=Max('transactions__id')).values_list('id', 'balance', 'last_transaction_id')
+    rows = wallets.iterator(chunk_size=1000)
+    while batch := list(islice(rows, 1000)):
+        BalanceCheckpoint.objects.bulk_create([
+            BalanceCheckpoint(wallet_id=wallet_id, balance=balance, last_transaction_id=last_transaction_id)
+            for wallet_id, balance, last_transaction_id in batch
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('class', '0019_balancecheckpoint'),
+    ]
+
+    operations = [
+        migrations.RunPython(open_checkpoints, migrations.RunPython.noop),
+    ]
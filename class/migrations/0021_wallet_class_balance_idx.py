@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-17 16:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('class', '0020_opening_balance_checkpoints'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wallet',
+            index=models.Index(fields=['class_ref', '-balance'], name='wallet_class_balance_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.1 on 2026-10-17 18:02
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def updated_when_created(apps, schema_editor):
+    Item = apps.get_model('class', 'Item')
+    Item.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('class', '0021_wallet_class_balance_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(updated_when_created, migrations.RunPython.noop),
+    ]
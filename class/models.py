@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from users.models import CustomUser  
 from django.core.validators import MinValueValidator
 
@@ -23,37 +24,108 @@ class Group(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
-    students = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name="joined_groups")  # Existing field for joined students
+    # Add and remove students and join requests through class/groups.py, which keeps the counters in step
+    students = models.ManyToManyField(settings.AUTH_USER_MODEL, through='GroupMembership', related_name="joined_groups")
 
     # New fields for added functionality
     requires_approval = models.BooleanField(default=False)  # If approval is required for joining
     max_students = models.PositiveIntegerField(default=0)  # Maximum number of students allowed in the group
     pending_approvals = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name="pending_groups", blank=True) 
+    # Kept in step by class/groups.py; repair_group_counters recomputes them
+    student_count = models.PositiveIntegerField(default=0)  # Seats taken, reserved atomically on join
+    pending_count = models.PositiveIntegerField(default=0)  # Join requests waiting for approval
 
     def __str__(self):
         return f"{self.name} - {self.class_ref.name}"
 
 
+class GroupMembership(models.Model):
+    group = models.ForeignKey(Group, on_delete=models.CASCADE)
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_column='customuser_id')
+    # Copied from the group so the database can enforce one group per student and class
+    class_ref = models.ForeignKey(Class, on_delete=models.CASCADE)
+
+    class Meta:
+        # The table Group.students used before it had an explicit through model
+        db_table = 'class_group_students'
+        unique_together = [('group', 'student')]  # Created with the original table
+        constraints = [
+            models.UniqueConstraint(fields=['class_ref', 'student'], name='one_group_per_class'),
+        ]
+
+
 class Wallet(models.Model):
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='wallets')
     class_ref = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='class_wallets')
     balance = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
 
+    class Meta:
+        constraints = [
+            # One wallet per student and class; also lets get_or_create resolve races
+            models.UniqueConstraint(fields=['owner', 'class_ref'], name='unique_wallet_per_class'),
+        ]
+        indexes = [
+            # The leaderboard reads a class's wallets richest first, see leaderboard.py
+            models.Index(fields=['class_ref', '-balance'], name='wallet_class_balance_idx'),
+        ]
+
     def __str__(self):
         return f"{self.owner.email}'s wallet for {self.class_ref.name}"
     
 
 
 class Transaction(models.Model):
+    CREDIT = 'credit'
+    DEBIT = 'debit'
+    TYPE_CHOICES = [(CREDIT, 'Credit'), (DEBIT, 'Debit')]
+
     wallet = models.ForeignKey('Wallet', on_delete=models.CASCADE, related_name='transactions')
+    # The wallet's class, copied so class-wide history is one index range
+    class_ref = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='transactions')
     date = models.DateTimeField(auto_now_add=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.CharField(max_length=255)
-    transaction_type = models.CharField(max_length=10, choices=[('credit', 'Credit'), ('debit', 'Debit')])
+    transaction_type = models.CharField(max_length=10, choices=TYPE_CHOICES)
+
+    class Meta:
+        indexes = [
+            # History is read newest first, keyed on (date, id); see pagination.KeysetPage
+            models.Index(fields=['wallet', '-date', '-id'], name='transaction_wallet_recent_idx'),
+            models.Index(fields=['class_ref', '-date', '-id'], name='transaction_class_recent_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Ledger entries are append-only; corrections are posted as new entries
+        if self.pk is not None and not self._state.adding:
+            raise ValueError("Ledger entries cannot be modified.")
+        if self.class_ref_id is None:
+            self.class_ref_id = self.wallet.class_ref_id
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.transaction_type} of {self.amount} on {self.date.strftime('%Y-%m-%d')} for {self.wallet.owner.email}"
-    
+
+
+class BalanceCheckpoint(models.Model):
+    """
+    A wallet's balance according to its ledger, up to and including
+    `last_transaction`. Reconciliation only sums the entries posted after the
+    latest checkpoint; see class/reconciliation.py.
+    """
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='checkpoints')
+    balance = models.DecimalField(max_digits=10, decimal_places=2)
+    # None when the wallet had no entries yet
+    last_transaction = models.ForeignKey(Transaction, null=True, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['wallet', '-created_at'], name='checkpoint_wallet_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.balance} for wallet {self.wallet_id} at {self.created_at:%Y-%m-%d %H:%M}"
+
 from django.db import models
 from django.conf import settings
 
@@ -63,8 +135,13 @@ class Item(models.Model):
     price = models.DecimalField(max_digits=6, decimal_places=2)
     image = models.ImageField(upload_to='byte_bazaar_items/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     class_ref = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='class_items')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['class_ref', 'created_at'], name='item_class_created_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -84,5 +161,14 @@ class PurchaseRequest(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     requested_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['class_ref', 'status', 'requested_at'], name='purchase_class_status_idx'),
+            # The teacher's approval queue only ever reads pending requests
+            models.Index(
+                fields=['class_ref', 'requested_at'], condition=models.Q(status='pending'), name='purchase_pending_queue_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"Purchase request for {self.item.name} by {self.student.username}"
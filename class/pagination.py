@@ -0,0 +1,88 @@
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorPage(CursorPagination):
+    """
+    Keyset pagination: each page is `WHERE <ordering> > <cursor> LIMIT n`, so
+    fetching a page costs the same however deep into the list it is. The
+    ordering must be an indexed column whose value never changes.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = 'id'
+
+
+class RosterPage(CursorPage):
+    ordering = 'email'
+
+
+class ItemPage(CursorPage):
+    # Catalog in the order items were added; indexed with class_ref
+    ordering = 'created_at'
+
+
+class PurchaseQueuePage(CursorPage):
+    # Oldest requests first, as teachers work through the queue
+    ordering = 'requested_at'
+
+
+class KeysetPage(BasePagination):
+    """
+    Newest-first keyset pagination on (date, id) for ledger history. A page
+    is `WHERE date <= d AND (date < d OR id < i) ORDER BY date DESC, id DESC
+    LIMIT n`, which an index on (<scope>, -date, -id) answers as one range
+    scan however deep the page is. Only forward links are provided.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+        if position is not None:
+            date, pk = position
+            queryset = queryset.filter(date__lte=date).filter(Q(date__lt=date) | Q(pk__lt=pk))
+
+        rows = list(queryset.order_by('-date', '-pk')[:size + 1])
+        self.next_position = (rows[size - 1].date, rows[size - 1].pk) if len(rows) > size else None
+        return rows[:size]
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            date, pk = urlsafe_b64decode(encoded.encode('ascii')).decode('ascii').split('|')
+            return datetime.fromisoformat(date), int(pk)
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        date, pk = self.next_position
+        cursor = urlsafe_b64encode(f'{date.isoformat()}|{pk}'.encode('ascii')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
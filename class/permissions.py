@@ -0,0 +1,42 @@
+from rest_framework import permissions
+
+from . import membership
+
+
+# Custom permission to allow only teachers to create classes
+class IsTeacher(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.role == 'teacher'
+
+
+class IsStudent(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.role == 'student'
+
+
+class ReadOnly(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return request.method in permissions.SAFE_METHODS
+
+
+class _ClassPermission(permissions.BasePermission):
+    """Checks the class named by the view's `class_id` URL argument against the membership cache."""
+
+    def has_permission(self, request, view):
+        class_id = view.kwargs.get('class_id')
+        return class_id is not None and self.check(request.user, class_id)
+
+
+class IsClassTeacher(_ClassPermission):
+    message = "You are not the teacher of this class."
+    check = staticmethod(membership.is_teacher)
+
+
+class IsClassStudent(_ClassPermission):
+    message = "You are not enrolled in this class."
+    check = staticmethod(membership.is_student)
+
+
+class IsClassMember(_ClassPermission):
+    message = "You are not a member of this class."
+    check = staticmethod(membership.is_member)
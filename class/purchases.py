@@ -0,0 +1,111 @@
+"""
+Purchase request approval.
+
+A purchase request only ever leaves the 'pending' state once: the status
+change is a guarded UPDATE (WHERE status = 'pending') and, for approvals, it
+commits together with the conditional wallet debit from the ledger. Whichever
+caller loses a race gets PurchaseConflict instead of a double charge.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from . import ledger
+from .models import PurchaseRequest, Wallet
+
+
+class PurchaseConflict(Exception):
+    pass
+
+
+def approve(purchase_request):
+    """Approve a pending request and debit the student's wallet atomically."""
+    wallet = Wallet.objects.get(owner_id=purchase_request.student_id, class_ref_id=purchase_request.class_ref_id)
+
+    with transaction.atomic():
+        _claim(purchase_request, 'approved')
+        # Raises InsufficientFunds, which rolls the status change back too
+        ledger.debit(wallet, purchase_request.amount, description=f"Purchase request #{purchase_request.id}")
+
+    purchase_request.status = 'approved'
+    return wallet
+
+
+def decline(purchase_request):
+    """Decline a pending request."""
+    _claim(purchase_request, 'declined')
+    purchase_request.status = 'declined'
+
+
+def _claim(purchase_request, new_status):
+    claimed = PurchaseRequest.objects.filter(pk=purchase_request.pk, status='pending').update(status=new_status)
+    if not claimed:
+        raise PurchaseConflict("This purchase request has already been processed.")
+
+
+def process_batch(teacher, request_ids, action):
+    """
+    Approve or decline many purchase requests of `teacher`'s classes at once.
+
+    Everything runs in one transaction. The requests and the affected wallets
+    are each locked once, in primary key order so that two overlapping batches
+    cannot deadlock. Returns one result dict per requested id, in input order.
+    """
+    new_status = {'approve': 'approved', 'decline': 'declined'}[action]
+    outcomes = {}
+
+    with transaction.atomic():
+        requests = list(
+            PurchaseRequest.objects.select_for_update(of=('self',))
+            .filter(pk__in=request_ids, class_ref__teacher=teacher)
+            .order_by('pk')
+        )
+        pending = []
+        for purchase_request in requests:
+            if purchase_request.status == 'pending':
+                pending.append(purchase_request)
+            else:
+                outcomes[purchase_request.pk] = 'conflict'
+
+        if action == 'approve':
+            done, debits = _affordable(pending, outcomes)
+            ledger.bulk_debit(debits)
+        else:
+            done = pending
+
+        PurchaseRequest.objects.filter(pk__in=[purchase_request.pk for purchase_request in done]).update(status=new_status)
+        for purchase_request in done:
+            outcomes[purchase_request.pk] = new_status
+
+    return [{'id': request_id, 'status': outcomes.get(request_id, 'not_found')} for request_id in request_ids]
+
+
+def _affordable(pending, outcomes):
+    """
+    Lock the wallets of `pending` and pick, in order, the requests their
+    balances cover. Returns (those requests, their ledger.bulk_debit triples).
+    """
+    if not pending:
+        return [], []
+
+    owners = Q()
+    for purchase_request in pending:
+        owners |= Q(owner_id=purchase_request.student_id, class_ref_id=purchase_request.class_ref_id)
+    wallets = {
+        (wallet.owner_id, wallet.class_ref_id): wallet
+        for wallet in Wallet.objects.select_for_update().filter(owners).order_by('pk')
+    }
+
+    approved, debits, left = [], [], {}
+    for purchase_request in pending:
+        wallet = wallets.get((purchase_request.student_id, purchase_request.class_ref_id))
+        if wallet is None:
+            outcomes[purchase_request.pk] = 'wallet_not_found'
+            continue
+        balance = left.get(wallet.pk, wallet.balance)
+        if balance < purchase_request.amount:
+            outcomes[purchase_request.pk] = 'insufficient_balance'
+        else:
+            left[wallet.pk] = balance - purchase_request.amount
+            approved.append(purchase_request)
+            debits.append((wallet, purchase_request.amount, f"Purchase request #{purchase_request.id}"))
+    return approved, debits
@@ -0,0 +1,105 @@
+"""
+Query plan checks.
+
+QUERY_PATHS lists the ORM queries behind the views, built the way the views
+build them (fastpath's `.values()` reads, sparse.shape), each from a sample
+dict shaped like perksway.testing.seed_class()'s result. The explain_queries
+management command runs EXPLAIN on each of them and flags full table scans.
+Add an entry here whenever a view gains a new query.
+"""
+import re
+
+from django.db.models import Count, Max, Sum
+
+from perksway import sparse
+from users.models import CustomUser
+from . import dashboard, exports, fastpath, leaderboard, querysets
+from .models import BalanceCheckpoint, Class, Group, GroupMembership, Item, PurchaseRequest, Wallet
+from .serializers import ClassSerializer, TransactionSerializer
+
+# Views fetch one page more than they show, to know whether there is a next one
+PAGE = 51
+
+
+def _classes():
+    # As ClassListView.get_queryset serves them without ?fields=
+    return sparse.shape(querysets.classes(), ClassSerializer(many=True), 'id')
+
+
+def _transactions():
+    # As the transaction history views serve them without ?fields=
+    return sparse.shape(querysets.transactions(), TransactionSerializer(many=True), 'date')
+
+QUERY_PATHS = {
+    'class list (teacher)': lambda s: _classes().filter(teacher=s['teacher']).order_by('id')[:PAGE],
+    'class list (student)': lambda s: _classes().filter(students=s['students'][0]).order_by('id')[:PAGE],
+    'classes taught (membership cache)': lambda s: Class.objects.filter(teacher_id=s['teacher'].id).values_list('id'),
+    'classes joined (membership cache)': lambda s: (
+        Class.students.through.objects.filter(customuser_id=s['students'][0].id).values_list('class_id')
+    ),
+    'groups joined (membership cache)': lambda s: Group.objects.filter(students=s['students'][0].id).values_list('class_ref_id', 'id'),
+    'class roster': lambda s: CustomUser.objects.filter(joined_classes=s['class'].id).order_by('email')[:PAGE],
+    'groups in class': lambda s: fastpath.GROUPS.values(Group.objects.filter(class_ref=s['class']), 'id').order_by('id')[:PAGE],
+    'group students': lambda s: fastpath.GROUP_STUDENTS.values(
+        CustomUser.objects.filter(joined_groups__in=[group.id for group in s['groups']]), 'joined_groups',
+    ),
+    'group of student in class': lambda s: (
+        GroupMembership.objects.filter(class_ref=s['class'], student__in=s['students'][:5]).values_list('student_id')
+    ),
+    'items in class': lambda s: (
+        fastpath.ITEMS.values(Item.objects.filter(class_ref=s['class']), 'created_at').order_by('created_at')[:PAGE]
+    ),
+    'purchase queue': lambda s: (
+        fastpath.PURCHASE_REQUESTS.values(PurchaseRequest.objects.filter(class_ref=s['class'], status='pending'), 'requested_at')
+        .order_by('requested_at')[:PAGE]
+    ),
+    'wallet of student': lambda s: Wallet.objects.filter(owner=s['students'][0], class_ref=s['class']),
+    'wallet transactions': lambda s: (
+        _transactions().filter(wallet__owner=s['students'][0], wallet__class_ref=s['class'])
+        .order_by('-date', '-pk')[:PAGE]
+    ),
+    'class transactions': lambda s: (
+        _transactions().filter(class_ref=s['class'], transaction_type='credit').order_by('-date', '-pk')[:PAGE]
+    ),
+    'latest checkpoint of wallet': lambda s: (
+        BalanceCheckpoint.objects.filter(wallet__owner=s['students'][0], wallet__class_ref=s['class'])
+        .order_by('-created_at', '-pk')[:1]
+    ),
+    'class leaderboard': lambda s: leaderboard.wallets_by_balance(s['class'].id),
+    'dashboard classes': lambda s: Class.objects.filter(teacher=s['teacher']).annotate(n=Count('students')).values('id', 'n'),
+    'dashboard groups': lambda s: (
+        Group.objects.filter(class_ref_id__in=[s['class'].id]).values('class_ref_id').annotate(n=Count('pk'), p=Sum('pending_count'))
+    ),
+    'dashboard purchases': lambda s: (
+        PurchaseRequest.objects.filter(class_ref_id__in=[s['class'].id], status='pending').values('class_ref_id').annotate(n=Count('pk'))
+    ),
+    'dashboard wallets': lambda s: (
+        Wallet.objects.filter(class_ref_id__in=[s['class'].id]).values('class_ref_id').annotate(total=Sum('balance'))
+    ),
+    'student home classes': lambda s: dashboard.student_home(s['students'][0]),
+    'transactions export': lambda s: exports.transactions(s['class'].id),
+    'purchases export': lambda s: exports.purchases(s['class'].id),
+    'roster export': lambda s: exports.roster(s['class'].id),
+    # versions.py, as grouped queries since EXPLAIN needs a queryset rather than aggregate()'s dict
+    'item list version': lambda s: (
+        Item.objects.filter(class_ref=s['class']).values('class_ref_id').annotate(n=Count('pk'), latest=Max('updated_at'))
+    ),
+    'group list version': lambda s: (
+        Group.objects.filter(class_ref=s['class']).values('class_ref_id').annotate(n=Count('pk'), latest=Max('updated_at'))
+    ),
+    'group version': lambda s: Group.objects.filter(pk=s['groups'][0].id).values_list('updated_at'),
+}
+
+_FULL_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    # "SCAN table" without "USING ... INDEX" reads the whole table
+    'sqlite': re.compile(r'\bSCAN (\w+)(?!.*USING)'),
+}
+
+
+def full_scans(plan, vendor):
+    """Return the tables `plan` reads in full, or None if the backend is not supported."""
+    pattern = _FULL_SCAN.get(vendor)
+    if pattern is None:
+        return None
+    return [match.group(1) for match in pattern.finditer(plan)]
@@ -0,0 +1,42 @@
+"""
+Shared querysets for the class views.
+
+Each builder returns a queryset that already joins or prefetches everything
+its serializer reads, so a list costs the same number of queries no matter
+how many rows it returns. The class and transaction views start from these,
+narrowed to the requested fields by sparse.shape. The group list, catalog and
+purchase queue are read with `.values()` instead (see fastpath.py);
+`groups()` and `purchase_requests()` are the serializer path their output is
+checked against, in test_fastpath.py and the benchmark_lists command.
+"""
+from django.db.models import Prefetch
+
+from users.models import CustomUser
+from .models import Class, Group, PurchaseRequest, Transaction
+
+# Columns read by serializers.UserSerializer
+USER_FIELDS = ('id', 'email', 'first_name', 'last_name', 'role')
+
+
+def _students(*fields):
+    return Prefetch('students', queryset=CustomUser.objects.only(*fields))
+
+
+def classes():
+    """Classes for ClassSerializer, which shows the teacher's email."""
+    return Class.objects.select_related('teacher')
+
+
+def groups():
+    """Groups for GroupSerializer with their students; the reference for fastpath.GROUPS."""
+    return Group.objects.prefetch_related(_students(*USER_FIELDS))
+
+
+def purchase_requests():
+    """Purchase requests for PurchaseRequestSerializer; the reference for fastpath.PURCHASE_REQUESTS."""
+    return PurchaseRequest.objects.select_related('student', 'item', 'class_ref')
+
+
+def transactions():
+    """Ledger entries for TransactionSerializer, which shows the wallet's owner."""
+    return Transaction.objects.select_related('wallet')
@@ -0,0 +1,151 @@
+"""
+Wallet reconciliation.
+
+Wallet.balance moves in the same database transaction as the ledger entry
+recording the movement (see ledger.py), so it should always equal what the
+wallet's entries add up to. Rather than summing the whole ledger to check
+that, each run starts from the wallet's latest BalanceCheckpoint, sums only
+the entries posted since, reports wallets whose balance differs and records
+a new checkpoint. Repairs leave the balance alone and post a correcting entry
+for the difference through ledger.py, so the ledger stays append-only and the
+repair itself reconciles. Wallets are checked in chunks, one transaction per
+chunk, on several threads if asked to.
+
+A chunk's wallets are locked while it is checked. Every posting updates or
+locks its wallet row before writing its entry, so while the lock is held no
+entry of those wallets is still in flight, and a checkpoint can never miss
+one that commits later with a lower id.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Case, DecimalField, F, Max, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from . import ledger
+from .models import BalanceCheckpoint, Transaction, Wallet
+
+CHUNK_SIZE = 500
+WORKERS = 4
+
+CENT = Decimal('0.01')
+
+REPAIR_DESCRIPTION = "Reconciliation correction"
+
+
+def _signed_amount():
+    return Case(
+        When(transaction_type=Transaction.DEBIT, then=-F('amount')),
+        default=F('amount'),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def balance_as_of(wallet, moment):
+    """
+    The wallet's balance according to its ledger at `moment`: the latest
+    checkpoint taken by then plus the entries posted after it, up to `moment`.
+    Before the wallet's first checkpoint only its entries count.
+    """
+    checkpoint = (
+        wallet.checkpoints.filter(created_at__lte=moment).order_by('-created_at', '-pk')
+        .values_list('balance', 'last_transaction_id').first()
+    )
+    balance, last_transaction_id = checkpoint or (Decimal('0.00'), None)
+    entries = wallet.transactions.filter(date__lte=moment)
+    if last_transaction_id is not None:
+        entries = entries.filter(pk__gt=last_transaction_id)
+    total = entries.aggregate(total=Sum(_signed_amount()))['total'] or 0
+    return (balance + total).quantize(CENT)
+
+
+def reconcile(wallets=None, workers=1, chunk_size=CHUNK_SIZE, repair=False, progress=None):
+    """
+    Check `wallets` (a Wallet queryset, default: all) against their ledger
+    and checkpoint them. With `repair`, each drifted wallet gets a ledger
+    entry for the difference. `progress(checked)` is called after every chunk.
+
+    Returns (number of wallets checked, drift), drift being one dict per
+    wallet whose balance differed: wallet_id, owner_id, class_id, balance
+    and expected.
+    """
+    queryset = Wallet.objects.all() if wallets is None else wallets
+    chunks = _chunks(queryset, chunk_size)
+    checked, drift = 0, []
+
+    def collect(results):
+        nonlocal checked
+        for count, drifted in results:
+            checked += count
+            drift.extend(drifted)
+            if progress is not None:
+                progress(checked)
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            collect(pool.map(lambda ids: _in_thread(_reconcile_chunk, ids, repair), chunks))
+    else:
+        collect(_reconcile_chunk(ids, repair) for ids in chunks)
+    return checked, drift
+
+
+def _chunks(queryset, size):
+    last = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True)[:size])
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+def _in_thread(function, *args):
+    # Each thread has its own connection, which would otherwise stay open
+    try:
+        return function(*args)
+    finally:
+        connection.close()
+
+
+def _reconcile_chunk(wallet_ids, repair):
+    latest = BalanceCheckpoint.objects.filter(wallet_id=OuterRef('pk')).order_by('-created_at', '-pk')
+    since = Transaction.objects.filter(
+        wallet_id=OuterRef('pk'), pk__gt=Coalesce(OuterRef('checkpoint_last'), Value(0)),
+    ).values('wallet_id')
+
+    with transaction.atomic():
+        wallets = list(
+            Wallet.objects.select_for_update().filter(pk__in=wallet_ids).order_by('pk')
+            .annotate(
+                checkpoint_balance=Subquery(latest.values('balance')[:1]),
+                checkpoint_last=Subquery(latest.values('last_transaction_id')[:1]),
+            )
+            .annotate(
+                posted=Subquery(since.annotate(total=Sum(_signed_amount())).values('total')),
+                posted_last=Subquery(since.annotate(last=Max('pk')).values('last')),
+            )
+            .values_list('pk', 'owner_id', 'class_ref_id', 'balance', 'checkpoint_balance', 'checkpoint_last', 'posted', 'posted_last')
+        )
+
+        checkpoints, drift = [], []
+        for wallet_id, owner_id, class_id, balance, checkpoint_balance, checkpoint_last, posted, posted_last in wallets:
+            expected = ((checkpoint_balance or 0) + (posted or 0)).quantize(CENT)
+            if checkpoint_balance is None or posted_last is not None:
+                checkpoints.append(BalanceCheckpoint(
+                    wallet_id=wallet_id, balance=expected, last_transaction_id=posted_last or checkpoint_last,
+                ))
+            if balance != expected:
+                drift.append({
+                    'wallet_id': wallet_id, 'owner_id': owner_id, 'class_id': class_id,
+                    'balance': balance, 'expected': expected,
+                })
+
+        BalanceCheckpoint.objects.bulk_create(checkpoints)
+        if repair:
+            # Posted after the checkpoints, so the next run counts them
+            ledger.post_corrections(
+                [(row['wallet_id'], row['class_id'], row['balance'] - row['expected']) for row in drift],
+                description=REPAIR_DESCRIPTION,
+            )
+    return len(wallets), drift
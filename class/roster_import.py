@@ -0,0 +1,133 @@
+"""
+Streaming roster import.
+
+An uploaded CSV or NDJSON file of student emails is read one line at a time
+and enrolled in chunks: one `email__in` lookup, one bulk insert of
+Class.students rows and one of wallets per chunk, each chunk in its own
+transaction. Outcomes are yielded per row as they are known, so memory use
+does not grow with the size of the file. Bytes that are not UTF-8 are decoded
+as U+FFFD and the rows holding them reported as invalid, since the response has
+already started by the time they are read.
+"""
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from users.models import CustomUser
+from . import leaderboard, membership
+from .models import Class, Wallet
+
+CHUNK_SIZE = 500
+
+ENROLLED = 'enrolled'
+ALREADY_ENROLLED = 'already_enrolled'
+NOT_FOUND = 'not_found'
+NOT_A_STUDENT = 'not_a_student'
+INVALID = 'invalid'
+DUPLICATE = 'duplicate'
+
+
+def read_emails(upload, file_format):
+    """Yield (line number, email or None) for each data line of an uploaded file."""
+    lines = codecs.iterdecode(upload, 'utf-8-sig', errors='replace')
+    rows = _ndjson_emails(lines) if file_format == 'ndjson' else _csv_emails(lines)
+    for line_no, email in rows:
+        yield line_no, None if email and '\ufffd' in email else email
+
+
+def _csv_emails(lines):
+    column = 0
+    for line_no, row in enumerate(csv.reader(lines), start=1):
+        if line_no == 1:
+            header = [cell.strip().lower() for cell in row]
+            if 'email' in header:
+                column = header.index('email')
+                continue
+        if not any(cell.strip() for cell in row):
+            continue
+        yield line_no, row[column].strip() if column < len(row) else None
+
+
+def _ndjson_emails(lines):
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError:
+            yield line_no, None
+            continue
+        if isinstance(value, dict):
+            value = value.get('email')
+        yield line_no, value.strip() if isinstance(value, str) else None
+
+
+def import_roster(class_obj, rows, chunk_size=CHUNK_SIZE):
+    """
+    Enroll the students named by `rows` ((line number, email) pairs) in
+    `class_obj` and give each a wallet. Yields one outcome dict per row.
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield from _import_chunk(class_obj, chunk)
+
+
+def _import_chunk(class_obj, chunk):
+    emails = set()
+    for _, email in chunk:
+        if email:
+            emails.add(CustomUser.objects.normalize_email(email))
+
+    with transaction.atomic():
+        users = {
+            email: (user_id, role)
+            for user_id, email, role in CustomUser.objects.filter(email__in=emails).values_list('id', 'email', 'role')
+        }
+        student_ids = [user_id for user_id, role in users.values() if role == 'student']
+        enrolled = set(
+            Class.students.through.objects.filter(class_id=class_obj.id, customuser_id__in=student_ids)
+            .values_list('customuser_id', flat=True)
+        )
+        joining = [user_id for user_id in student_ids if user_id not in enrolled]
+        # ignore_conflicts: a student may join by class code while the import runs
+        Class.students.through.objects.bulk_create(
+            [Class.students.through(class_id=class_obj.id, customuser_id=user_id) for user_id in joining],
+            ignore_conflicts=True,
+        )
+        Wallet.objects.bulk_create(
+            [Wallet(owner_id=user_id, class_ref_id=class_obj.id) for user_id in joining],
+            ignore_conflicts=True,
+        )
+    # Rows written directly do not send m2m_changed, see membership.py
+    membership.invalidate(*joining)
+    if joining:
+        leaderboard.invalidate(class_obj.id)
+
+    seen = set()
+    for line_no, email in chunk:
+        yield {'line': line_no, 'email': email, 'status': _outcome(email, users, enrolled, seen)}
+
+
+def _outcome(email, users, enrolled, seen):
+    try:
+        validate_email(email)
+    except ValidationError:
+        return INVALID
+    email = CustomUser.objects.normalize_email(email)
+    if email in seen:
+        return DUPLICATE
+    seen.add(email)
+    if email not in users:
+        return NOT_FOUND
+    user_id, role = users[email]
+    if role != 'student':
+        return NOT_A_STUDENT
+    return ALREADY_ENROLLED if user_id in enrolled else ENROLLED
@@ -1,30 +1,48 @@
+from decimal import Decimal
 from rest_framework import serializers
-from .models import Class, Group, Item, PurchaseRequest, Wallet
+from .models import Class, Group, Item, PurchaseRequest, Transaction, Wallet
+from . import exports, leaderboard
+from perksway.sparse import SparseFieldsMixin
 from users.models import CustomUser
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = ['id', 'email', 'first_name', 'last_name', 'role']
 
-class ClassSerializer(serializers.ModelSerializer):
+class ClassSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     teacher = serializers.ReadOnlyField(source='teacher.email')  # Teacher's email will be read-only
-    students = serializers.StringRelatedField(many=True, read_only=True)  # Student names in the response
+    # The roster is served separately (ClassRosterView), one page at a time, unless asked for with ?expand=students
 
     class Meta:
         model = Class
-        fields = ['id', 'name', 'description', 'class_code', 'teacher', 'students']
-        read_only_fields = ['teacher', 'students']
+        fields = ['id', 'name', 'description', 'class_code', 'teacher']
+        read_only_fields = ['teacher']
+        expandable = {
+            'teacher': lambda: UserSerializer(read_only=True),
+            'students': lambda: UserSerializer(many=True, read_only=True),
+        }
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     students = UserSerializer(many=True, read_only=True)  # Display students in the response
 
     class Meta:
         model = Group
-        fields = ['id', 'name', 'description', 'class_ref', 'creator', 'students', 'created_at', 'updated_at']
-        read_only_fields = ['creator', 'students']  # Make creator and students read-only
+        fields = [
+            'id', 'name', 'description', 'class_ref', 'creator', 'students', 'student_count', 'pending_count',
+            'created_at', 'updated_at',
+        ]
+        read_only_fields = ['creator', 'students', 'student_count', 'pending_count']  # Make creator, students and counters read-only
+        expandable = {'creator': lambda: UserSerializer(read_only=True)}
 
-class GroupDetailSerializer(serializers.ModelSerializer):
+class GroupUpdateSerializer(GroupSerializer):
+    # A group stays in the class it was created in; its memberships are recorded against that class
+    class Meta(GroupSerializer.Meta):
+        # max_students is not among the fields, so it cannot be lowered below the members here;
+        # the admin checks it against them (see admin.GroupMembershipFormSet)
+        read_only_fields = [*GroupSerializer.Meta.read_only_fields, 'class_ref']
+
+class GroupDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     students = UserSerializer(many=True)  # Serialize the students as a nested field
 
     class Meta:
@@ -32,6 +50,10 @@ class GroupDetailSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'created_at', 'updated_at', 'students']
 
 
+# Groups are inserted in batches, so this only guards against runaway requests
+MAX_BULK_GROUPS = 10000
+
+
 class BulkGroupCreateSerializer(serializers.Serializer):
     number_of_groups = serializers.IntegerField(min_value=1)
     group_name_prefix = serializers.CharField(max_length=100)
@@ -39,22 +61,58 @@ class BulkGroupCreateSerializer(serializers.Serializer):
     requires_approval = serializers.BooleanField(default=False)
 
     def validate(self, data):
-        # Ensure a sensible number of groups is requested (optional validation)
-        if data['number_of_groups'] > 100:  # Arbitrary limit to prevent excessive group creation
+        # Ensure a sensible number of groups is requested
+        if data['number_of_groups'] > MAX_BULK_GROUPS:
             raise serializers.ValidationError("Too many groups requested.")
         return data
-    
-class ItemSerializer(serializers.ModelSerializer):
+
+
+class ClassGroupsCreateSerializer(BulkGroupCreateSerializer):
+    class_id = serializers.IntegerField()
+
+
+class MultiClassGroupCreateSerializer(serializers.Serializer):
+    classes = ClassGroupsCreateSerializer(many=True, allow_empty=False)
+
+    def validate_classes(self, value):
+        if sum(spec['number_of_groups'] for spec in value) > MAX_BULK_GROUPS:
+            raise serializers.ValidationError("Too many groups requested.")
+        return value
+
+
+class ItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Item
         fields = ['id', 'name', 'description', 'price', 'image', 'class_ref']
 
+class WalletCreditSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+
+
+class BulkWalletCreditSerializer(serializers.Serializer):
+    # Either a list of per-student credits, or one amount for the whole class
+    credits = WalletCreditSerializer(many=True, required=False)
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'), required=False)
+    description = serializers.CharField(max_length=255, required=False, default="Class reward")
+
+    def validate(self, data):
+        if ('credits' in data) == ('amount' in data):
+            raise serializers.ValidationError("Provide either 'credits' or 'amount', not both.")
+        if 'credits' in data:
+            if not data['credits']:
+                raise serializers.ValidationError("'credits' must not be empty.")
+            emails = [entry['email'].lower() for entry in data['credits']]
+            if len(emails) != len(set(emails)):
+                raise serializers.ValidationError("Each student may only appear once in 'credits'.")
+        return data
+
 class WalletSerializer(serializers.ModelSerializer):
     class Meta:
         model = Wallet
         fields = ['id', 'balance']
 
-class PurchaseRequestSerializer(serializers.ModelSerializer):
+class PurchaseRequestSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     student = serializers.StringRelatedField()  # Display the username of the student
     item = serializers.StringRelatedField()  # Display the name of the item
     class_ref = serializers.StringRelatedField()  # Display the name of the class (optional)
@@ -62,4 +120,84 @@ class PurchaseRequestSerializer(serializers.ModelSerializer):
     class Meta:
         model = PurchaseRequest
         fields = ['id', 'student', 'item', 'amount', 'status', 'requested_at', 'class_ref']
-        read_only_fields = ['id', 'student', 'item', 'requested_at', 'class_ref']
\ No newline at end of file
+        read_only_fields = ['id', 'student', 'item', 'requested_at', 'class_ref']
+        expandable = {
+            'student': lambda: UserSerializer(read_only=True),
+            'item': lambda: ItemSerializer(read_only=True),
+        }
+
+
+class GroupAssignmentSerializer(serializers.Serializer):
+    strategy = serializers.ChoiceField(choices=['balanced', 'random', 'pending'], default='balanced')
+    seed = serializers.IntegerField(required=False)  # Makes a random assignment reproducible
+
+
+class TransactionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    student = serializers.UUIDField(source='wallet.owner_id', read_only=True)
+
+    class Meta:
+        model = Transaction
+        fields = ['id', 'date', 'amount', 'transaction_type', 'description', 'student']
+
+
+class TransactionFilterSerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=Transaction.TYPE_CHOICES, required=False)
+    since = serializers.DateTimeField(required=False)  # Inclusive
+    until = serializers.DateTimeField(required=False)  # Exclusive
+    student = serializers.UUIDField(required=False)  # Teachers only: whose wallet to show
+
+
+class BalanceQuerySerializer(serializers.Serializer):
+    as_of = serializers.DateTimeField(required=False)  # The ledger balance at this moment
+
+
+class StudentHomePurchaseSerializer(serializers.ModelSerializer):
+    item = serializers.StringRelatedField()
+
+    class Meta:
+        model = PurchaseRequest
+        fields = ['id', 'item', 'amount', 'requested_at']
+
+
+class StudentHomeSerializer(serializers.ModelSerializer):
+    # Classes from dashboard.student_home()
+    teacher = serializers.ReadOnlyField(source='teacher.email')
+    balance = serializers.DecimalField(max_digits=10, decimal_places=2, allow_null=True)
+    group = serializers.SerializerMethodField()
+    pending_purchases = StudentHomePurchaseSerializer(source='my_pending_purchases', many=True)
+    item_count = serializers.IntegerField()
+
+    class Meta:
+        model = Class
+        fields = ['id', 'name', 'class_code', 'teacher', 'balance', 'group', 'pending_purchases', 'item_count']
+
+    def get_group(self, obj):
+        return {'id': obj.my_groups[0].id, 'name': obj.my_groups[0].name} if obj.my_groups else None
+
+
+class TeacherDashboardSerializer(serializers.Serializer):
+    # Rows of dashboard.teacher_dashboard()
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    class_code = serializers.CharField()
+    student_count = serializers.IntegerField()
+    group_count = serializers.IntegerField()
+    pending_join_count = serializers.IntegerField()
+    pending_purchase_count = serializers.IntegerField()
+    total_balance = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class LeaderboardQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=leaderboard.MAX_LIMIT, default=leaderboard.DEFAULT_LIMIT)
+
+
+class ExportSerializer(serializers.Serializer):
+    file_format = serializers.ChoiceField(choices=exports.FORMATS, default=exports.CSV)
+    gzip = serializers.BooleanField(default=False)
+    since = serializers.DateTimeField(required=False)  # Inclusive
+    until = serializers.DateTimeField(required=False)  # Exclusive
+
+
+class BatchPurchaseActionSerializer(serializers.Serializer):
+    request_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000)
+    action = serializers.ChoiceField(choices=['approve', 'decline'])
@@ -0,0 +1,46 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import leaderboard, membership
+from .models import Class, Group, Wallet
+
+
+def _invalidate_m2m(instance, action, reverse, model, pk_set, **kwargs):
+    """Drop cached memberships of the users on either side of an M2M change."""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # user.joined_classes / user.joined_groups changed
+        membership.invalidate(instance.pk)
+    elif action == 'pre_clear':
+        membership.invalidate(*instance.students.values_list('id', flat=True))
+    else:
+        membership.invalidate(*pk_set)
+
+
+m2m_changed.connect(_invalidate_m2m, sender=Class.students.through, dispatch_uid='class_students_membership')
+m2m_changed.connect(_invalidate_m2m, sender=Group.students.through, dispatch_uid='group_students_membership')
+
+
+@receiver(post_save, sender=Class, dispatch_uid='class_saved_membership')
+def class_saved(sender, instance, created, **kwargs):
+    if created:
+        membership.invalidate(instance.teacher_id)
+
+
+@receiver(pre_delete, sender=Class, dispatch_uid='class_deleted_membership')
+def class_deleted(sender, instance, **kwargs):
+    membership.invalidate(instance.teacher_id, *instance.students.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Group, dispatch_uid='group_deleted_membership')
+def group_deleted(sender, instance, **kwargs):
+    membership.invalidate(*instance.students.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Wallet, dispatch_uid='wallet_saved_leaderboard')
+@receiver(post_delete, sender=Wallet, dispatch_uid='wallet_deleted_leaderboard')
+def wallet_changed(sender, instance, **kwargs):
+    # Balance moves go through ledger.py, which invalidates by itself; this
+    # catches wallets created by joining a class or edited in the admin
+    leaderboard.invalidate(instance.class_ref_id)
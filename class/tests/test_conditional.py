@@ -0,0 +1,90 @@
+import datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from perksway.testing import seed_class
+from .. import groups, ledger
+from ..models import Group, Item, Wallet
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seed = seed_class(students=10, groups=2, group_size=3, items=3, purchases=0)
+        cls.class_obj = cls.seed['class']
+        cls.student = cls.seed['students'][-1]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.seed['teacher'])
+
+    def url(self, path):
+        return f'/api/v1/classes/{path}'
+
+    def assertNotModified(self, url, tag, queries, **params):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], tag)
+        self.assertEqual(response.content, b'')
+
+    def test_item_list(self):
+        url = self.url(f'{self.class_obj.id}/items/')
+        tag = self.client.get(url)['ETag']
+        # Just the version query, after the cached membership check
+        self.assertNotModified(url, tag, 1)
+        self.assertNotEqual(self.client.get(url, {'fields': 'id'})['ETag'], tag)
+
+        item = self.seed['items'][0]
+        self.client.put(self.url(f'{self.class_obj.id}/items/{item.id}/'), {'price': '7.00'}, format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], tag)
+
+        tag = response['ETag']
+        Item.objects.filter(pk=item.pk).delete()
+        self.assertNotEqual(self.client.get(url)['ETag'], tag)
+
+    def test_group_list_follows_membership(self):
+        url = self.url(f'group/all-groups/{self.class_obj.id}/')
+        tag = self.client.get(url)['ETag']
+        self.assertNotModified(url, tag, 1)
+
+        groups.join(Group.objects.get(pk=self.seed['groups'][1].pk), self.student)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.student.email, [student['email'] for group in response.data['results'] for student in group['students']])
+
+    def test_group_detail(self):
+        group = self.seed['groups'][0]
+        url = self.url(f'group/details/{group.id}/')
+        response = self.client.get(url)
+        updated_at = Group.objects.get(pk=group.pk).updated_at
+        self.assertEqual(response['Last-Modified'], http_date(updated_at.timestamp()))
+        self.assertNotModified(url, response['ETag'], 1)
+
+        # A change within the same second keeps Last-Modified, but not the ETag
+        Group.objects.filter(pk=group.pk).update(
+            name='Renamed', updated_at=updated_at.replace(microsecond=0) + datetime.timedelta(microseconds=999999),
+        )
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Renamed')
+
+        self.assertEqual(self.client.get(self.url('group/details/999999/')).status_code, 404)
+
+    def test_wallet_balance(self):
+        self.client.force_authenticate(self.student)
+        url = self.url(f'wallets/{self.class_obj.id}/balance/')
+        tag = self.client.get(url)['ETag']
+        self.assertNotModified(url, tag, 1)
+
+        ledger.credit(Wallet.objects.get(owner=self.student, class_ref=self.class_obj), Decimal('5.00'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['balance'], Wallet.objects.get(owner=self.student, class_ref=self.class_obj).balance)
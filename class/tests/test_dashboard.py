@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from perksway.testing import create_users
+from users.models import CustomUser
+from .. import groups, ledger
+from ..models import Class, Group, Item, PurchaseRequest
+
+
+class TeacherDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user('teacher@example.com', 'pass', role='teacher')
+        self.maths = Class.objects.create(name='Maths', class_code='MATH1', teacher=self.teacher)
+        self.art = Class.objects.create(name='Art', class_code='ART1', teacher=self.teacher)
+        other = CustomUser.objects.create_user('other@example.com', 'pass', role='teacher')
+        Class.objects.create(name='History', class_code='HIST1', teacher=other)
+
+        self.students = create_users('student', 4)
+        self.maths.students.add(*self.students)
+        ledger.bulk_credit(self.maths.id, {student.id: Decimal('2.50') for student in self.students})
+        red = Group.objects.create(name='Red', class_ref=self.maths, creator=self.teacher, requires_approval=True)
+        Group.objects.create(name='Blue', class_ref=self.maths, creator=self.teacher)
+        groups.join(red, self.students[0])
+        groups.join(red, self.students[1])
+        item = Item.objects.create(name='Pencil', description='HB', price=Decimal('1.00'), class_ref=self.maths)
+        PurchaseRequest.objects.create(student=self.students[0], item=item, class_ref=self.maths, amount=Decimal('1.00'))
+        PurchaseRequest.objects.create(
+            student=self.students[1], item=item, class_ref=self.maths, amount=Decimal('1.00'), status='declined',
+        )
+
+    def test_figures_per_class(self):
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        response = client.get('/api/v1/classes/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['classes'], [
+            {'id': self.maths.id, 'name': 'Maths', 'class_code': 'MATH1', 'student_count': 4, 'group_count': 2,
+             'pending_join_count': 2, 'pending_purchase_count': 1, 'total_balance': '10.00'},
+            {'id': self.art.id, 'name': 'Art', 'class_code': 'ART1', 'student_count': 0, 'group_count': 0,
+             'pending_join_count': 0, 'pending_purchase_count': 0, 'total_balance': '0.00'},
+        ])
+
+    def test_for_teachers_only(self):
+        client = APIClient()
+        client.force_authenticate(self.students[0])
+        self.assertEqual(client.get('/api/v1/classes/dashboard/').status_code, 403)
+
+
+class StudentHomeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = create_users('student', 1)[0]
+        self.classes = []
+        for i in range(3):
+            teacher = CustomUser.objects.create_user(f'teacher{i}@example.com', 'pass', role='teacher')
+            class_obj = Class.objects.create(name=f'Class {i}', class_code=f'C{i}', teacher=teacher)
+            class_obj.students.add(self.student)
+            self.classes.append(class_obj)
+        maths = self.classes[0]
+        ledger.bulk_credit(maths.id, {self.student.id: Decimal('7.00')})
+        group = Group.objects.create(name='Red', class_ref=maths, creator=maths.teacher)
+        groups.join(group, self.student)
+        items = [Item.objects.create(name=f'Item {i}', description='', price=Decimal('1.00'), class_ref=maths) for i in range(2)]
+        PurchaseRequest.objects.create(student=self.student, item=items[0], class_ref=maths, amount=Decimal('1.00'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def test_every_enrolled_class(self):
+        response = self.client.get('/api/v1/classes/home/')
+        self.assertEqual(response.status_code, 200)
+        maths, art, _ = response.data['classes']
+        self.assertEqual((maths['balance'], maths['group']['name'], maths['item_count']), ('7.00', 'Red', 2))
+        self.assertEqual([purchase['item'] for purchase in maths['pending_purchases']], ['Item 0'])
+        self.assertEqual((art['balance'], art['group'], art['pending_purchases'], art['item_count']), (None, None, [], 0))
+        self.assertEqual(art['teacher'], 'teacher1@example.com')
+
+    def test_query_count_does_not_grow_with_classes(self):
+        self.client.get('/api/v1/classes/home/')
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/v1/classes/home/')
+        self.assertEqual(len(context), 3)
+
+    def test_for_students_only(self):
+        self.client.force_authenticate(self.classes[0].teacher)
+        self.assertEqual(self.client.get('/api/v1/classes/home/').status_code, 403)
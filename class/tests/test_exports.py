@@ -0,0 +1,78 @@
+import csv
+import gzip
+import json
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from perksway.testing import create_users
+from users.models import CustomUser
+from .. import exports, groups, ledger
+from ..models import Class, Group, Item, PurchaseRequest, Transaction
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user('teacher@example.com', 'pass', role='teacher')
+        self.class_obj = Class.objects.create(name='Maths', class_code='MATH1', teacher=self.teacher)
+        self.students = create_users('student', 3)
+        self.class_obj.students.add(*self.students)
+        for i in range(5):
+            ledger.bulk_credit(self.class_obj.id, {student.id: Decimal(i + 1) for student in self.students})
+        item = Item.objects.create(name='Pencil, "HB"', description='Sharp', price=Decimal('2.00'), class_ref=self.class_obj)
+        PurchaseRequest.objects.create(student=self.students[0], item=item, class_ref=self.class_obj, amount=Decimal('2.00'))
+        group = Group.objects.create(name='Red', class_ref=self.class_obj, creator=self.teacher)
+        groups.join(group, self.students[1])
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def export(self, kind, query=''):
+        response = self.client.get(f'/api/v1/classes/{self.class_obj.id}/export/{kind}/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_transactions_in_ledger_order(self):
+        response, body = self.export('transactions')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn(f'class-{self.class_obj.id}-transactions.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(StringIO(body.decode())))
+        self.assertEqual([int(row['id']) for row in rows], list(Transaction.objects.order_by('date', 'pk').values_list('pk', flat=True)))
+        self.assertEqual(rows[0]['student'], self.students[0].email)
+
+    def test_ndjson_gzip(self):
+        response, body = self.export('purchases', '?file_format=ndjson&gzip=1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        rows = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+        self.assertEqual([(row['item'], row['amount'], row['status']) for row in rows], [('Pencil, "HB"', '2.00', 'pending')])
+
+    def test_roster(self):
+        _, body = self.export('roster')
+        rows = {row['email']: row for row in csv.DictReader(StringIO(body.decode()))}
+        self.assertEqual(set(rows), {student.email for student in self.students})
+        self.assertEqual([rows[student.email]['group'] for student in self.students], ['', 'Red', ''])
+        self.assertEqual(Decimal(rows[self.students[0].email]['balance']), Decimal('15.00'))
+
+    def test_term_filter_and_chunking(self):
+        latest = Transaction.objects.latest('date').date
+        _, body = self.export('transactions', f'?until={latest.isoformat().replace("+00:00", "Z")}&file_format=ndjson')
+        self.assertEqual(len(body.splitlines()), Transaction.objects.filter(date__lt=latest).count())
+        # Small chunks produce the same bytes as one large chunk
+        chunks = list(exports.stream('transactions', self.class_obj.id, chunk_size=4))
+        self.assertGreater(len(chunks), 4)
+        self.assertEqual(b''.join(chunks), b''.join(exports.stream('transactions', self.class_obj.id)))
+
+    def test_for_the_teacher_only(self):
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.client.get(f'/api/v1/classes/{self.class_obj.id}/export/roster/').status_code, 403)
+        self.client.force_authenticate(self.teacher)
+        self.assertEqual(self.client.get(f'/api/v1/classes/{self.class_obj.id}/export/grades/').status_code, 404)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('export_class', self.class_obj.id, 'transactions', '--format', 'ndjson', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 15)
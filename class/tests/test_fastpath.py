@@ -0,0 +1,103 @@
+import datetime
+import uuid
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from perksway.renderers import ORJSONRenderer
+from perksway.testing import seed_class
+from .. import fastpath, querysets
+from ..models import Group, Item, PurchaseRequest
+from ..serializers import GroupSerializer, ItemSerializer, PurchaseRequestSerializer
+
+
+class FastPathTests(TestCase):
+    """The fast path must render exactly what the serializers rendered."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seed = seed_class(students=40, groups=6, group_size=5, items=8, purchases=12)
+        cls.class_obj = cls.seed['class']
+        Group.objects.filter(pk=cls.seed['groups'][0].pk).update(description='Line\u2028break, café \U0001f600')
+        Item.objects.filter(pk=cls.seed['items'][0].pk).update(image='byte_bazaar_items/pencil.png', price=Decimal('1.5'))
+        Item.objects.filter(pk=cls.seed['items'][1].pk).update(name='Crème "brûlée"')
+
+    def setUp(self):
+        cache.clear()
+
+    def assertSameBytes(self, fast, serialized):
+        self.assertEqual(ORJSONRenderer().render(fast), JSONRenderer().render(serialized))
+
+    def test_groups(self):
+        groups = Group.objects.filter(class_ref=self.class_obj).order_by('id')
+        self.assertSameBytes(
+            fastpath.groups(fastpath.GROUPS.values(groups)),
+            GroupSerializer(querysets.groups().filter(class_ref=self.class_obj).order_by('id'), many=True).data,
+        )
+
+    def test_items(self):
+        items = Item.objects.filter(class_ref=self.class_obj).order_by('created_at')
+        self.assertSameBytes(fastpath.ITEMS.render(fastpath.ITEMS.values(items)), ItemSerializer(items, many=True).data)
+
+    def test_purchase_requests(self):
+        requests = PurchaseRequest.objects.filter(class_ref=self.class_obj, status='pending').order_by('requested_at')
+        self.assertSameBytes(
+            fastpath.PURCHASE_REQUESTS.render(fastpath.PURCHASE_REQUESTS.values(requests)),
+            PurchaseRequestSerializer(querysets.purchase_requests().filter(pk__in=requests), many=True).data,
+        )
+
+    def test_endpoints_page_through_dicts(self):
+        client = APIClient()
+        client.force_authenticate(self.seed['teacher'])
+        url = f'/api/v1/classes/{self.class_obj.id}/items/?page_size=3'
+        seen = []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, [item.id for item in self.seed['items']])
+
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_lists', class_id=self.class_obj.id, repeat=1, stdout=out)
+        self.assertEqual(out.getvalue().count('x the throughput'), 3)
+
+
+class ORJSONRendererTests(TestCase):
+    def assertSameBytes(self, data, **kwargs):
+        self.assertEqual(ORJSONRenderer().render(data, **kwargs), JSONRenderer().render(data, **kwargs))
+
+    def test_matches_json_renderer(self):
+        self.assertSameBytes({
+            'text': 'café \U0001f600 \u2028\u2029 "quoted" \\ </script>',
+            'numbers': [0, -1, 2 ** 40, 1.5, Decimal('2.50')],
+            'when': datetime.datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+            'day': datetime.date(2026, 1, 2),
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'lazy': gettext_lazy('Not found.'),
+            'nested': {'tuple': (1, 2), 'empty': [], 'none': None, 'flag': True},
+            1: 'integer key',
+        })
+        self.assertSameBytes(None)
+
+    def test_falls_back(self):
+        self.assertSameBytes({'big': 2 ** 70})
+        self.assertSameBytes({'a': [1, 2]}, accepted_media_type='application/json; indent=4')
+
+    def test_floats_with_exponents(self):
+        self.assertSameBytes({'large': 1e16, 'small': [1e-7, 0.5], 'nested': {'more': (1.2345678901234568e17,)}})
+
+    def test_non_finite_floats_are_rejected(self):
+        for value in [float('nan'), float('inf'), -float('inf')]:
+            with self.assertRaises(ValueError):
+                JSONRenderer().render({'value': value})
+            with self.assertRaises(ValueError):
+                ORJSONRenderer().render({'values': [value]})
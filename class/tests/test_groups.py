@@ -0,0 +1,277 @@
+import threading
+from io import StringIO
+from types import SimpleNamespace
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.forms import inlineformset_factory
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from perksway.testing import create_users
+from users.models import CustomUser
+from .. import membership
+from ..admin import GroupAdmin, GroupMembershipFormSet
+from ..models import Class, Group, GroupMembership
+
+
+class GroupJoinConcurrencyTests(TransactionTestCase):
+    """A stampede of joins must neither overfill a group nor double-book a student."""
+
+    workers = 8
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user('teacher@example.com', 'pass', role='teacher')
+        self.class_obj = Class.objects.create(name='Maths', class_code='MATH1', teacher=self.teacher)
+        self.students = [
+            CustomUser.objects.create_user(f'student{i}@example.com', 'pass') for i in range(self.workers)
+        ]
+        self.class_obj.students.add(*self.students)
+
+    def group(self, name, max_students=0):
+        return Group.objects.create(name=name, class_ref=self.class_obj, creator=self.teacher, max_students=max_students)
+
+    def join_in_parallel(self, joins):
+        """POST one join per (student, group) pair, all released at the same moment."""
+        barrier = threading.Barrier(len(joins))
+        results = []
+
+        def join(student, group):
+            client = APIClient()
+            client.force_authenticate(student)
+            try:
+                barrier.wait()
+                results.append(client.post(f'/api/v1/classes/group/join/{group.id}/').status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=join, args=pair) for pair in joins]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(results)
+
+    def test_group_never_overfills(self):
+        group = self.group('Red', max_students=3)
+
+        results = self.join_in_parallel([(student, group) for student in self.students])
+
+        self.assertEqual(results, [200] * 3 + [403] * (self.workers - 3))
+        group.refresh_from_db()
+        self.assertEqual(group.student_count, 3)
+        self.assertEqual(group.students.count(), 3)
+
+    def test_student_joins_one_group_per_class(self):
+        student = self.students[0]
+        groups = [self.group(f'Group {i}') for i in range(self.workers)]
+
+        results = self.join_in_parallel([(student, group) for group in groups])
+
+        self.assertEqual(results, [200] + [403] * (self.workers - 1))
+        self.assertEqual(GroupMembership.objects.filter(student=student).count(), 1)
+        self.assertEqual(sorted(Group.objects.values_list('student_count', flat=True)), [0] * (self.workers - 1) + [1])
+
+
+class GroupCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user('teacher@example.com', 'pass', role='teacher')
+        self.class_obj = Class.objects.create(name='Maths', class_code='MATH1', teacher=self.teacher)
+        self.group = Group.objects.create(name='Red', class_ref=self.class_obj, creator=self.teacher, requires_approval=True)
+        self.students = [CustomUser.objects.create_user(f'student{i}@example.com', 'pass') for i in range(3)]
+        self.class_obj.students.add(*self.students)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def counters(self):
+        self.group.refresh_from_db()
+        return self.group.student_count, self.group.pending_count
+
+    def test_counters_follow_requests_and_approvals(self):
+        for student in self.students:
+            self.client_for(student).post(f'/api/v1/classes/group/join/{self.group.id}/')
+        # Asking twice does not count twice
+        self.client_for(self.students[0]).post(f'/api/v1/classes/group/join/{self.group.id}/')
+        self.assertEqual(self.counters(), (0, 3))
+
+        teacher = self.client_for(self.teacher)
+        url = f'/api/v1/classes/group/{self.group.id}/'
+        teacher.post(url + 'approve-request/', {'user_id': str(self.students[0].id), 'action': 'approve'}, format='json')
+        teacher.post(url + 'bulk-approve/', {'user_ids': [str(self.students[1].id)], 'action': 'decline'}, format='json')
+        self.assertEqual(self.counters(), (1, 1))
+        self.assertEqual(teacher.get(url + 'approve-request/?count=1').data, {'count': 1})
+
+        response = teacher.get(f'/api/v1/classes/group/all-groups/{self.class_obj.id}/')
+        self.assertEqual(response.data['results'][0]['student_count'], 1)
+        self.assertEqual(response.data['results'][0]['pending_count'], 1)
+
+    def test_update_cannot_move_group_to_another_class(self):
+        other = Class.objects.create(name='Art', class_code='ART1', teacher=self.teacher)
+
+        response = self.client_for(self.teacher).put(
+            f'/api/v1/classes/group/{self.group.id}/', {'name': 'Blue', 'class_ref': other.id}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['class_ref'], self.class_obj.id)
+        self.group.refresh_from_db()
+        self.assertEqual((self.group.name, self.group.class_ref_id), ('Blue', self.class_obj.id))
+
+    def test_repair_command(self):
+        self.group.students.add(self.students[0], through_defaults={'class_ref': self.class_obj})
+        self.group.pending_approvals.add(*self.students[1:])
+        out = StringIO()
+        call_command('repair_group_counters', stdout=out)
+        self.assertIn('1 group(s)', out.getvalue())
+        self.assertEqual(self.counters(), (1, 2))
+
+
+class GroupAdminTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user('teacher@example.com', 'pass', role='teacher')
+        self.class_obj = Class.objects.create(name='Maths', class_code='MATH1', teacher=self.teacher)
+        self.group = Group.objects.create(name='Red', class_ref=self.class_obj, creator=self.teacher, max_students=2)
+        self.other = Group.objects.create(name='Blue', class_ref=self.class_obj, creator=self.teacher)
+        self.students = create_users('student', 3)
+        self.class_obj.students.add(*self.students)
+
+    def formset(self, students):
+        """The admin's inline formset for self.group, adding `students`."""
+        formset_class = inlineformset_factory(Group, GroupMembership, formset=GroupMembershipFormSet, fields=['student'])
+        prefix = formset_class.get_default_prefix()
+        data = {
+            f'{prefix}-TOTAL_FORMS': len(students), f'{prefix}-INITIAL_FORMS': 0,
+            f'{prefix}-MIN_NUM_FORMS': 0, f'{prefix}-MAX_NUM_FORMS': 1000,
+        }
+        for i, student in enumerate(students):
+            data[f'{prefix}-{i}-student'] = student.id
+        return formset_class(data, instance=self.group, prefix=prefix)
+
+    def test_inline_respects_capacity(self):
+        formset = self.formset(self.students)
+        self.assertFalse(formset.is_valid())
+        self.assertIn('at most 2 students', formset.non_form_errors()[0])
+        self.assertTrue(self.formset(self.students[:2]).is_valid())
+
+    def test_inline_respects_one_group_per_class(self):
+        GroupMembership.objects.create(group=self.other, student=self.students[0], class_ref=self.class_obj)
+        formset = self.formset(self.students[:1])
+        self.assertFalse(formset.is_valid())
+        self.assertIn('already in another group', formset.non_form_errors()[0])
+
+    def test_moving_group_invalidates_every_member(self):
+        GroupMembership.objects.bulk_create([
+            GroupMembership(group=self.group, student=student, class_ref=self.class_obj) for student in self.students[:2]
+        ])
+        for student in self.students[:2]:
+            membership.memberships(student.id)
+        art = Class.objects.create(name='Art', class_code='ART1', teacher=self.teacher)
+        self.group.class_ref = art
+        self.group.save()
+
+        formset = self.formset([])
+        self.assertTrue(formset.is_valid())
+        GroupAdmin(Group, admin.site).save_formset(None, SimpleNamespace(instance=self.group), formset, True)
+
+        for student in self.students[:2]:
+            self.assertEqual(membership.memberships(student.id)['groups'], {art.id: self.group.id})
+
+
+class GroupAssignmentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user('teacher@example.com', 'pass', role='teacher')
+        self.class_obj = Class.objects.create(name='Maths', class_code='MATH1', teacher=self.teacher)
+        self.students = create_users('student', 50)
+        self.class_obj.students.add(*self.students)
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def make_groups(self, *sizes):
+        return [
+            Group.objects.create(name=f'Group {i}', class_ref=self.class_obj, creator=self.teacher, max_students=size)
+            for i, size in enumerate(sizes)
+        ]
+
+    def assign(self, **data):
+        response = self.client.post(f'/api/v1/classes/{self.class_obj.id}/assign-groups/', data, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def sizes(self, class_groups):
+        return [GroupMembership.objects.filter(group=group).count() for group in class_groups]
+
+    def test_balanced_fills_emptiest_groups_first(self):
+        class_groups = self.make_groups(0, 0, 0)
+        self.client.force_authenticate(self.students[0])
+        self.client.post(f'/api/v1/classes/group/join/{class_groups[0].id}/')
+        self.client.force_authenticate(self.teacher)
+
+        data = self.assign()
+
+        self.assertEqual(sum(data['assigned'].values()), 49)
+        self.assertEqual(self.sizes(class_groups), [17, 17, 16])
+        self.assertEqual(sorted(Group.objects.values_list('student_count', flat=True)), [16, 17, 17])
+        self.assertEqual(self.assign()['assigned'], {})
+
+    def test_respects_max_students(self):
+        class_groups = self.make_groups(10, 20)
+
+        data = self.assign()
+
+        self.assertEqual(self.sizes(class_groups), [10, 20])
+        self.assertEqual(len(data['unassigned']), 20)
+
+    def test_over_full_group_takes_no_more(self):
+        full, other = self.make_groups(1, 5)
+        GroupMembership.objects.bulk_create([
+            GroupMembership(group=full, student=student, class_ref=self.class_obj) for student in self.students[:2]
+        ])
+        Group.objects.filter(pk=full.pk).update(student_count=2)
+        full.pending_approvals.add(self.students[2])
+
+        self.assign(strategy='pending')
+
+        self.assertEqual(self.sizes([full, other]), [2, 5])
+        full.refresh_from_db()
+        self.assertEqual(full.student_count, 2)
+
+    def test_update_leaves_max_students_alone(self):
+        group = self.make_groups(5)[0]
+        response = self.client.put(f'/api/v1/classes/group/{group.id}/', {'max_students': 1}, format='json')
+        self.assertEqual(response.status_code, 200)
+        group.refresh_from_db()
+        self.assertEqual(group.max_students, 5)
+
+    def test_random_is_reproducible(self):
+        self.make_groups(0, 0, 0, 0, 0)
+        self.assign(strategy='random', seed=7)
+        first = set(GroupMembership.objects.values_list('student_id', 'group_id'))
+        GroupMembership.objects.all().delete()
+        Group.objects.update(student_count=0)
+        self.assign(strategy='random', seed=7)
+        self.assertEqual(set(GroupMembership.objects.values_list('student_id', 'group_id')), first)
+
+    def test_pending_requests_are_honoured(self):
+        small, large = self.make_groups(2, 0)
+        for student in self.students[:3]:
+            small.pending_approvals.add(student)
+        small.pending_count = 3
+        small.save()
+
+        self.assign(strategy='pending')
+
+        self.assertEqual(
+            set(GroupMembership.objects.filter(group=small).values_list('student_id', flat=True)),
+            {self.students[0].id, self.students[1].id},
+        )
+        small.refresh_from_db()
+        self.assertEqual((small.student_count, small.pending_count), (2, 0))
@@ -0,0 +1,63 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from perksway.testing import create_users
+from users.models import CustomUser
+from .. import leaderboard, ledger
+from ..models import Class, Wallet
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user('teacher@example.com', 'pass', role='teacher')
+        self.class_obj = Class.objects.create(name='Maths', class_code='MATH1', teacher=self.teacher)
+        self.students = create_users('student', 4)
+        self.class_obj.students.add(*self.students)
+        ledger.bulk_credit(self.class_obj.id, dict(zip(
+            [student.id for student in self.students], [Decimal('5'), Decimal('20'), Decimal('20'), Decimal('1')],
+        )))
+
+    def get(self, user, query=''):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(f'/api/v1/classes/{self.class_obj.id}/leaderboard/{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_ties_share_a_rank(self):
+        data = self.get(self.students[0])
+        self.assertEqual(
+            [(row['rank'], row['student']['id'], row['balance']) for row in data['top']],
+            [(1, self.students[1].id, Decimal('20')), (1, self.students[2].id, Decimal('20')),
+             (3, self.students[0].id, Decimal('5')), (4, self.students[3].id, Decimal('1'))],
+        )
+        self.assertEqual(data['me']['rank'], 3)
+        self.assertEqual(len(self.get(self.students[0], '?limit=2')['top']), 2)
+        self.assertIsNone(self.get(self.teacher)['me'])
+
+    def test_ranking_is_cached_until_a_wallet_changes(self):
+        leaderboard.ranking(self.class_obj.id)
+        with CaptureQueriesContext(connection) as context:
+            leaderboard.top(self.class_obj.id)
+            leaderboard.rank_of(self.class_obj.id, self.students[0].id)
+        self.assertEqual(len(context), 0)
+
+        ledger.credit(Wallet.objects.get(owner=self.students[3]), Decimal('100'))
+        self.assertEqual(leaderboard.rank_of(self.class_obj.id, self.students[3].id)['rank'], 1)
+
+        newcomer = create_users('newcomer', 1)[0]
+        Wallet.objects.create(owner=newcomer, class_ref=self.class_obj)
+        self.assertEqual(leaderboard.rank_of(self.class_obj.id, newcomer.id)['rank'], 5)
+
+    def test_outsiders_and_bad_limits(self):
+        client = APIClient()
+        client.force_authenticate(create_users('outsider', 1)[0])
+        self.assertEqual(client.get(f'/api/v1/classes/{self.class_obj.id}/leaderboard/').status_code, 403)
+        client.force_authenticate(self.students[0])
+        self.assertEqual(client.get(f'/api/v1/classes/{self.class_obj.id}/leaderboard/?limit=1000').status_code, 400)
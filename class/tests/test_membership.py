@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from users.models import CustomUser
+from .. import membership
+from ..models import Class, Group
+
+
+class MembershipCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user('teacher@example.com', 'pass', role='teacher')
+        self.student = CustomUser.objects.create_user('student@example.com', 'pass')
+        self.class_obj = Class.objects.create(name='Maths', class_code='MATH1', teacher=self.teacher)
+        self.group = Group.objects.create(name='Red', class_ref=self.class_obj, creator=self.teacher)
+
+    def test_checks_are_cached(self):
+        self.assertTrue(membership.is_teacher(self.teacher, self.class_obj.id))
+        with CaptureQueriesContext(connection) as context:
+            self.assertTrue(membership.is_member(self.teacher, self.class_obj.id))
+            self.assertFalse(membership.is_student(self.teacher, self.class_obj.id))
+        self.assertEqual(len(context), 0)
+
+    def test_join_class_invalidates(self):
+        self.assertFalse(membership.is_student(self.student, self.class_obj.id))
+        client = APIClient()
+        client.force_authenticate(self.student)
+        response = client.post('/api/v1/classes/join/MATH1/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(membership.is_student(self.student, self.class_obj.id))
+
+    def test_memberships_cached_before_commit_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.class_obj.students.add(self.student)
+            # Another request loads the memberships before the join commits
+            cache.set(membership._key(self.student.id), {'taught': set(), 'joined': set(), 'groups': {}})
+        self.assertTrue(membership.is_student(self.student, self.class_obj.id))
+
+    def test_group_changes_invalidate(self):
+        self.assertIsNone(membership.group_in_class(self.student, self.class_obj.id))
+        self.group.students.add(self.student, through_defaults={'class_ref': self.class_obj})
+        self.assertEqual(membership.group_in_class(self.student, self.class_obj.id), self.group.id)
+        self.student.joined_groups.remove(self.group)
+        self.assertIsNone(membership.group_in_class(self.student, self.class_obj.id))
+        self.group.students.add(self.student, through_defaults={'class_ref': self.class_obj})
+        self.group.delete()
+        self.assertIsNone(membership.group_in_class(self.student, self.class_obj.id))
+
+    def test_outsiders_cannot_change_wallets(self):
+        outsider = CustomUser.objects.create_user('other@example.com', 'pass', role='teacher')
+        client = APIClient()
+        client.force_authenticate(outsider)
+        response = client.put(
+            f'/api/v1/classes/wallets/{self.class_obj.id}/',
+            {'email': self.student.email, 'amount': '10.00'}, format='json',
+        )
+        self.assertEqual(response.status_code, 403)
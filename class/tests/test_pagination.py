@@ -0,0 +1,49 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from perksway.testing import seed_class
+
+
+class CursorPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seed = seed_class(students=120, groups=60, items=30, purchases=70)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.seed['teacher'])
+
+    def walk(self, url):
+        """Follow `next` links to the end and return every result."""
+        results, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 25)
+            results.extend(response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return results, pages
+
+    def test_pages_cover_each_row_once(self):
+        class_id = self.seed['class'].id
+        cases = [
+            (f'/api/v1/classes/{class_id}/students/', 'email', 120),
+            (f'/api/v1/classes/group/all-groups/{class_id}/', 'id', 60),
+            (f'/api/v1/classes/{class_id}/items/', 'id', 30),
+            (f'/api/v1/classes/{class_id}/purchase-approval/', 'id', 70),
+        ]
+        for url, key, expected in cases:
+            with self.subTest(url=url):
+                results, pages = self.walk(url + '?page_size=25')
+                keys = [row[key] for row in results]
+                self.assertEqual(len(keys), expected)
+                self.assertEqual(len(set(keys)), expected)
+                self.assertEqual(pages, -(-expected // 25))
+
+    def test_roster_is_limited_to_class_members(self):
+        outsider = seed_class(code='OTHER', students=1, groups=0, items=0, purchases=0)['students'][0]
+        self.client.force_authenticate(outsider)
+        response = self.client.get(f'/api/v1/classes/{self.seed["class"].id}/students/')
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,134 @@
+import threading
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from users.models import CustomUser
+from ..models import Class, Item, PurchaseRequest, Transaction, Wallet
+
+
+class PurchaseApprovalConcurrencyTests(TransactionTestCase):
+    """Parallel approvals must never double-charge or overdraw a wallet."""
+
+    workers = 8
+
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user('teacher@example.com', 'pass', role='teacher')
+        self.student = CustomUser.objects.create_user('student@example.com', 'pass', role='student')
+        self.class_obj = Class.objects.create(name='Maths', class_code='MATH1', teacher=self.teacher)
+        self.class_obj.students.add(self.student)
+        self.wallet = Wallet.objects.create(owner=self.student, class_ref=self.class_obj, balance=Decimal('100.00'))
+        self.item = Item.objects.create(name='Pencil', description='HB', price=Decimal('30.00'), class_ref=self.class_obj)
+
+    def purchase_request(self):
+        return PurchaseRequest.objects.create(
+            student=self.student, item=self.item, class_ref=self.class_obj, amount=self.item.price,
+        )
+
+    def post_in_parallel(self, request_ids, action='approve'):
+        """POST one approval per request id, all released at the same moment."""
+        barrier = threading.Barrier(len(request_ids))
+        results = []
+
+        def approve(request_id):
+            client = APIClient()
+            client.force_authenticate(self.teacher)
+            try:
+                barrier.wait()
+                response = client.post(f'/api/v1/classes/purchase-request/{request_id}/action/', {'action': action}, format='json')
+                results.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=approve, args=(request_id,)) for request_id in request_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(results)
+
+    def test_parallel_approvals_of_one_request_succeed_once(self):
+        purchase_request = self.purchase_request()
+
+        results = self.post_in_parallel([purchase_request.id] * self.workers)
+
+        self.assertEqual(results, [200] + [409] * (self.workers - 1))
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('70.00'))
+        self.assertEqual(Transaction.objects.filter(wallet=self.wallet, transaction_type='debit').count(), 1)
+        purchase_request.refresh_from_db()
+        self.assertEqual(purchase_request.status, 'approved')
+
+    def test_parallel_approvals_never_overdraw_the_wallet(self):
+        # 100.00 only covers three 30.00 purchases
+        requests = [self.purchase_request() for _ in range(self.workers)]
+
+        results = self.post_in_parallel([purchase_request.id for purchase_request in requests])
+
+        self.assertEqual(results, [200] * 3 + [400] * (self.workers - 3))
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('10.00'))
+        self.assertEqual(PurchaseRequest.objects.filter(status='approved').count(), 3)
+        self.assertEqual(PurchaseRequest.objects.filter(status='pending').count(), self.workers - 3)
+
+    def test_approve_after_decline_conflicts(self):
+        purchase_request = self.purchase_request()
+
+        self.assertEqual(self.post_in_parallel([purchase_request.id], action='decline'), [200])
+        self.assertEqual(self.post_in_parallel([purchase_request.id]), [409])
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('100.00'))
+
+
+class BatchPurchaseApprovalTests(TestCase):
+
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user('teacher@example.com', 'pass', role='teacher')
+        self.class_obj = Class.objects.create(name='Maths', class_code='MATH1', teacher=self.teacher)
+        self.item = Item.objects.create(name='Pencil', description='HB', price=Decimal('30.00'), class_ref=self.class_obj)
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def student_with_requests(self, email, balance, count):
+        student = CustomUser.objects.create_user(email, 'pass')
+        self.class_obj.students.add(student)
+        Wallet.objects.create(owner=student, class_ref=self.class_obj, balance=Decimal(balance))
+        return [
+            PurchaseRequest.objects.create(student=student, item=self.item, class_ref=self.class_obj, amount=self.item.price).id
+            for _ in range(count)
+        ]
+
+    def post(self, request_ids, action='approve'):
+        return self.client.post('/api/v1/classes/purchase-request/batch-action/', {'request_ids': request_ids, 'action': action}, format='json')
+
+    def test_batch_approval_reports_per_item_results(self):
+        rich = self.student_with_requests('rich@example.com', '100.00', 2)
+        poor = self.student_with_requests('poor@example.com', '40.00', 2)
+        other_teacher = CustomUser.objects.create_user('other@example.com', 'pass', role='teacher')
+        other_class = Class.objects.create(name='Art', class_code='ART1', teacher=other_teacher)
+        foreign = PurchaseRequest.objects.create(
+            student=CustomUser.objects.get(email='rich@example.com'), item=self.item, class_ref=other_class, amount=Decimal('1.00'),
+        )
+
+        response = self.post(rich + poor + [foreign.id])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['approved', 'approved', 'approved', 'insufficient_balance', 'not_found'],
+        )
+        self.assertEqual(response.data['processed'], 3)
+        balances = dict(Wallet.objects.values_list('owner__email', 'balance'))
+        self.assertEqual(balances, {'rich@example.com': Decimal('40.00'), 'poor@example.com': Decimal('10.00')})
+        self.assertEqual(Transaction.objects.count(), 3)
+
+    def test_already_processed_requests_conflict(self):
+        ids = self.student_with_requests('student@example.com', '100.00', 2)
+        self.assertEqual(self.post(ids[:1], action='decline').status_code, 200)
+
+        response = self.post(ids)
+
+        self.assertEqual([result['status'] for result in response.data['results']], ['conflict', 'approved'])
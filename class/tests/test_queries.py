@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from users.models import CustomUser
+from ..models import Class, Group, Item, PurchaseRequest
+
+
+class ConstantQueryCountTests(TestCase):
+    """List and detail endpoints must not issue a query per row."""
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user('teacher@example.com', 'pass', role='teacher')
+        self.class_obj = Class.objects.create(name='Maths', class_code='MATH1', teacher=self.teacher)
+        self.item = Item.objects.create(name='Pencil', description='HB', price=Decimal('1.00'), class_ref=self.class_obj)
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.grow()
+
+    def grow(self):
+        """Add another student, group and purchase request to the class."""
+        n = CustomUser.objects.count()
+        student = CustomUser.objects.create_user(f'student{n}@example.com', 'pass')
+        self.class_obj.students.add(student)
+        group = Group.objects.create(name=f'Group {n}', class_ref=self.class_obj, creator=self.teacher)
+        group.students.add(student, through_defaults={'class_ref': self.class_obj})
+        PurchaseRequest.objects.create(student=student, item=self.item, class_ref=self.class_obj, amount=self.item.price)
+        return group
+
+    def assertConstantQueries(self, url):
+        # Warm the membership cache so both measurements see the same state
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        for _ in range(5):
+            self.grow()
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(len(small), len(large), url)
+
+    def test_class_list(self):
+        self.assertConstantQueries('/api/v1/classes/')
+
+    def test_enrolled_classes(self):
+        self.assertConstantQueries('/api/v1/classes/enrolled/')
+
+    def test_groups_in_class(self):
+        self.assertConstantQueries(f'/api/v1/classes/group/all-groups/{self.class_obj.id}/')
+
+    def test_group_details(self):
+        group = Group.objects.get()
+        url = f'/api/v1/classes/group/details/{group.id}/'
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+        extra = [CustomUser.objects.create_user(f'extra{i}@example.com', 'pass') for i in range(5)]
+        group.students.add(*extra, through_defaults={'class_ref': self.class_obj})
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['students']), 6)
+        self.assertEqual(len(small), len(large))
+
+    def test_purchase_queue(self):
+        self.assertConstantQueries(f'/api/v1/classes/{self.class_obj.id}/purchase-approval/')
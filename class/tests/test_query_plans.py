@@ -0,0 +1,26 @@
+from importlib import import_module
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+query_plans = import_module('class.query_plans')
+
+
+class QueryPlanTests(TestCase):
+
+    def test_hot_query_paths_use_indexes(self):
+        out = StringIO()
+        call_command('explain_queries', seed=True, strict=True, stdout=out)
+        self.assertEqual(out.getvalue().count(': ok'), len(query_plans.QUERY_PATHS))
+
+    def test_full_scan_detection(self):
+        sqlite_plan = '\n'.join([
+            '4 0 0 SCAN class_group_students',
+            '6 0 0 SCAN users_customuser USING INDEX sqlite_autoindex_users_customuser_2',
+            '9 0 0 SEARCH class_wallet USING INDEX unique_wallet (owner_id=?)',
+        ])
+        self.assertEqual(query_plans.full_scans(sqlite_plan, 'sqlite'), ['class_group_students'])
+        postgres_plan = 'Limit\n  ->  Seq Scan on class_item  (cost=0.00..1.01 rows=1 width=8)'
+        self.assertEqual(query_plans.full_scans(postgres_plan, 'postgresql'), ['class_item'])
+        self.assertIsNone(query_plans.full_scans('', 'oracle'))
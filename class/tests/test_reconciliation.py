@@ -0,0 +1,103 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from perksway.testing import create_users
+from users.models import CustomUser
+from .. import ledger, reconciliation
+from ..models import BalanceCheckpoint, Class, Transaction, Wallet
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user('teacher@example.com', 'pass', role='teacher')
+        self.class_obj = Class.objects.create(name='Maths', class_code='MATH1', teacher=self.teacher)
+        self.students = create_users('student', 5)
+        self.class_obj.students.add(*self.students)
+        ledger.bulk_credit(self.class_obj.id, {student.id: Decimal('10.00') for student in self.students})
+        self.wallet = Wallet.objects.get(owner=self.students[0])
+
+    def test_clean_ledger_has_no_drift(self):
+        ledger.debit(self.wallet, Decimal('3.50'))
+        checked, drift = reconciliation.reconcile(chunk_size=2)
+        self.assertEqual((checked, drift), (5, []))
+        checkpoint = self.wallet.checkpoints.get()
+        self.assertEqual(checkpoint.balance, Decimal('6.50'))
+        self.assertEqual(checkpoint.last_transaction, Transaction.objects.filter(wallet=self.wallet).latest('pk'))
+
+    def test_only_new_entries_are_checkpointed(self):
+        reconciliation.reconcile()
+        ledger.credit(self.wallet, Decimal('1.00'))
+        self.assertEqual(reconciliation.reconcile(), (5, []))
+        # Wallets without new entries keep their checkpoint
+        self.assertEqual(BalanceCheckpoint.objects.count(), 6)
+        self.assertEqual(self.wallet.checkpoints.order_by('-created_at', '-pk').first().balance, Decimal('11.00'))
+
+    def test_drift_is_reported_and_repaired(self):
+        reconciliation.reconcile()
+        Wallet.objects.filter(pk=self.wallet.pk).update(balance=Decimal('99.00'))
+
+        _, drift = reconciliation.reconcile()
+        self.assertEqual(drift, [{
+            'wallet_id': self.wallet.pk, 'owner_id': self.students[0].pk, 'class_id': self.class_obj.pk,
+            'balance': Decimal('99.00'), 'expected': Decimal('10.00'),
+        }])
+
+        out = StringIO()
+        call_command('reconcile_wallets', '--class', str(self.class_obj.pk), '--workers', '1', '--repair', stdout=out, stderr=StringIO())
+        self.assertIn('ledger says 10.00 (correction posted)', out.getvalue())
+        self.assertIn('Checked 5 wallet(s), 1 drifted.', out.getvalue())
+        # The balance stays; the ledger gains an entry accounting for it
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('99.00'))
+        correction = Transaction.objects.filter(wallet=self.wallet).latest('pk')
+        self.assertEqual(
+            (correction.transaction_type, correction.amount, correction.description),
+            (Transaction.CREDIT, Decimal('89.00'), reconciliation.REPAIR_DESCRIPTION),
+        )
+        self.assertEqual(reconciliation.reconcile()[1], [])
+        self.assertEqual(reconciliation.balance_as_of(self.wallet, timezone.now()), Decimal('99.00'))
+
+    def test_balance_as_of(self):
+        now = timezone.now()
+        Transaction.objects.filter(wallet=self.wallet).update(date=now - timedelta(days=10))
+        reconciliation.reconcile()
+        BalanceCheckpoint.objects.update(created_at=now - timedelta(days=9))
+        ledger.debit(self.wallet, Decimal('4.00'))
+        Transaction.objects.filter(wallet=self.wallet, transaction_type=Transaction.DEBIT).update(date=now - timedelta(days=5))
+        ledger.credit(self.wallet, Decimal('1.00'))
+
+        self.assertEqual(reconciliation.balance_as_of(self.wallet, now - timedelta(days=11)), Decimal('0.00'))
+        self.assertEqual(reconciliation.balance_as_of(self.wallet, now - timedelta(days=10)), Decimal('10.00'))
+        self.assertEqual(reconciliation.balance_as_of(self.wallet, now - timedelta(days=7)), Decimal('10.00'))
+        self.assertEqual(reconciliation.balance_as_of(self.wallet, now - timedelta(days=1)), Decimal('6.00'))
+        self.assertEqual(reconciliation.balance_as_of(self.wallet, timezone.now()), Decimal('7.00'))
+
+    def test_balance_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.students[0])
+        url = f'/api/v1/classes/wallets/{self.class_obj.id}/balance/'
+        self.assertEqual(Decimal(client.get(url + '?as_of=2000-01-01T00:00:00Z').data['balance']), Decimal('0'))
+        self.assertEqual(client.get(url + '?as_of=soon').status_code, 400)
+
+
+class ParallelReconciliationTests(TransactionTestCase):
+    def test_chunks_run_in_parallel(self):
+        teacher = CustomUser.objects.create_user('teacher@example.com', 'pass', role='teacher')
+        class_obj = Class.objects.create(name='Maths', class_code='MATH1', teacher=teacher)
+        students = create_users('student', 20)
+        ledger.bulk_credit(class_obj.id, {student.id: Decimal('5.00') for student in students})
+        Wallet.objects.filter(owner=students[3]).update(balance=Decimal('1.00'))
+
+        checked, drift = reconciliation.reconcile(workers=4, chunk_size=3)
+
+        self.assertEqual(checked, 20)
+        self.assertEqual([row['owner_id'] for row in drift], [students[3].id])
+        self.assertEqual(BalanceCheckpoint.objects.count(), 20)
@@ -0,0 +1,73 @@
+import json
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from perksway.testing import create_users
+from users.models import CustomUser
+from .. import membership, roster_import
+from ..models import Class, Wallet
+
+
+class RosterImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user('teacher@example.com', 'pass', role='teacher')
+        self.class_obj = Class.objects.create(name='Maths', class_code='MATH1', teacher=self.teacher)
+        self.students = create_users('student', 5)
+        self.class_obj.students.add(self.students[0])
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def upload(self, name, content, **data):
+        response = self.client.post(
+            f'/api/v1/classes/{self.class_obj.id}/students/import/',
+            {'file': SimpleUploadedFile(name, content if isinstance(content, bytes) else content.encode()), **data}, format='multipart',
+        )
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_csv_import_reports_each_row(self):
+        emails = [student.email for student in self.students]
+        content = 'name,email\n' + ''.join(f'x,{email}\n' for email in [*emails, emails[1], 'nobody@example.com', 'teacher@example.com', 'oops'])
+
+        *rows, summary = self.upload('roster.csv', content)
+
+        self.assertEqual([row['status'] for row in rows], [
+            'already_enrolled', 'enrolled', 'enrolled', 'enrolled', 'enrolled',
+            'duplicate', 'not_found', 'not_a_student', 'invalid',
+        ])
+        self.assertEqual(rows[0]['line'], 2)
+        self.assertEqual(summary['summary']['enrolled'], 4)
+        self.assertEqual(self.class_obj.students.count(), 5)
+        self.assertEqual(Wallet.objects.filter(class_ref=self.class_obj).count(), 4)
+
+    def test_ndjson_import_in_chunks_invalidates_memberships(self):
+        self.assertFalse(membership.is_student(self.students[1], self.class_obj.id))
+        content = ''.join(json.dumps({'email': student.email}) + '\n' for student in self.students[1:]) + 'not json\n'
+
+        outcomes = list(roster_import.import_roster(
+            self.class_obj, roster_import.read_emails(SimpleUploadedFile('r.ndjson', content.encode()), 'ndjson'), chunk_size=2,
+        ))
+
+        self.assertEqual([row['status'] for row in outcomes], ['enrolled'] * 4 + ['invalid'])
+        self.assertTrue(membership.is_student(self.students[1], self.class_obj.id))
+
+    def test_non_utf8_rows_are_reported_invalid(self):
+        content = f'email\n{self.students[1].email}\nj\xf6rg@example.com\n{self.students[2].email}\n'.encode('latin-1')
+
+        *rows, summary = self.upload('roster.csv', content)
+
+        self.assertEqual([row['status'] for row in rows], ['enrolled', 'invalid', 'enrolled'])
+        self.assertEqual(summary['summary'], {'enrolled': 2, 'invalid': 1})
+        self.assertEqual(self.class_obj.students.count(), 3)
+
+    def test_only_the_teacher_may_import(self):
+        self.client.force_authenticate(self.students[0])
+        response = self.client.post(
+            f'/api/v1/classes/{self.class_obj.id}/students/import/',
+            {'file': SimpleUploadedFile('roster.csv', b'a@example.com\n')}, format='multipart',
+        )
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,257 @@
+import json
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import get_resolver
+from rest_framework.test import APIClient
+
+from perksway.testing import RouteBudgetTestCase, create_users, seed_class
+from .. import ledger, reconciliation
+from ..models import Class, Group, Wallet
+
+
+class ClassRouteBudgetTests(RouteBudgetTestCase):
+    """Every route in class/urls.py, called against a realistically sized class."""
+
+    budgets = {
+        ('class_list', 'get'): 1,
+        ('class_create', 'post'): 2,
+        ('class_roster', 'get'): 1,
+        ('class_roster_import', 'post'): 21,  # 1,001 rows in chunks of 500
+        ('class-export', 'get'): 1,
+        ('join_class', 'post'): 8,
+        ('group_detail', 'get'): 2,
+        ('group_detail', 'put'): 3,
+        ('group_detail', 'delete'): 5,
+        ('all_groups_in_class', 'get'): 3,  # Including the ETag version query
+        ('create_group', 'post'): 3,
+        ('join_group', 'post'): 5,
+        ('group_detail_with_students', 'get'): 3,  # Including the ETag version query
+        ('user_enrolled_class', 'get'): 1,
+        ('teacher-dashboard', 'get'): 4,
+        ('student-home', 'get'): 3,
+        ('approve-join-request', 'get'): 2,
+        ('approve-join-request', 'post'): 9,
+        ('bulk-create-groups', 'post'): 3,
+        # 300 groups; SQLite's parameter limit allows 90 per INSERT, PostgreSQL takes them in one
+        ('bulk-create-groups-multi-class', 'post'): 6,
+        ('bulk-approve', 'post'): 9,
+        ('assign-groups', 'post'): 9,
+        ('wallet-balance', 'get'): 3,  # 1 without ?as_of=
+        ('wallet-update', 'put'): 7,
+        ('wallet-bulk-credit', 'post'): 9,
+        ('wallet-transactions', 'get'): 2,
+        ('class-leaderboard', 'get'): 1,  # None while the ranking is cached
+        ('class-transactions', 'get'): 1,
+        ('item-list-create', 'get'): 2,  # Including the ETag version query
+        ('item-list-create', 'post'): 2,
+        ('item-detail', 'get'): 1,
+        ('item-detail', 'put'): 2,
+        ('item-detail', 'delete'): 3,
+        ('view-purchase-requests', 'get'): 1,
+        ('send-purchase-request', 'post'): 3,
+        ('approve-decline-purchase-request', 'post'): 10,
+        ('batch-purchase-action', 'post'): 9,  # Including ledger.bulk_debit's savepoint
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seed = seed_class()
+        cls.teacher = cls.seed['teacher']
+        cls.class_obj = cls.seed['class']
+        cls.student = cls.seed['students'][0]
+        cls.group = cls.seed['groups'][0]
+        cls.item = cls.seed['items'][0]
+        cls.newcomer = create_users('newcomer', 1)[0]
+        # Not in any group yet, but enrolled in the class
+        cls.unassigned = cls.seed['students'][-1]
+        cls.pending_student = Group.pending_approvals.through.objects.filter(group=cls.group).get().customuser
+
+    def url(self, path):
+        return f'/api/v1/classes/{path}'
+
+    def test_every_route_has_a_budget(self):
+        names = {pattern.name for pattern in get_resolver('class.urls').url_patterns}
+        self.assertEqual(names, {name for name, method in self.budgets})
+
+    def test_class_list(self):
+        self.assertRouteBudget('class_list', 'get', self.url(''), user=self.teacher, repeat=3)
+        self.assertRouteBudget('class_list', 'get', self.url(''), user=self.student, repeat=3)
+
+    def test_class_create(self):
+        self.assertRouteBudget('class_create', 'post', self.url('create/'), user=self.teacher,
+                               data={'name': 'History', 'class_code': 'HIST1'}, status=201)
+
+    def test_class_roster(self):
+        response = self.assertRouteBudget('class_roster', 'get', self.url(f'{self.class_obj.id}/students/'),
+                                          user=self.student, repeat=3)
+        self.assertEqual(len(response.data['results']), 50)
+
+    def test_class_roster_import(self):
+        emails = [user.email for user in create_users('import', 1000)] + [self.student.email]
+        upload = SimpleUploadedFile('roster.csv', ('email\n' + '\n'.join(emails)).encode())
+        response = self.assertRouteBudget('class_roster_import', 'post', self.url(f'{self.class_obj.id}/students/import/'),
+                                          user=self.teacher, data={'file': upload}, format='multipart')
+        summary = json.loads(b''.join(response.streaming_content).splitlines()[-1])['summary']
+        self.assertEqual(summary, {'enrolled': 1000, 'already_enrolled': 1})
+
+    def test_join_class(self):
+        self.assertRouteBudget('join_class', 'post', self.url(f'join/{self.class_obj.class_code}/'), user=self.newcomer)
+
+    def test_group_detail(self):
+        self.assertRouteBudget('group_detail', 'get', self.url(f'group/{self.group.id}/'), user=self.student, repeat=3)
+        self.assertRouteBudget('group_detail', 'put', self.url(f'group/{self.group.id}/'), user=self.teacher,
+                               data={'description': 'Updated'})
+        self.assertRouteBudget('group_detail', 'delete', self.url(f'group/{self.group.id}/'), user=self.teacher, status=204)
+
+    def test_all_groups_in_class(self):
+        self.assertRouteBudget('all_groups_in_class', 'get', self.url(f'group/all-groups/{self.class_obj.id}/'),
+                               user=self.student, repeat=3)
+
+    def test_create_group(self):
+        self.assertRouteBudget('create_group', 'post', self.url('group/create-group/'), user=self.teacher,
+                               data={'name': 'New group', 'class_ref': self.class_obj.id}, status=201)
+
+    def test_join_group(self):
+        self.assertRouteBudget('join_group', 'post', self.url(f'group/join/{self.seed["groups"][-1].id}/'), user=self.unassigned)
+
+    def test_group_detail_with_students(self):
+        self.assertRouteBudget('group_detail_with_students', 'get', self.url(f'group/details/{self.group.id}/'),
+                               user=self.student, repeat=3)
+
+    def test_user_enrolled_class(self):
+        self.assertRouteBudget('user_enrolled_class', 'get', self.url('enrolled/'), user=self.student, repeat=3)
+        self.assertRouteBudget('user_enrolled_class', 'get', self.url('enrolled/'), user=self.teacher, repeat=3)
+
+    def test_teacher_dashboard(self):
+        response = self.assertRouteBudget('teacher-dashboard', 'get', self.url('dashboard/'), user=self.teacher, repeat=3)
+        row = response.data['classes'][0]
+        self.assertEqual((row['student_count'], row['group_count'], row['pending_join_count'], row['pending_purchase_count']),
+                         (200, 20, 20, 100))
+        self.assertEqual(row['total_balance'], '20000.00')
+
+    def test_student_home(self):
+        response = self.assertRouteBudget('student-home', 'get', self.url('home/'), user=self.student, repeat=3)
+        row = response.data['classes'][0]
+        self.assertEqual(row['group']['id'], self.group.id)
+        self.assertEqual(row['item_count'], 50)
+        self.assertEqual(len(row['pending_purchases']), 1)
+
+    def test_approve_join_request(self):
+        url = self.url(f'group/{self.group.id}/approve-request/')
+        self.assertRouteBudget('approve-join-request', 'get', url, user=self.teacher, repeat=3)
+        self.assertRouteBudget('approve-join-request', 'post', url, user=self.teacher,
+                               data={'user_id': str(self.pending_student.id), 'action': 'approve'})
+
+    def test_bulk_create_groups(self):
+        self.assertRouteBudget('bulk-create-groups', 'post', self.url(f'{self.class_obj.id}/bulk-create-groups/'),
+                               user=self.teacher, data={'number_of_groups': 10, 'group_name_prefix': 'Team', 'max_students': 5},
+                               status=201)
+
+    def test_bulk_create_groups_in_many_classes(self):
+        other = Class.objects.create(name='Other', class_code='OTHER', teacher=self.teacher)
+        response = self.assertRouteBudget(
+            'bulk-create-groups-multi-class', 'post', self.url('group/bulk-create/'), user=self.teacher, status=201,
+            data={'classes': [
+                {'class_id': self.class_obj.id, 'number_of_groups': 150, 'group_name_prefix': 'Project', 'max_students': 5},
+                {'class_id': other.id, 'number_of_groups': 150, 'group_name_prefix': 'Project', 'max_students': 5},
+            ]},
+        )
+        self.assertEqual([len(ids) for ids in response.data['ids'].values()], [150, 150])
+
+    def test_bulk_create_groups_needs_every_class(self):
+        other = seed_class(code='OTHER', students=0, groups=0, items=0, purchases=0)['class']
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        response = client.post(self.url('group/bulk-create/'), {'classes': [
+            {'class_id': self.class_obj.id, 'number_of_groups': 2, 'group_name_prefix': 'Team', 'max_students': 5},
+            {'class_id': other.id, 'number_of_groups': 2, 'group_name_prefix': 'Team', 'max_students': 5},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data['class_ids'], [other.id])
+
+    def test_assign_groups(self):
+        response = self.assertRouteBudget('assign-groups', 'post', self.url(f'{self.class_obj.id}/assign-groups/'),
+                                          user=self.teacher, data={'strategy': 'pending'})
+        self.assertEqual(response.data['unassigned'], [])
+
+    def test_bulk_approve(self):
+        self.assertRouteBudget('bulk-approve', 'post', self.url(f'group/{self.group.id}/bulk-approve/'), user=self.teacher,
+                               data={'user_ids': [str(self.pending_student.id)], 'action': 'approve'})
+
+    def test_wallet_balance(self):
+        self.assertRouteBudget('wallet-balance', 'get', self.url(f'wallets/{self.class_obj.id}/balance/'),
+                               user=self.student, repeat=3)
+        self.credit_everyone(10)
+        reconciliation.reconcile()
+        self.credit_everyone(2)
+        self.assertRouteBudget('wallet-balance', 'get', self.url(f'wallets/{self.class_obj.id}/balance/?as_of=2999-01-01T00:00:00Z'),
+                               user=self.student, repeat=3)
+
+    def test_wallet_update(self):
+        self.assertRouteBudget('wallet-update', 'put', self.url(f'wallets/{self.class_obj.id}/'), user=self.teacher,
+                               data={'email': self.student.email, 'amount': '5'})
+
+    def test_class_export(self):
+        self.credit_everyone(10)
+        for kind in ('transactions', 'purchases', 'roster'):
+            self.assertRouteBudget('class-export', 'get', self.url(f'{self.class_obj.id}/export/{kind}/?gzip=1'),
+                                   user=self.teacher, repeat=3)
+
+    def credit_everyone(self, times):
+        for i in range(times):
+            ledger.bulk_credit(self.class_obj.id, {student.id: Decimal(i + 1) for student in self.seed['students']})
+
+    def test_wallet_transactions(self):
+        self.credit_everyone(10)
+        url = self.url(f'wallets/{self.class_obj.id}/transactions/?page_size=5')
+        first = self.assertRouteBudget('wallet-transactions', 'get', url, user=self.student, repeat=3)
+        self.assertRouteBudget('wallet-transactions', 'get', first.data['next'], user=self.student, repeat=3)
+
+    def test_class_transactions(self):
+        self.credit_everyone(10)
+        url = self.url(f'{self.class_obj.id}/transactions/?type=credit')
+        first = self.assertRouteBudget('class-transactions', 'get', url, user=self.teacher, repeat=3)
+        self.assertRouteBudget('class-transactions', 'get', first.data['next'], user=self.teacher, repeat=3)
+
+    def test_class_leaderboard(self):
+        url = self.url(f'{self.class_obj.id}/leaderboard/?limit=50')
+        response = self.assertRouteBudget('class-leaderboard', 'get', url, user=self.student, repeat=3)
+        self.assertEqual(len(response.data['top']), 50)
+        self.assertIsNotNone(response.data['me'])
+
+    def test_wallet_bulk_credit(self):
+        response = self.assertRouteBudget('wallet-bulk-credit', 'post', self.url(f'wallets/{self.class_obj.id}/bulk-credit/'),
+                                          user=self.teacher, data={'amount': '5'})
+        self.assertEqual(len(response.data['balances']), Wallet.objects.filter(class_ref=self.class_obj).count())
+
+    def test_item_list_create(self):
+        url = self.url(f'{self.class_obj.id}/items/')
+        self.assertRouteBudget('item-list-create', 'get', url, user=self.student, repeat=3)
+        self.assertRouteBudget('item-list-create', 'post', url, user=self.teacher,
+                               data={'name': 'Eraser', 'description': 'White', 'price': '2.00'}, status=201)
+
+    def test_item_detail(self):
+        url = self.url(f'{self.class_obj.id}/items/{self.item.id}/')
+        self.assertRouteBudget('item-detail', 'get', url, user=self.student, repeat=3)
+        self.assertRouteBudget('item-detail', 'put', url, user=self.teacher, data={'price': '3.00'})
+        self.assertRouteBudget('item-detail', 'delete', url, user=self.teacher, status=204)
+
+    def test_purchase_queue(self):
+        self.assertRouteBudget('view-purchase-requests', 'get', self.url(f'{self.class_obj.id}/purchase-approval/'),
+                               user=self.teacher, repeat=3)
+
+    def test_send_purchase_request(self):
+        self.assertRouteBudget('send-purchase-request', 'post', self.url(f'{self.class_obj.id}/purchase-item/{self.item.id}/'),
+                               user=self.student, status=201)
+
+    def test_purchase_action(self):
+        purchase = self.seed['purchases'][0]
+        self.assertRouteBudget('approve-decline-purchase-request', 'post', self.url(f'purchase-request/{purchase.id}/action/'),
+                               user=self.teacher, data={'action': 'approve'})
+
+    def test_batch_purchase_action(self):
+        ids = [purchase.id for purchase in self.seed['purchases']]
+        response = self.assertRouteBudget('batch-purchase-action', 'post', self.url('purchase-request/batch-action/'),
+                                          user=self.teacher, data={'request_ids': ids, 'action': 'approve'})
+        self.assertEqual(response.data['processed'], len(ids))
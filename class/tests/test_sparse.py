@@ -0,0 +1,99 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from perksway import sparse
+from perksway.testing import seed_class
+from ..models import Group, Item
+from ..serializers import GroupSerializer, ItemSerializer
+
+
+class SparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seed = seed_class(students=12, groups=3, group_size=3, items=4, purchases=5)
+        cls.class_obj = cls.seed['class']
+        cls.group = cls.seed['groups'][0]
+        cls.student = cls.seed['students'][0]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.seed['teacher'])
+
+    def get(self, url, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f'/api/v1/classes/{url}', **kwargs)
+        return response, len(context.captured_queries)
+
+    def test_fields_pick_the_keys(self):
+        response, _ = self.get(f'{self.class_obj.id}/items/{self.seed["items"][0].id}/', data={'fields': 'id,price'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'id': self.seed['items'][0].id, 'price': '5.00'})
+
+        response, _ = self.get(f'{self.class_obj.id}/purchase-approval/', data={'fields': 'item, amount'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({tuple(row) for row in response.data['results']}, {('item', 'amount')})
+
+    def test_fields_skip_queries(self):
+        url = f'group/all-groups/{self.class_obj.id}/'
+        self.get(url)  # Caches the membership check
+        full, queries = self.get(url)
+        sparse_response, sparse_queries = self.get(url, data={'fields': 'id,name'})
+        self.assertEqual(sparse_response.data['results'], [{'id': row['id'], 'name': row['name']} for row in full.data['results']])
+        # No students query
+        self.assertEqual(sparse_queries, queries - 1)
+
+        # The cursor still pages on the id, selected or not
+        response, _ = self.get(url, data={'fields': 'name', 'page_size': 2})
+        page = self.client.get(response.data['next'])
+        self.assertEqual([row['name'] for row in page.data['results']], [full.data['results'][2]['name']])
+
+    def test_fields_load_only_those_columns(self):
+        item = sparse.shape(Item.objects.all(), ItemSerializer(fields=['name'])).get(pk=self.seed['items'][0].pk)
+        self.assertIn('description', item.get_deferred_fields())
+        self.assertNotIn('name', item.get_deferred_fields())
+
+        group = sparse.shape(Group.objects.all(), GroupSerializer(fields=['name', 'students'])).get(pk=self.group.pk)
+        self.assertIn('description', group.get_deferred_fields())
+        with self.assertNumQueries(0):
+            self.assertEqual(len(group.students.all()), 3)
+
+    def test_expand(self):
+        response, _ = self.get(f'group/{self.group.id}/', data={'fields': 'name,creator', 'expand': 'creator'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['creator']['email'], self.seed['teacher'].email)
+        self.assertEqual(set(response.data), {'name', 'creator'})
+
+        response, queries = self.get(f'{self.class_obj.id}/purchase-approval/', data={'expand': 'item,student'})
+        self.assertEqual(response.status_code, 200)
+        first = response.data['results'][0]
+        self.assertEqual(first['item']['price'], '5.00')
+        self.assertEqual(first['student']['email'], self.student.email)
+        self.assertEqual(first['class_ref'], self.class_obj.name)
+        # The related rows are joined, not fetched one by one
+        self.assertLess(queries, 4)
+
+    def test_expand_class_students(self):
+        self.client.force_authenticate(self.student)
+        response, _ = self.get('enrolled/', data={'expand': 'students', 'fields': 'name'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], self.class_obj.name)
+        self.assertEqual(len(response.data['students']), 12)
+
+        response = self.client.get('/api/v1/classes/', data={'expand': 'teacher'})
+        self.assertEqual(response.data['results'][0]['teacher']['email'], self.seed['teacher'].email)
+
+    def test_unknown_names_are_rejected(self):
+        for url, params in [
+            (f'{self.class_obj.id}/items/', {'fields': 'id,secret'}),
+            (f'group/{self.group.id}/', {'expand': 'students'}),
+            (f'group/all-groups/{self.class_obj.id}/', {'fields': 'bogus'}),
+            # Only there when expanded
+            ('enrolled/', {'fields': 'students'}),
+        ]:
+            with self.subTest(url=url):
+                response, _ = self.get(url, data=params)
+                self.assertEqual(response.status_code, 400)
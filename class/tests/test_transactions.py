@@ -0,0 +1,155 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from perksway.testing import create_users
+from users.models import CustomUser
+from .. import ledger
+from ..models import Class, Transaction, Wallet
+
+
+class TransactionHistoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user('teacher@example.com', 'pass', role='teacher')
+        self.class_obj = Class.objects.create(name='Maths', class_code='MATH1', teacher=self.teacher)
+        self.students = create_users('student', 2)
+        self.class_obj.students.add(*self.students)
+        for i in range(30):
+            ledger.bulk_credit(self.class_obj.id, {student.id: Decimal(i + 1) for student in self.students})
+        self.wallet = Wallet.objects.get(owner=self.students[0])
+        for _ in range(5):
+            ledger.debit(self.wallet, Decimal('1.00'), 'Sweets')
+        # Entries written in the same instant must still page without gaps or repeats
+        Transaction.objects.filter(wallet=self.wallet).update(date=Transaction.objects.earliest('date').date)
+
+    def walk(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        seen = []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200, response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return seen
+
+    def test_wallet_history_pages_newest_first(self):
+        seen = self.walk(self.students[0], f'/api/v1/classes/wallets/{self.class_obj.id}/transactions/?page_size=7')
+        expected = list(Transaction.objects.filter(wallet=self.wallet).order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 35)
+
+    def test_filters(self):
+        url = f'/api/v1/classes/wallets/{self.class_obj.id}/transactions/?type=debit'
+        self.assertEqual(len(self.walk(self.students[0], url)), 5)
+        future = '2999-01-01T00:00:00Z'
+        self.assertEqual(self.walk(self.students[0], url + f'&since={future}'), [])
+
+    def test_class_history_is_for_the_teacher(self):
+        url = f'/api/v1/classes/{self.class_obj.id}/transactions/?page_size=25'
+        self.assertEqual(len(self.walk(self.teacher, url)), 65)
+        client = APIClient()
+        client.force_authenticate(self.students[0])
+        self.assertEqual(client.get(url).status_code, 403)
+
+    def test_students_see_only_their_wallet(self):
+        client = APIClient()
+        client.force_authenticate(self.students[1])
+        url = f'/api/v1/classes/wallets/{self.class_obj.id}/transactions/?student={self.students[0].id}'
+        self.assertEqual(client.get(url).status_code, 403)
+        self.assertEqual(len(self.walk(self.teacher, url)), 35)
+
+    def test_invalid_cursor(self):
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        response = client.get(f'/api/v1/classes/{self.class_obj.id}/transactions/?cursor=nonsense')
+        self.assertEqual(response.status_code, 404)
+
+
+class LedgerLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user('teacher@example.com', 'pass', role='teacher')
+        self.class_obj = Class.objects.create(name='Maths', class_code='MATH1', teacher=self.teacher)
+        self.student = create_users('student', 1)[0]
+        self.class_obj.students.add(self.student)
+        self.wallet = Wallet.objects.create(owner=self.student, class_ref=self.class_obj, balance=ledger.MAX_AMOUNT - 1)
+
+    def test_amounts_beyond_the_columns_are_rejected(self):
+        for value in ['1e20', '100000000', '-100000000']:
+            with self.assertRaises(ledger.InvalidAmount):
+                ledger.to_amount(value)
+        self.assertEqual(ledger.to_amount('99999999.99'), ledger.MAX_AMOUNT)
+
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        response = client.put(
+            f'/api/v1/classes/wallets/{self.class_obj.id}/', {'email': self.student.email, 'amount': '1e20'}, format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_credit_cannot_overflow_the_balance(self):
+        with self.assertRaises(ledger.InvalidAmount):
+            ledger.credit(self.wallet, Decimal('2.00'))
+        ledger.credit(self.wallet, Decimal('1.00'))
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, ledger.MAX_AMOUNT)
+        self.assertEqual(Transaction.objects.filter(wallet=self.wallet).count(), 1)
+
+    def test_bulk_credit_cannot_overflow_any_balance(self):
+        other = create_users('other', 1)[0]
+        self.class_obj.students.add(other)
+        with self.assertRaises(ledger.InvalidAmount):
+            ledger.bulk_credit(self.class_obj.id, {self.student.id: '1e20'})
+
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        response = client.post(f'/api/v1/classes/wallets/{self.class_obj.id}/bulk-credit/', {'amount': '5.00'}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, ledger.MAX_AMOUNT - 1)
+        self.assertFalse(Wallet.objects.filter(owner=other).exists())
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_bulk_debit_cannot_overdraw_any_balance(self):
+        other = create_users('other', 1)[0]
+        poor = Wallet.objects.create(owner=other, class_ref=self.class_obj, balance=Decimal('3.00'))
+        with self.assertRaises(ledger.InsufficientFunds):
+            ledger.bulk_debit([(self.wallet, Decimal('1.00'), ''), (poor, Decimal('2.00'), ''), (poor, Decimal('2.00'), '')])
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, ledger.MAX_AMOUNT - 1)
+        self.assertFalse(Transaction.objects.exists())
+
+        entries = ledger.bulk_debit([(poor, Decimal('1.00'), 'a'), (poor, Decimal('2.00'), 'b')])
+        poor.refresh_from_db()
+        self.assertEqual(poor.balance, Decimal('0.00'))
+        self.assertEqual([entry.description for entry in entries], ['a', 'b'])
+        self.assertEqual(Transaction.objects.filter(wallet=poor, transaction_type=Transaction.DEBIT).count(), 2)
+
+
+class BulkCreditTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user('teacher@example.com', 'pass', role='teacher')
+        self.class_obj = Class.objects.create(name='Maths', class_code='MATH1', teacher=self.teacher)
+        self.student = CustomUser.objects.create_user('Ada.Lovelace@example.com', 'pass')
+        self.class_obj.students.add(self.student)
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def credit(self, email):
+        return self.client.post(
+            f'/api/v1/classes/wallets/{self.class_obj.id}/bulk-credit/',
+            {'credits': [{'email': email, 'amount': '5.00'}]}, format='json',
+        )
+
+    def test_emails_match_in_any_case(self):
+        response = self.credit('ada.lovelace@EXAMPLE.com')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['balances'], {self.student.email: Decimal('5.00')})
+        self.assertEqual(self.credit(self.student.email).data['balances'], {self.student.email: Decimal('10.00')})
+        self.assertEqual(self.credit('grace@example.com').data['emails'], ['grace@example.com'])
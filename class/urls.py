@@ -1,9 +1,12 @@
 from django.urls import path
-from .views import ApproveJoinRequestView, BulkApprovalView, BulkGroupCreateView, ClassListView, ClassCreateView, GroupDetailWithStudentsView, ItemDetailView, ItemListCreateView, PurchaseApprovalView, PurchaseRequestView, UserEnrolledClassView, WalletBalanceView, WalletUpdateView,  join_class, GroupDetailView, AllGroupsInClassView, GroupCreateView, join_group
+from .views import ApproveJoinRequestView, BatchPurchaseApprovalView, BulkApprovalView, BulkGroupCreateView, BulkWalletCreditView, ClassListView, ClassCreateView, ClassExportView, ClassTransactionsView, ClassRosterView, GroupAssignmentView, GroupDetailWithStudentsView, ItemDetailView, ItemListCreateView, LeaderboardView, MultiClassGroupCreateView, PurchaseApprovalView, PurchaseRequestView, RosterImportView, StudentHomeView, TeacherDashboardView, UserEnrolledClassView, WalletBalanceView, WalletTransactionsView, WalletUpdateView,  join_class, GroupDetailView, AllGroupsInClassView, GroupCreateView, join_group
 
 urlpatterns = [
     path('', ClassListView.as_view(), name='class_list'),
     path('create/', ClassCreateView.as_view(), name='class_create'),
+    path('<int:class_id>/students/', ClassRosterView.as_view(), name='class_roster'),
+    path('<int:class_id>/students/import/', RosterImportView.as_view(), name='class_roster_import'),
+    path('<int:class_id>/export/<str:kind>/', ClassExportView.as_view(), name='class-export'),
     path('join/<str:class_code>/', join_class, name='join_class'),
     path('group/<int:group_id>/', GroupDetailView.as_view(), name='group_detail'),
     path('group/all-groups/<int:class_id>/', AllGroupsInClassView.as_view(), name='all_groups_in_class'),
@@ -11,17 +14,26 @@ urlpatterns = [
     path('group/join/<int:group_id>/', join_group, name='join_group'),
     path('group/details/<int:group_id>/', GroupDetailWithStudentsView.as_view(), name='group_detail_with_students'),
     path('enrolled/', UserEnrolledClassView.as_view(), name='user_enrolled_class'),
+    path('dashboard/', TeacherDashboardView.as_view(), name='teacher-dashboard'),
+    path('home/', StudentHomeView.as_view(), name='student-home'),
     path('group/<int:group_id>/approve-request/', ApproveJoinRequestView.as_view(), name='approve-join-request'),
     path('<int:class_id>/bulk-create-groups/', BulkGroupCreateView.as_view(), name='bulk-create-groups'),
+    path('<int:class_id>/assign-groups/', GroupAssignmentView.as_view(), name='assign-groups'),
+    path('group/bulk-create/', MultiClassGroupCreateView.as_view(), name='bulk-create-groups-multi-class'),
     path('group/<int:group_id>/bulk-approve/', BulkApprovalView.as_view(), name='bulk-approve'),
     path('wallets/<int:class_id>/balance/', WalletBalanceView.as_view(), name='wallet-balance'),
     path('wallets/<int:class_id>/', WalletUpdateView.as_view(), name='wallet-update'),
+    path('<int:class_id>/leaderboard/', LeaderboardView.as_view(), name='class-leaderboard'),
+    path('wallets/<int:class_id>/bulk-credit/', BulkWalletCreditView.as_view(), name='wallet-bulk-credit'),
+    path('wallets/<int:class_id>/transactions/', WalletTransactionsView.as_view(), name='wallet-transactions'),
+    path('<int:class_id>/transactions/', ClassTransactionsView.as_view(), name='class-transactions'),
     path('<int:class_id>/items/', ItemListCreateView.as_view(), name='item-list-create'),
     path('<int:class_id>/items/<int:item_id>/', ItemDetailView.as_view(), name='item-detail'),
     path('<int:class_id>/purchase-approval/', PurchaseApprovalView.as_view(), name='view-purchase-requests'),
      path('<int:class_id>/purchase-item/<int:item_id>/', PurchaseRequestView.as_view(), name='send-purchase-request'),
     # URL to approve/decline a specific purchase request by request_id
     path('purchase-request/<int:request_id>/action/', PurchaseApprovalView.as_view(), name='approve-decline-purchase-request'),
+    path('purchase-request/batch-action/', BatchPurchaseApprovalView.as_view(), name='batch-purchase-action'),
 ]
 
 
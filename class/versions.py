@@ -0,0 +1,31 @@
+"""
+Version tokens for conditional GET (see perksway/conditional.py).
+
+Each is one small query telling whether anything a response shows has
+changed. A list is versioned by its row count and latest updated_at, so
+additions, edits and deletions all move it; a group by its own updated_at,
+which groups.py also moves when students join or requests come and go.
+Edits to a student's own name or email do not touch the groups they are in.
+"""
+from django.db.models import Count, Max
+
+from .models import Group, Item
+
+
+def _list(queryset):
+    version = queryset.aggregate(count=Count('pk'), latest=Max('updated_at'))
+    # The latest timestamp does not move when a row is deleted, so no Last-Modified
+    return (version['count'], version['latest']), None
+
+
+def items(request, class_id):
+    return _list(Item.objects.filter(class_ref_id=class_id))
+
+
+def groups(request, class_id):
+    return _list(Group.objects.filter(class_ref_id=class_id))
+
+
+def group(request, group_id):
+    updated_at = Group.objects.filter(pk=group_id).values_list('updated_at', flat=True).first()
+    return None if updated_at is None else (updated_at, updated_at)
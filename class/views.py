@@ -1,10 +1,11 @@
 from urllib import request
-from rest_framework import generics, permissions
+from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import NotFound, PermissionDenied
 from users.models import CustomUser
 from .models import Class, Item, PurchaseRequest, Wallet
-from .serializers import BulkGroupCreateSerializer, ClassSerializer, GroupDetailSerializer, ItemSerializer, PurchaseRequestSerializer, UserSerializer
+from .serializers import BalanceQuerySerializer, BatchPurchaseActionSerializer, BulkGroupCreateSerializer, BulkWalletCreditSerializer, ClassSerializer, ExportSerializer, GroupAssignmentSerializer, GroupDetailSerializer, ItemSerializer, LeaderboardQuerySerializer, StudentHomeSerializer, TeacherDashboardSerializer, MultiClassGroupCreateSerializer, PurchaseRequestSerializer, TransactionFilterSerializer, TransactionSerializer, UserSerializer
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 from rest_framework import status
@@ -12,29 +13,97 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from .models import Class, Group
-from .serializers import GroupSerializer
+from .serializers import GroupSerializer, GroupUpdateSerializer
+from django.db.models.functions import Lower
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from decimal import Decimal
-
-# Custom permission to allow only teachers to create classes
-class IsTeacher(permissions.BasePermission):
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == 'teacher'
+import json
+from collections import Counter
+from perksway import sparse
+from perksway.conditional import conditional, etag, not_modified, tagged
+from . import dashboard, exports, fastpath, groups, leaderboard, ledger, membership, purchases, querysets, reconciliation, roster_import, versions
+from .permissions import IsClassMember, IsClassStudent, IsClassTeacher, IsStudent, IsTeacher, ReadOnly
+from .pagination import CursorPage, ItemPage, KeysetPage, PurchaseQueuePage, RosterPage
 
 # List all classes for authenticated users (students can view and join, teachers can view their own classes)
 class ClassListView(generics.ListAPIView):
     queryset = Class.objects.all()
     serializer_class = ClassSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CursorPage
 
     def get_queryset(self):
         user = self.request.user
         # If the user is a teacher, show only the classes they have created
         if user.role == 'teacher':
-            return Class.objects.filter(teacher=user)
+            queryset = querysets.classes().filter(teacher=user)
         elif user.role == 'student':
-            return Class.objects.filter(students=user)
-        # If the user is a student, show all classes
+            queryset = querysets.classes().filter(students=user)
+        else:
+            return Class.objects.none()
+        # Load only what ?fields= and ?expand= ask for
+        return sparse.shape(queryset, self.get_serializer(), 'id')
+
+# List the students of a class, for its teacher and its students
+class ClassRosterView(generics.ListAPIView):
+    serializer_class = UserSerializer
+    permission_classes = [IsAuthenticated, IsClassMember]
+    pagination_class = RosterPage
+
+    def get_queryset(self):
+        return CustomUser.objects.filter(joined_classes=self.kwargs['class_id']).only(*querysets.USER_FIELDS)
+
+class RosterImportView(APIView):
+    # Only the teacher of the class may enroll students
+    permission_classes = [IsAuthenticated, IsClassTeacher]
+
+    def post(self, request, class_id):
+        """
+        Enroll the students listed in an uploaded CSV (an "email" column, or
+        emails in the first column) or NDJSON file. Streams one NDJSON outcome
+        per row, then a summary line.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "Upload the roster as 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('file_format') or ('ndjson' if upload.name.endswith(('.ndjson', '.jsonl')) else 'csv')
+        if file_format not in ('csv', 'ndjson'):
+            return Response({"error": "file_format must be 'csv' or 'ndjson'."}, status=status.HTTP_400_BAD_REQUEST)
+        class_obj = get_object_or_404(Class, id=class_id)
+
+        def lines():
+            totals = Counter()
+            for outcome in roster_import.import_roster(class_obj, roster_import.read_emails(upload, file_format)):
+                totals[outcome['status']] += 1
+                yield json.dumps(outcome) + '\n'
+            yield json.dumps({'summary': totals}) + '\n'
+
+        return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+
+class ClassExportView(APIView):
+    # Exports hold every student's records, so they are for the teacher only
+    permission_classes = [IsAuthenticated, IsClassTeacher]
+
+    def get(self, request, class_id, kind):
+        """
+        Stream the class's transactions, purchases or roster as CSV or NDJSON
+        (?file_format=), optionally gzipped (?gzip=1), limited to a term with
+        ?since= and ?until=.
+        """
+        if kind not in exports.KINDS:
+            raise NotFound(f"Unknown export '{kind}'.")
+        options = ExportSerializer(data=request.query_params)
+        options.is_valid(raise_exception=True)
+        file_format, compress = options.validated_data['file_format'], options.validated_data['gzip']
+
+        response = StreamingHttpResponse(
+            exports.stream(
+                kind, class_id, file_format, options.validated_data.get('since'), options.validated_data.get('until'), compress,
+            ),
+            content_type=exports.content_type(file_format, compress),
+        )
+        response['Content-Disposition'] = f'attachment; filename="{exports.filename(kind, class_id, file_format, compress)}"'
+        return response
 
 # Create a class (only for teachers)
 class ClassCreateView(generics.CreateAPIView):
@@ -56,7 +125,7 @@ def join_class(request, class_code):
         return Response({'error': 'Class not found'}, status=status.HTTP_404_NOT_FOUND)
 
     if request.user.role == 'student':
-        if class_to_join.students.filter(id=request.user.id).exists():
+        if membership.is_student(request.user, class_to_join.id):
             return Response({'error': 'You are already enrolled in this class'}, status=status.HTTP_409_CONFLICT)
         
         class_to_join.students.add(request.user)
@@ -71,27 +140,18 @@ def join_class(request, class_code):
 class GroupDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
-    def get(self, request, class_id):
-        """Retrieve list of groups for the class where the user is present (either as a student or teacher)."""
-        # Get the class object
-        class_obj = get_object_or_404(Class, id=class_id)
-        
-        # Check if the user is the teacher of the class
-        if request.user == class_obj.teacher:
-            # If user is the teacher, return all groups of this class
-            groups = Group.objects.filter(class_ref=class_obj)
-        
-        # Check if the user is a student in the class
-        elif class_obj.students.filter(id=request.user.id).exists():
-            # If user is a student, return all groups of this class
-            groups = Group.objects.filter(class_ref=class_obj)
-        
-        else:
+    def get(self, request, group_id):
+        """Retrieve a group of a class where the user is present (either as a student or teacher)."""
+        serializer = GroupSerializer(**sparse.options(request))
+        group = get_object_or_404(sparse.shape(Group.objects.all(), serializer, 'class_ref'), id=group_id)
+
+        # Only the teacher and the students of the class may see its groups
+        if not membership.is_member(request.user, group.class_ref_id):
             # If the user is neither a teacher nor a student in the class, deny access
             return Response({"detail": "You are not a member of this class."}, status=status.HTTP_403_FORBIDDEN)
-        
+
         # Serialize and return the group data
-        serializer = GroupSerializer(groups, many=True)
+        serializer.instance = group
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     
@@ -100,10 +160,10 @@ class GroupDetailView(APIView):
         group = get_object_or_404(Group, id=group_id)
 
         # Ensure the user is the creator/teacher of the class the group belongs to
-        if request.user != group.class_ref.teacher:
+        if not membership.is_teacher(request.user, group.class_ref_id):
             return Response({"error": "You are not authorized to update this group."}, status=status.HTTP_403_FORBIDDEN)
 
-        serializer = GroupSerializer(group, data=request.data, partial=True)
+        serializer = GroupUpdateSerializer(group, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -111,25 +171,22 @@ class GroupDetailView(APIView):
 
     def delete(self, request, group_id):
         """Delete group (only by the creator)."""
-        group = self.get_group(group_id, request.user)
-        if not group:
+        group = get_object_or_404(Group, id=group_id)
+        if request.user.id != group.creator_id:
             return Response({"detail": "Permission denied. You are not the creator of this group."}, status=status.HTTP_403_FORBIDDEN)
 
         group.delete()
         return Response({"detail": "Group deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
 
-class AllGroupsInClassView(APIView):
-    permission_classes = [IsAuthenticated]  # Only authenticated users can access this API
+class AllGroupsInClassView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated, IsClassMember]  # Only the teacher and students of the class
+    pagination_class = CursorPage
 
+    @conditional(versions.groups)
     def get(self, request, class_id):
         """Retrieve all groups for a given class."""
-        class_obj = get_object_or_404(Class, id=class_id)
-
-        # Get all groups associated with this class
-        groups = Group.objects.filter(class_ref=class_obj)
-        serializer = GroupSerializer(groups, many=True)
-        
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Get all groups associated with this class, as GroupSerializer would show them
+        return fastpath.GROUPS.list_response(self, Group.objects.filter(class_ref_id=class_id), 'id', render=fastpath.groups)
 
 
 
@@ -139,15 +196,14 @@ class GroupCreateView(generics.CreateAPIView):
 
     def perform_create(self, serializer):
         # Get the class based on class_id from the URL
-        class_id = self.request.data.get('class_ref')
-        class_obj = get_object_or_404(Class, id=class_id)
+        class_obj = serializer.validated_data['class_ref']
 
         # Ensure the logged-in user is the teacher of this class
-        if self.request.user != class_obj.teacher:
-            return Response({"detail": "You are not authorized to create groups for this class."}, status=status.HTTP_403_FORBIDDEN)
+        if not membership.is_teacher(self.request.user, class_obj.id):
+            raise PermissionDenied("You are not authorized to create groups for this class.")
 
         # Create the group and set the current user as the creator and class_ref as the class
-        serializer.save(creator=self.request.user, class_ref=class_obj) 
+        serializer.save(creator=self.request.user, class_ref=class_obj)
 
 
 
@@ -155,35 +211,30 @@ class GroupCreateView(generics.CreateAPIView):
 @permission_classes([IsAuthenticated])
 def join_group(request, group_id):
     group = get_object_or_404(Group, id=group_id)
-    user = request.user
-    
-    # Check if student is already in another group in the same class
-    class_groups = Group.objects.filter(class_ref=group.class_ref, students=user)
-    if class_groups.exists():
-        return Response({"error": "Already in another group in this class."}, status=403)
-    
-    # Check if max_students limit has been reached
-    if group.max_students and group.students.count() >= group.max_students:
-        return Response({"error": "Group is full."}, status=403)
 
-    # If approval is required, add to pending approvals
-    if group.requires_approval:
-        group.pending_approvals.add(user)
+    # Seats and the one-group-per-class rule are enforced atomically by the service
+    try:
+        joined = groups.join(group, request.user)
+    except groups.GroupError as e:
+        return Response({"error": str(e)}, status=403)
+
+    # If approval is required, the student was added to pending approvals
+    if not joined:
         return Response({"message": "Join request submitted for approval."}, status=200)
-    else:
-        group.students.add(user)
-        return Response({"message": "Successfully joined the group."}, status=200)
+    return Response({"message": "Successfully joined the group."}, status=200)
 
 
 class GroupDetailWithStudentsView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional(versions.group)
     def get(self, request, group_id):
         # Get the group based on the provided group_id
-        group = get_object_or_404(Group, id=group_id)
+        serializer = GroupDetailSerializer(**sparse.options(request))
+        group = get_object_or_404(sparse.shape(Group.objects.all(), serializer), id=group_id)
         
         # Serialize the group data, including nested students
-        serializer = GroupDetailSerializer(group)
+        serializer.instance = group
         
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -197,17 +248,18 @@ class UserEnrolledClassView(APIView):
 
         if user.role == 'student':
             # Get the class where the student is enrolled
-            enrolled_classes = Class.objects.filter(students=user)
-            if enrolled_classes.exists():
-                serializer = ClassSerializer(enrolled_classes.first())  # Assuming a student is enrolled in one class
+            serializer = ClassSerializer(**sparse.options(request))
+            enrolled_class = sparse.shape(querysets.classes(), serializer).filter(students=user).first()
+            if enrolled_class is not None:
+                serializer.instance = enrolled_class  # Assuming a student is enrolled in one class
                 return Response(serializer.data, status=status.HTTP_200_OK)
             else:
                 return Response({"detail": "User is not enrolled in any class."}, status=status.HTTP_404_NOT_FOUND)
 
         elif user.role == 'teacher':
             # Get the classes where the teacher is the creator
-            created_classes = Class.objects.filter(teacher=user)
-            serializer = ClassSerializer(created_classes, many=True)
+            serializer = ClassSerializer(many=True, **sparse.options(request))
+            serializer.instance = sparse.shape(querysets.classes(), serializer).filter(teacher=user)
             return Response(serializer.data, status=status.HTTP_200_OK)
         
         return Response({"detail": "User role not recognized."}, status=status.HTTP_400_BAD_REQUEST)
@@ -215,6 +267,24 @@ class UserEnrolledClassView(APIView):
 
 
 
+class TeacherDashboardView(APIView):
+    permission_classes = [IsAuthenticated, IsTeacher]
+
+    def get(self, request):
+        """Every class the teacher teaches, with the figures the home page shows."""
+        serializer = TeacherDashboardSerializer(dashboard.teacher_dashboard(request.user), many=True)
+        return Response({'classes': serializer.data}, status=status.HTTP_200_OK)
+
+
+class StudentHomeView(APIView):
+    permission_classes = [IsAuthenticated, IsStudent]
+
+    def get(self, request):
+        """Every class the student is enrolled in, with their balance, group and pending purchases."""
+        serializer = StudentHomeSerializer(dashboard.student_home(request.user), many=True)
+        return Response({'classes': serializer.data}, status=status.HTTP_200_OK)
+
+
 class ApproveJoinRequestView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -222,21 +292,18 @@ class ApproveJoinRequestView(APIView):
         group = get_object_or_404(Group, id=group_id)
         
         # Ensure the request is made by the teacher
-        if request.user != group.class_ref.teacher:
+        if not membership.is_teacher(request.user, group.class_ref_id):
             return Response({"error": "Not authorized"}, status=403)
 
         # Check if only the count is needed
         only_count = request.query_params.get('count', False)
 
-        # List pending approvals
-        pending_users = group.pending_approvals.all()
-        
-        # If only the count is needed
+        # If only the count is needed, the group keeps it
         if only_count:
-            return Response({"count": pending_users.count()})
+            return Response({"count": group.pending_count})
 
         # Return details if count is not specifically requested
-        user_details = [{"id": user.id, "username": user.username} for user in pending_users]
+        user_details = [{"id": user.id, "username": user.username} for user in group.pending_approvals.only('id', 'username')]
         return Response({"pending_approvals": user_details, "count": len(user_details)})
 
     def post(self, request, group_id):
@@ -244,18 +311,20 @@ class ApproveJoinRequestView(APIView):
         user_id = request.data.get("user_id")
         action = request.data.get("action")  # 'approve' or 'decline'
         
-        if request.user != group.class_ref.teacher:
+        if not membership.is_teacher(request.user, group.class_ref_id):
             return Response({"error": "Not authorized"}, status=403)
 
         student = get_object_or_404(CustomUser, id=user_id)
         
         if action == "approve":
-            group.students.add(student)
-            group.pending_approvals.remove(student)
+            try:
+                groups.add_students(group, [student])
+            except groups.GroupError as e:
+                return Response({"error": str(e)}, status=409)
             return Response({"message": "Student approved to join."})
         
         elif action == "decline":
-            group.pending_approvals.remove(student)
+            groups.decline(group, [student])
             return Response({"message": "Student request declined."})
         
         return Response({"error": "Invalid action"}, status=400)
@@ -263,39 +332,75 @@ class ApproveJoinRequestView(APIView):
 
 
 class BulkGroupCreateView(APIView):
-    permission_classes = [IsAuthenticated]
+    # Only the teacher of the class may create groups
+    permission_classes = [IsAuthenticated, IsClassTeacher]
 
     def post(self, request, class_id):
-        # Check if the logged-in user is the teacher for the class
-        class_obj = get_object_or_404(Class, id=class_id)
-        if request.user != class_obj.teacher:
-            return Response({"error": "Not authorized to create groups for this class."}, status=status.HTTP_403_FORBIDDEN)
-
         serializer = BulkGroupCreateSerializer(data=request.data)
         if serializer.is_valid():
             data = serializer.validated_data
-            groups = []
-
-            # Loop to create the specified number of groups
-            for i in range(data['number_of_groups']):
-                group_name = f"{data['group_name_prefix']} {i + 1}"
-                group = Group(
-                    name=group_name,
-                    max_students=data['max_students'],
-                    requires_approval=data['requires_approval'],
-                    class_ref=class_obj,
-                    creator=request.user
-                )
-                group.save()
-                groups.append(group)
+            created = groups.create_groups(request.user, [{**data, 'class_id': class_id}])
 
             return Response(
-                {"message": f"{data['number_of_groups']} groups created successfully.", "groups": [group.name for group in groups]},
+                {
+                    "message": f"{data['number_of_groups']} groups created successfully.",
+                    "groups": [group.name for group in created],
+                    "ids": [group.id for group in created],
+                },
                 status=status.HTTP_201_CREATED
             )
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
+class MultiClassGroupCreateView(APIView):
+    # Groups for several classes at once, e.g. a whole school's project week
+    permission_classes = [IsAuthenticated, IsTeacher]
+
+    def post(self, request):
+        serializer = MultiClassGroupCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        specs = serializer.validated_data['classes']
+
+        not_taught = sorted({spec['class_id'] for spec in specs if not membership.is_teacher(request.user, spec['class_id'])})
+        if not_taught:
+            return Response({"error": "You are not the teacher of these classes.", "class_ids": not_taught},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        created = groups.create_groups(request.user, specs)
+        ids = {}
+        for group in created:
+            ids.setdefault(group.class_ref_id, []).append(group.id)
+        return Response(
+            {"message": f"{len(created)} groups created successfully.", "ids": ids},
+            status=status.HTTP_201_CREATED
+        )
+
+class GroupAssignmentView(APIView):
+    # Only the teacher of the class may assign its students
+    permission_classes = [IsAuthenticated, IsClassTeacher]
+
+    def post(self, request, class_id):
+        """Put every student of the class who has no group yet into one."""
+        serializer = GroupAssignmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            placed, left = groups.assign(class_id, data['strategy'], data.get('seed'))
+        except groups.GroupError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+
+        sizes = {}
+        for group_id in placed.values():
+            sizes[group_id] = sizes.get(group_id, 0) + 1
+        return Response({
+            "message": f"{len(placed)} students assigned to groups.",
+            "assigned": sizes,
+            "unassigned": left,
+        })
+
+
 class BulkApprovalView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -304,17 +409,19 @@ class BulkApprovalView(APIView):
         user_ids = request.data.get("user_ids", [])  # List of user IDs
         action = request.data.get("action")  # 'approve' or 'decline'
         
-        if request.user != group.class_ref.teacher:
+        if not membership.is_teacher(request.user, group.class_ref_id):
             return Response({"error": "Not authorized"}, status=403)
         
         students = CustomUser.objects.filter(id__in=user_ids)
         
         if action == "approve":
-            group.students.add(*students)
-            group.pending_approvals.remove(*students)
+            try:
+                groups.add_students(group, students)
+            except groups.GroupError as e:
+                return Response({"error": str(e)}, status=409)
             message = "Students approved to join."
         elif action == "decline":
-            group.pending_approvals.remove(*students)
+            groups.decline(group, students)
             message = "Student requests declined."
         else:
             return Response({"error": "Invalid action"}, status=400)
@@ -323,33 +430,94 @@ class BulkApprovalView(APIView):
 
 
 
-class WalletBalanceView(APIView):
-    permission_classes = [IsAuthenticated]
+class TransactionHistoryView(generics.ListAPIView):
+    """Newest-first ledger entries, filtered by ?type=, ?since= and ?until=."""
+    serializer_class = TransactionSerializer
+    pagination_class = KeysetPage
 
-    def get(self, request, class_id):
-        """Get the wallet balance for the logged-in user in the specified class."""
-        # Check if the class exists and the user is enrolled in it
-        class_obj = get_object_or_404(Class, id=class_id)
+    def get_queryset(self):
+        filters = TransactionFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        self.filters = filters.validated_data
+
+        queryset = self.scope(querysets.transactions())
+        if 'type' in self.filters:
+            queryset = queryset.filter(transaction_type=self.filters['type'])
+        if 'since' in self.filters:
+            queryset = queryset.filter(date__gte=self.filters['since'])
+        if 'until' in self.filters:
+            queryset = queryset.filter(date__lt=self.filters['until'])
+        # KeysetPage orders by date and id
+        return sparse.shape(queryset, self.get_serializer(), 'date')
+
+
+class WalletTransactionsView(TransactionHistoryView):
+    # Students see their own wallet; the teacher may pick one with ?student=
+    permission_classes = [IsAuthenticated, IsClassMember]
 
-        if request.user.role == 'student' and not class_obj.students.filter(id=request.user.id).exists():
-            return Response({'error': 'User is not a student in this class'}, status=status.HTTP_403_FORBIDDEN)
+    def scope(self, queryset):
+        class_id = self.kwargs['class_id']
+        owner_id = self.filters.get('student', self.request.user.id)
+        if owner_id != self.request.user.id and not membership.is_teacher(self.request.user, class_id):
+            raise PermissionDenied("You can only see your own wallet.")
+        wallet_id = Wallet.objects.filter(owner_id=owner_id, class_ref_id=class_id).values_list('id', flat=True).first()
+        if wallet_id is None:
+            raise NotFound("Wallet not found.")
+        return queryset.filter(wallet_id=wallet_id)
 
+
+class ClassTransactionsView(TransactionHistoryView):
+    # Every wallet of the class, for its teacher
+    permission_classes = [IsAuthenticated, IsClassTeacher]
+
+    def scope(self, queryset):
+        return queryset.filter(class_ref_id=self.kwargs['class_id'])
+
+
+class WalletBalanceView(APIView):
+    # Students must be enrolled in the class; teachers have no wallet and get a 404
+    permission_classes = [IsAuthenticated, IsClassMember]
+
+    def get(self, request, class_id):
+        """
+        Get the wallet balance for the logged-in user in the specified class,
+        or with ?as_of= what the ledger says it was at that moment.
+        """
+        query = BalanceQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
         # Fetch the wallet associated with this user and class
         try:
-            wallet = Wallet.objects.get(owner=request.user, class_ref=class_obj)
-            return Response({'balance': wallet.balance}, status=status.HTTP_200_OK)
+            wallet = Wallet.objects.get(owner=request.user, class_ref_id=class_id)
         except Wallet.DoesNotExist:
             return Response({'error': 'Wallet not found for this class'}, status=status.HTTP_404_NOT_FOUND)
+        if 'as_of' in query.validated_data:
+            as_of = query.validated_data['as_of']
+            return Response({'balance': reconciliation.balance_as_of(wallet, as_of), 'as_of': as_of}, status=status.HTTP_200_OK)
+        # The balance is the version: pollers get a 304 until it moves
+        tag = etag(request, (wallet.pk, wallet.balance))
+        response = not_modified(request, tag)
+        if response is not None:
+            return response
+        return tagged(Response({'balance': wallet.balance}, status=status.HTTP_200_OK), tag)
 
 
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.response import Response
-from rest_framework.views import APIView
-from django.shortcuts import get_object_or_404
-from .models import Class, CustomUser, Wallet
+class LeaderboardView(APIView):
+    # Every member of the class may see the board
+    permission_classes = [IsAuthenticated, IsClassMember]
+
+    def get(self, request, class_id):
+        """The top ?limit= wallets of the class, and the caller's own rank."""
+        query = LeaderboardQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response({
+            'top': leaderboard.top(class_id, query.validated_data['limit']),
+            'me': leaderboard.rank_of(class_id, request.user.id),
+        }, status=status.HTTP_200_OK)
+
 
 class WalletUpdateView(APIView):
-    permission_classes = [IsAuthenticated]
+    # Only the teacher of the class may change its wallets
+    permission_classes = [IsAuthenticated, IsClassTeacher]
 
     def put(self, request, class_id):
         student_email = request.data.get('email')
@@ -360,50 +528,78 @@ class WalletUpdateView(APIView):
             return Response({"error": "Missing email or amount."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            class_obj = get_object_or_404(Class, id=class_id)
-            student = class_obj.students.get(email=student_email)  # Directly get student from class students set
-        except Class.DoesNotExist:
-            return Response({"error": "Class not found"}, status=status.HTTP_404_NOT_FOUND)
+            student = CustomUser.objects.get(joined_classes=class_id, email=student_email)  # Only students of this class
         except CustomUser.DoesNotExist:
             return Response({"error": "Student not found in this class"}, status=status.HTTP_404_NOT_FOUND)
 
+        try:
+            amount = ledger.to_amount(amount)
+        except ledger.InvalidAmount as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         # Get or create a wallet for the student in this class
-        wallet, created = Wallet.objects.get_or_create(owner=student, class_ref=class_obj, defaults={'balance': 0.00})
+        wallet, created = Wallet.objects.get_or_create(owner=student, class_ref_id=class_id, defaults={'balance': 0.00})
 
+        # Negative amounts are posted as debits and may not overdraw the wallet
+        description = request.data.get('description') or "Wallet update by teacher"
         try:
-            # Convert amount to float and update the wallet balance
-            amount = Decimal(amount)
-            wallet.balance += amount
-            wallet.save()
-            return Response({"message": "Wallet updated successfully.", "new_balance": wallet.balance}, status=status.HTTP_200_OK)
-        except ValueError:
-            return Response({"error": "Invalid amount format. Please provide a valid number."}, status=status.HTTP_400_BAD_REQUEST)
+            ledger.adjust(wallet, amount, description=description[:255])
+        except ledger.InsufficientFunds:
+            return Response({"error": "Student does not have enough balance for this deduction."}, status=status.HTTP_400_BAD_REQUEST)
+        except ledger.InvalidAmount as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"message": "Wallet updated successfully.", "new_balance": wallet.balance}, status=status.HTTP_200_OK)
 
 
-class ItemListCreateView(APIView):
-    permission_classes = [IsAuthenticated]
+class BulkWalletCreditView(APIView):
+    permission_classes = [IsAuthenticated, IsClassTeacher]
 
-    def get(self, request, class_id):
-        print(request.user.role)
-        # Ensure the user is the teacher for the class
-        class_obj = get_object_or_404(Class, id=class_id)
-        # if request.user != class_obj.teacher:
-        #     return Response({"error": "You are not authorized to manage items for this class."}, status=status.HTTP_403_FORBIDDEN)
+    def post(self, request, class_id):
+        """Credit many students of a class (or the whole class) in one request."""
+        serializer = BulkWalletCreditSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        roster = CustomUser.objects.filter(joined_classes=class_id)
+        if 'amount' in data:
+            students = dict(roster.values_list('id', 'email'))
+            amounts = {student_id: data['amount'] for student_id in students}
+        else:
+            # Emails are matched case-insensitively on both sides
+            requested = {entry['email'].lower(): entry['amount'] for entry in data['credits']}
+            students = dict(roster.alias(email_lower=Lower('email')).filter(email_lower__in=requested).values_list('id', 'email'))
+            missing = set(requested) - {email.lower() for email in students.values()}
+            if missing:
+                return Response({"error": "Student not found in this class", "emails": sorted(missing)}, status=status.HTTP_404_NOT_FOUND)
+            amounts = {student_id: requested[email.lower()] for student_id, email in students.items()}
 
-        # List all items for the class
-        items = Item.objects.filter(class_ref=class_obj)
-        serializer = ItemSerializer(items, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        try:
+            balances = ledger.bulk_credit(class_id, amounts, description=data['description'])
+        except ledger.InvalidAmount as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {
+                "message": f"{len(balances)} wallets credited successfully.",
+                "balances": {students[student_id]: balance for student_id, balance in balances.items()},
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class ItemListCreateView(generics.GenericAPIView):
+    # Anyone may browse the catalog; only the teacher of the class may add to it
+    permission_classes = [IsAuthenticated, ReadOnly | IsClassTeacher]
+    pagination_class = ItemPage
+
+    @conditional(versions.items)
+    def get(self, request, class_id):
+        # List all items for the class, as ItemSerializer would show them
+        return fastpath.ITEMS.list_response(self, Item.objects.filter(class_ref_id=class_id), 'created_at')
 
     def post(self, request, class_id):
-        # Ensure the user is the teacher for the class
-        class_obj = get_object_or_404(Class, id=class_id)
-        if request.user != class_obj.teacher:
-            return Response({"error": "You are not authorized to create items for this class."}, status=status.HTTP_403_FORBIDDEN)
-        print ("test1111")
-        print (class_obj.id)
         # Include the class_ref when creating an item
-        request.data['class_ref'] = class_obj.id
+        request.data['class_ref'] = class_id
         serializer = ItemSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
@@ -411,18 +607,16 @@ class ItemListCreateView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class ItemDetailView(APIView):
-    permission_classes = [IsAuthenticated]
+    # Only the teacher of the class may change or remove its items
+    permission_classes = [IsAuthenticated, ReadOnly | IsClassTeacher]
 
     def get(self, request, class_id, item_id):
-        print(request.user.role)
-        class_obj = get_object_or_404(Class, id=class_id)
-        item = get_object_or_404(Item, id=item_id, class_ref=class_obj)
-        serializer = ItemSerializer(item)
+        serializer = ItemSerializer(**sparse.options(request))
+        serializer.instance = get_object_or_404(sparse.shape(Item.objects.all(), serializer), id=item_id, class_ref_id=class_id)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def put(self, request, class_id, item_id):
-        class_obj = get_object_or_404(Class, id=class_id)
-        item = get_object_or_404(Item, id=item_id, class_ref=class_obj)
+        item = get_object_or_404(Item, id=item_id, class_ref_id=class_id)
         serializer = ItemSerializer(item, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -430,83 +624,82 @@ class ItemDetailView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request, class_id, item_id):
-        class_obj = get_object_or_404(Class, id=class_id)
-        item = get_object_or_404(Item, id=item_id, class_ref=class_obj)
+        item = get_object_or_404(Item, id=item_id, class_ref_id=class_id)
         item.delete()
         return Response({"detail": "Item deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
 
 
 
 
-class PurchaseApprovalView(APIView):
+class PurchaseApprovalView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
+    pagination_class = PurchaseQueuePage
 
     def get(self, request, class_id):
         """Retrieve all pending purchase requests for the teacher's class."""
-        class_obj = get_object_or_404(Class, id=class_id)
-
         # Ensure the logged-in user is the teacher of the class
-        if request.user != class_obj.teacher:
+        if not membership.is_teacher(request.user, class_id):
             return Response({"error": "You are not authorized to approve purchases for this class."}, status=403)
 
-        # Fetch all pending purchase requests for the class
-        pending_requests = PurchaseRequest.objects.filter(class_ref=class_obj, status='pending')
-        serializer = PurchaseRequestSerializer(pending_requests, many=True)
-        
-        return Response(serializer.data, status=200)
+        # Fetch all pending purchase requests for the class, as PurchaseRequestSerializer would show them
+        pending_requests = PurchaseRequest.objects.filter(class_ref_id=class_id, status='pending')
+        return fastpath.PURCHASE_REQUESTS.list_response(self, pending_requests, 'requested_at')
 
     def post(self, request, request_id):
         """Approve or decline a purchase request."""
         purchase_request = get_object_or_404(PurchaseRequest, id=request_id)
 
         # Ensure the logged-in user is the teacher of the class
-        if request.user != purchase_request.class_ref.teacher:
+        if not membership.is_teacher(request.user, purchase_request.class_ref_id):
             return Response({"error": "You are not authorized to approve or decline this purchase."}, status=403)
 
         action = request.data.get('action')  # 'approve' or 'decline'
         
-        if action == "approve":
-            # Deduct the amount from the student's wallet and complete the purchase
-            wallet = get_object_or_404(Wallet, owner=purchase_request.student, class_ref=purchase_request.class_ref)
-            
-            if wallet.balance < purchase_request.amount:
-                return Response({"error": "Student does not have enough balance to complete the purchase."}, status=400)
-
-            # Deduct the amount from the wallet
-            wallet.balance -= purchase_request.amount
-            wallet.save()
+        try:
+            if action == "approve":
+                # Deduct the amount and mark the request approved in one transaction
+                purchases.approve(purchase_request)
+                return Response({"message": "Purchase approved and wallet updated."}, status=200)
+
+            elif action == "decline":
+                purchases.decline(purchase_request)
+                return Response({"message": "Purchase request declined."}, status=200)
+        except purchases.PurchaseConflict as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except ledger.InsufficientFunds:
+            return Response({"error": "Student does not have enough balance to complete the purchase."}, status=400)
+        except Wallet.DoesNotExist:
+            return Response({"error": "Wallet not found for this class"}, status=status.HTTP_404_NOT_FOUND)
 
-            # Update the purchase request status to 'approved'
-            purchase_request.status = 'approved'
-            purchase_request.save()
+        return Response({"error": "Invalid action. Use 'approve' or 'decline'."}, status=400)
 
-            return Response({"message": "Purchase approved and wallet updated."}, status=200)
+class BatchPurchaseApprovalView(APIView):
+    permission_classes = [IsAuthenticated]
 
-        elif action == "decline":
-            # Update the purchase request status to 'declined'
-            purchase_request.status = 'declined'
-            purchase_request.save()
+    def post(self, request):
+        """Approve or decline a list of purchase requests in one transaction."""
+        serializer = BatchPurchaseActionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            return Response({"message": "Purchase request declined."}, status=200)
+        # Requests outside the teacher's classes are reported as not found
+        results = purchases.process_batch(request.user, serializer.validated_data['request_ids'], serializer.validated_data['action'])
+        processed = sum(1 for result in results if result['status'] in ('approved', 'declined'))
+        return Response({"processed": processed, "failed": len(results) - processed, "results": results}, status=status.HTTP_200_OK)
 
-        return Response({"error": "Invalid action. Use 'approve' or 'decline'."}, status=400)
 
 class PurchaseRequestView(APIView):
-    permission_classes = [IsAuthenticated]
+    # Only students enrolled in the class may buy from it
+    permission_classes = [IsAuthenticated, IsClassStudent]
 
     def post(self, request, class_id, item_id):
         """Send a purchase request for an item."""
-        # Ensure the class exists and the student is enrolled
-        class_obj = get_object_or_404(Class, id=class_id)
-
-        if not class_obj.students.filter(id=request.user.id).exists():
-            return Response({"error": "You are not enrolled in this class."}, status=status.HTTP_403_FORBIDDEN)
-        
         # Ensure the item exists in the class
-        item = get_object_or_404(Item, id=item_id, class_ref=class_obj)
+        item = get_object_or_404(Item.objects.select_related('class_ref'), id=item_id, class_ref_id=class_id)
+        class_obj = item.class_ref
 
         # Check the student's wallet balance
-        wallet = get_object_or_404(Wallet, owner=request.user, class_ref=class_obj)
+        wallet = get_object_or_404(Wallet, owner=request.user, class_ref_id=class_id)
 
         if wallet.balance < item.price:
             return Response({"error": "Insufficient balance to make this purchase."}, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,62 @@
+"""
+Conditional GET.
+
+A view that can tell cheaply what its response depends on (a timestamp, a
+count, a balance) turns that version token into an ETag with `etag`, and
+answers a matching If-None-Match with `not_modified`'s 304 before running its
+queries and serializers. If-Modified-Since is not honoured: Last-Modified only
+has whole seconds, so a write in the same second as the client's copy would
+go unnoticed, whereas the ETag changes with every version. The ETag also
+covers the full path and the negotiated media type, so each page, ?fields=
+selection and format is a variant of its own.
+
+`conditional(version)` does all of this for a view method: `version(request,
+*args, **kwargs)` returns a (token, last_modified) pair, or None to skip the
+check (e.g. for a resource that does not exist). last_modified may be None
+where no timestamp covers every change, such as deletions from a list.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def etag(request, token):
+    """The ETag of `request`'s response while its data is at version `token`."""
+    key = f'{token!r}|{request.get_full_path()}|{getattr(request, "accepted_media_type", "")}'
+    return quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+
+
+def not_modified(request, tag):
+    """A 304 if the client's copy is current, else None."""
+    response = get_conditional_response(request, etag=tag)
+    if response is not None:
+        response.headers['ETag'] = tag
+    return response
+
+
+def tagged(response, tag, last_modified=None):
+    """Set ETag and Last-Modified on a successful `response`."""
+    if response.status_code == 200:
+        response.headers['ETag'] = tag
+        if last_modified:
+            response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def conditional(version):
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            current = version(request, *args, **kwargs)
+            if current is None:
+                return method(view, request, *args, **kwargs)
+            token, last_modified = current
+            tag = etag(request, token)
+            response = not_modified(request, tag)
+            if response is None:
+                response = tagged(method(view, request, *args, **kwargs), tag, last_modified)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,121 @@
+"""
+Sparse fieldsets and opt-in expansion.
+
+Serializers that use SparseFieldsMixin honour two query parameters:
+
+    ?fields=id,name       return only these fields
+    ?expand=creator       return these related fields as nested objects,
+                          as listed in the serializer's Meta.expandable
+
+Only the serializer at the top of the response reads them; nested ones keep
+their fields. `shape` then makes the query load just what the chosen fields
+read: only() for columns, select_related() for single related objects and a
+shaped prefetch for nested lists, so a smaller response is a cheaper one too.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def requested(request, param):
+    """The names in a comma-separated query parameter, or None without one."""
+    if request is None or param not in request.query_params:
+        return None
+    return [name.strip() for name in request.query_params[param].split(',') if name.strip()]
+
+
+def options(request):
+    """Serializer arguments for the request's ?fields= and ?expand=."""
+    return {'fields': requested(request, 'fields'), 'expand': requested(request, 'expand')}
+
+
+class SparseFieldsMixin:
+    """
+    Selects and expands fields from the request in the serializer context,
+    or from the `fields` and `expand` arguments. Meta.expandable maps field
+    names to callables returning the nested serializer to use instead.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        self.selected, self.expanded = fields, expand
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected, expanded = self.selected, self.expanded
+        parent = self.parent.parent if isinstance(self.parent, serializers.ListSerializer) else self.parent
+        if parent is None:
+            request = self.context.get('request')
+            selected = requested(request, 'fields') if selected is None else selected
+            expanded = requested(request, 'expand') if expanded is None else expanded
+
+        expandable = getattr(self.Meta, 'expandable', {})
+        errors = {}
+        unknown = [name for name in expanded or () if name not in expandable]
+        if unknown:
+            errors['expand'] = f"Cannot expand: {', '.join(unknown)}."
+        unknown = [name for name in selected or () if name not in fields and name not in expandable]
+        # Fields that only exist expanded (e.g. a class's students) need ?expand= as well
+        unexpanded = [name for name in selected or () if name not in fields and name in expandable and name not in (expanded or ())]
+        if unknown:
+            errors['fields'] = f"Unknown fields: {', '.join(unknown)}."
+        elif unexpanded:
+            errors['fields'] = f"Select these fields with ?expand= too: {', '.join(unexpanded)}."
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        for name in expanded or ():
+            fields[name] = expandable[name]()
+        if selected is not None:
+            keep = set(selected) | set(expanded or ())
+            fields = {name: field for name, field in fields.items() if name in keep}
+        return fields
+
+
+def shape(queryset, serializer, *keep):
+    """
+    Restrict `queryset` to what `serializer` (one or many=True) reads, plus
+    the `keep` columns (e.g. a pagination ordering). Any select_related or
+    prefetch_related already on the queryset is replaced.
+    """
+    serializer = getattr(serializer, 'child', serializer)
+    model = queryset.model
+    only, related, prefetch = ['pk', *keep], [], []
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            # Method fields and the like may read anything
+            only = None
+            continue
+        path = '__'.join(field.source_attrs)
+        if isinstance(field, serializers.ListSerializer):
+            child = field.child
+            prefetch.append(Prefetch(path, queryset=shape(child.Meta.model.objects.all(), child)))
+            continue
+        if isinstance(field, serializers.ManyRelatedField):
+            prefetch.append(path)
+            continue
+        if len(field.source_attrs) > 1:
+            # e.g. teacher.email
+            related.append('__'.join(field.source_attrs[:-1]))
+        elif isinstance(field, (serializers.BaseSerializer, serializers.StringRelatedField)):
+            related.append(path)
+        elif only is not None and not _is_column(model, path):
+            only = None
+        if only is not None:
+            only.append(path)
+
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset if only is None else queryset.only(*only)
+
+
+def _is_column(model, name):
+    try:
+        return model._meta.get_field(name).concrete
+    except FieldDoesNotExist:
+        return False
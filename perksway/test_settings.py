@@ -0,0 +1,38 @@
+"""
+Settings used by the test suite.
+
+The tests run against a local SQLite file, so no database server is needed.
+`manage.py test` picks this module up automatically. Set PERKSWAY_TEST_DB=postgres
+to run them against the PostgreSQL server configured in settings.py instead;
+the standard PGHOST/PGPORT/PGUSER/PGPASSWORD/PGDATABASE variables override it.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+
+SQLITE_DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction begins, so concurrent
+            # writers queue up instead of failing with "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # A file (not :memory:) so threads in concurrency tests share the data
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    }
+}
+
+# Hashing passwords properly only slows the tests down
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+if os.environ.get('PERKSWAY_TEST_DB') == 'postgres':
+    DATABASES['default'].update({
+        key: os.environ[variable]
+        for key, variable in [('HOST', 'PGHOST'), ('PORT', 'PGPORT'), ('USER', 'PGUSER'), ('PASSWORD', 'PGPASSWORD'), ('NAME', 'PGDATABASE')]
+        if variable in os.environ
+    })
+else:
+    DATABASES = SQLITE_DATABASES
@@ -0,0 +1,183 @@
+"""
+Helpers for the query-count and latency regression tests.
+
+`seed_class` builds a class with realistic volumes using bulk inserts, and
+`RouteBudgetTestCase.assertRouteBudget` calls a route through the DRF test
+client and asserts an upper bound on its query count. Wall-clock times depend
+on the machine, so comparing them against a baseline file is opt-in: record a
+baseline on the machine that will check it, then run with PERKSWAY_PERF_TIMING=1.
+
+Environment variables:
+
+    PERKSWAY_PERF_TIMING     set to 1 to check (and record missing) timings
+    PERKSWAY_PERF_BASELINE   baseline file (default: perf_baseline.json in the project root)
+    PERKSWAY_PERF_UPDATE     set to 1 to overwrite the recorded timings
+    PERKSWAY_PERF_THRESHOLD  allowed slowdown factor before a route fails (default: 2.0)
+    PERKSWAY_PERF_SLACK_MS   absolute allowance added on top, to absorb noise (default: 25)
+"""
+import json
+import os
+import time
+from decimal import Decimal
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from users.models import CustomUser
+
+# The app is called "class", a keyword, so it cannot be imported by name
+class_models = import_module('class.models')
+membership = import_module('class.membership')
+
+BASELINE_PATH = os.environ.get('PERKSWAY_PERF_BASELINE', os.path.join(settings.BASE_DIR, 'perf_baseline.json'))
+CHECK_TIMING = os.environ.get('PERKSWAY_PERF_TIMING') == '1'
+UPDATE_BASELINE = os.environ.get('PERKSWAY_PERF_UPDATE') == '1'
+THRESHOLD = float(os.environ.get('PERKSWAY_PERF_THRESHOLD', '2.0'))
+SLACK = float(os.environ.get('PERKSWAY_PERF_SLACK_MS', '25')) / 1000
+
+PASSWORD = 'pass'
+
+
+def create_users(prefix, count, role='student'):
+    """Bulk-create `count` users that can all log in with PASSWORD."""
+    password = make_password(PASSWORD)
+    return CustomUser.objects.bulk_create([
+        CustomUser(email=f'{prefix}{i}@example.com', first_name=prefix.title(), last_name=str(i), role=role, password=password)
+        for i in range(count)
+    ])
+
+
+def seed_class(code='SEED', students=200, groups=20, group_size=8, items=50, purchases=100, balance='100.00'):
+    """
+    Create a teacher and one class populated with students, wallets, groups
+    (with members and pending join requests), catalog items and pending
+    purchase requests. Returns a dict with the created objects.
+    """
+    teacher = CustomUser.objects.create_user(f'teacher-{code.lower()}@example.com', PASSWORD, role='teacher')
+    class_obj = class_models.Class.objects.create(name=f'Class {code}', class_code=code, teacher=teacher)
+    roster = create_users(f'{code.lower()}-student', students)
+    class_obj.students.add(*roster)
+    class_models.Wallet.objects.bulk_create([
+        class_models.Wallet(owner=student, class_ref=class_obj, balance=Decimal(balance)) for student in roster
+    ])
+
+    # Each group gets group_size members and one pending join request, in roster order
+    assigned = iter(roster)
+    seats = [[student for student in (next(assigned, None) for _ in range(group_size)) if student] for _ in range(groups)]
+    waiting = [next(assigned, None) for _ in range(groups)]
+    group_objs = class_models.Group.objects.bulk_create([
+        class_models.Group(
+            name=f'Group {i + 1}', class_ref=class_obj, creator=teacher, max_students=group_size + 2,
+            student_count=len(seats[i]), pending_count=int(waiting[i] is not None),
+        )
+        for i in range(groups)
+    ])
+    class_models.GroupMembership.objects.bulk_create([
+        class_models.GroupMembership(group=group, student=student, class_ref=class_obj)
+        for group, members in zip(group_objs, seats) for student in members
+    ])
+    pending = class_models.Group.pending_approvals.through
+    pending.objects.bulk_create([
+        pending(group_id=group.id, customuser_id=student.id) for group, student in zip(group_objs, waiting) if student
+    ])
+
+    item_objs = class_models.Item.objects.bulk_create([
+        class_models.Item(name=f'Item {i + 1}', description='Seeded item', price=Decimal('5.00'), class_ref=class_obj)
+        for i in range(items)
+    ])
+    purchase_objs = class_models.PurchaseRequest.objects.bulk_create([
+        class_models.PurchaseRequest(
+            student=roster[i % len(roster)], item=item_objs[i % len(item_objs)], class_ref=class_obj, amount=Decimal('5.00'),
+        )
+        for i in range(purchases)
+    ]) if roster and item_objs else []
+
+    return {
+        'teacher': teacher,
+        'class': class_obj,
+        'students': roster,
+        'groups': group_objs,
+        'items': item_objs,
+        'purchases': purchase_objs,
+    }
+
+
+def _load_baseline():
+    try:
+        with open(BASELINE_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_baseline(baseline):
+    with open(BASELINE_PATH, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+class RouteBudgetTestCase(TestCase):
+    # (route name, HTTP method) -> maximum number of queries
+    budgets = {}
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def assertRouteBudget(self, name, method, url, user=None, data=None, status=200, repeat=1, format='json'):
+        """
+        Call `url` and assert its status code and query budget. With
+        PERKSWAY_PERF_TIMING=1, GET routes can be timed over several calls
+        (`repeat`); the fastest call is compared with the baseline recorded
+        for this route. Streamed responses are read in full within the
+        measurement. Budgets are measured with the user's class memberships
+        already cached, as they are in steady state.
+        """
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+            membership.memberships(user.id)
+        call = getattr(client, method)
+
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = call(url, data, format=format)
+            if response.streaming:
+                # Streamed bodies do their work while being read
+                response.streaming_content = [b''.join(response.streaming_content)]
+            elapsed = time.perf_counter() - started
+        # Every request resets the query log, so copy it before calling again
+        queries = list(context.captured_queries)
+        self.assertEqual(response.status_code, status, f"{name}: {getattr(response, 'data', response)}")
+        for _ in range(repeat - 1 if CHECK_TIMING else 0):
+            started = time.perf_counter()
+            call(url, data, format=format)
+            elapsed = min(elapsed, time.perf_counter() - started)
+
+        budget = self.budgets[name, method]
+        self.assertLessEqual(
+            len(queries), budget,
+            f"{name} ran {len(queries)} queries, budget is {budget}:\n" + '\n'.join(q['sql'] for q in queries),
+        )
+        if CHECK_TIMING:
+            self._check_timing(f'{connection.vendor}:{name}:{method}', elapsed)
+        return response
+
+    def _check_timing(self, key, elapsed):
+        baseline = _load_baseline()
+        recorded = baseline.get(key)
+        if recorded is None or UPDATE_BASELINE:
+            baseline[key] = round(elapsed, 6)
+            _save_baseline(baseline)
+            return
+        limit = recorded * THRESHOLD + SLACK
+        self.assertLessEqual(
+            elapsed, limit,
+            f"{key} took {elapsed * 1000:.1f}ms, baseline is {recorded * 1000:.1f}ms (limit {limit * 1000:.1f}ms)",
+        )
@@ -0,0 +1,87 @@
+"""
+Stateless JWT authentication.
+
+Tokens issued by `token_for_user` carry the claims the views need (email,
+role and token version), so `ClaimsJWTAuthentication` can build the request
+user from the token instead of loading the row on every request. The user it
+returns is a `CustomUser` with only those fields loaded; any other field is
+fetched from the database the first time it is read, or all at once with
+`load_full_user`.
+
+Role changes and deactivation bump `CustomUser.token_version`. The current
+version of each user is cached, so checking that a token has not been revoked
+costs a query only after a change or when the cache entry expires. Every
+worker must read the same cache for a revocation to reach it, see checks.py.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import TOKEN_VERSION_KEY, CustomUser
+
+CACHE_TIMEOUT = 60 * 15
+
+# Stands for "no such user or deactivated" in the version cache
+REVOKED = -1
+
+
+def token_for_user(user):
+    """Refresh token for `user`; its access token carries the same claims."""
+    refresh = RefreshToken.for_user(user)
+    refresh['email'] = user.email
+    refresh['role'] = user.role
+    refresh['ver'] = user.token_version
+    cache.set(TOKEN_VERSION_KEY.format(user.pk), user.token_version, CACHE_TIMEOUT)
+    return refresh
+
+
+def current_version(user_id):
+    """The user's token_version, or REVOKED if the user is gone or inactive."""
+    key = TOKEN_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = (
+            CustomUser.objects.filter(pk=user_id, is_active=True).values_list('token_version', flat=True).first()
+        )
+        if version is None:
+            version = REVOKED
+        cache.set(key, version, CACHE_TIMEOUT)
+    return version
+
+
+def load_full_user(user, fields=None):
+    """Load every field the token did not carry, or those of `fields`, in one query."""
+    deferred = user.get_deferred_fields()
+    if fields is not None:
+        deferred &= set(fields)
+    if deferred:
+        user.refresh_from_db(fields=deferred)
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if 'ver' not in validated_token:
+            # Issued before tokens carried claims
+            return super().get_user(validated_token)
+
+        try:
+            user_id = uuid.UUID(str(validated_token[api_settings.USER_ID_CLAIM]))
+        except (KeyError, ValueError):
+            raise AuthenticationFailed(_('Token contained no recognizable user identification'), code='token_not_valid')
+
+        version = validated_token['ver']
+        if current_version(user_id) != version:
+            raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+
+        return CustomUser.from_db(
+            router.db_for_read(CustomUser),
+            ['id', 'email', 'role', 'is_active', 'token_version'],
+            [user_id, validated_token['email'], validated_token['role'], True, version],
+        )
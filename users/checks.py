@@ -0,0 +1,24 @@
+"""
+Deployment checks.
+
+Token revocation (users/authentication.py) and class memberships
+(class/membership.py) are invalidated by deleting cache keys. With a cache
+that lives inside one process, the other workers keep the stale values until
+they expire, so `manage.py check --deploy` insists on a shared backend.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PER_PROCESS_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.CACHES['default']['BACKEND'] == PER_PROCESS_BACKEND:
+        return [Error(
+            'The default cache is local to each process, so revoked tokens and membership '
+            'changes are not seen by other workers.',
+            hint='Set PERKSWAY_REDIS_URL, or point CACHES at another shared backend.',
+            id='users.E001',
+        )]
+    return []
@@ -0,0 +1,57 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users import provisioning
+from users.models import ROLE_CHOICES
+
+
+class Command(BaseCommand):
+    help = (
+        "Create accounts from a CSV (email, username, first_name, last_name, password columns) "
+        "or NDJSON file. Rows without a password get an activation token instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or NDJSON (.ndjson/.jsonl) file with one account per row.")
+        parser.add_argument('--role', default='student', choices=[value for value, label in ROLE_CHOICES])
+        parser.add_argument('--workers', type=int, default=provisioning.WORKERS,
+                            help="Processes hashing passwords (default: one per core).")
+        parser.add_argument('--activations', help="Write email,uid,token of accounts without a password to this CSV file.")
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as f:
+                if options['path'].endswith(('.ndjson', '.jsonl')):
+                    entries = [json.loads(line) for line in f if line.strip()]
+                else:
+                    entries = list(csv.DictReader(f))
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read {options['path']}: {e}")
+        if any(not entry.get('email') for entry in entries):
+            raise CommandError("Every row needs an email.")
+
+        created, skipped = provisioning.provision(
+            entries, role=options['role'], workers=options['workers'], progress=self.report,
+        )
+        self.stdout.write(f"Created {len(created)} account(s), skipped {len(skipped)} existing.")
+
+        pending = [user for user in created if not user.has_usable_password()]
+        if pending:
+            if options['activations']:
+                with open(options['activations'], 'w', newline='') as out:
+                    self.write_activations(out, pending)
+            else:
+                self.write_activations(self.stdout, pending)
+
+    def write_activations(self, out, users):
+        writer = csv.writer(out, lineterminator='\n')
+        writer.writerow(['email', 'uid', 'token'])
+        for user in users:
+            writer.writerow([user.email, *provisioning.activation_token(user)])
+
+    def report(self, done, total):
+        if self.verbosity > 0:
+            self.stderr.write(f"{done}/{total}")
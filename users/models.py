@@ -1,5 +1,6 @@
 import uuid
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 
 
@@ -9,6 +10,12 @@ ROLE_CHOICES = [
     ('teacher', 'Teacher'),
 ]
 
+# Cached current token_version of a user, see users/authentication.py
+TOKEN_VERSION_KEY = 'token-version:{}'
+
+# Fields that tokens carry; changing one of them revokes the user's tokens
+TOKEN_FIELDS = ('role', 'is_active')
+
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -44,6 +51,8 @@ class CustomUser(AbstractBaseUser):
     is_staff = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Issued tokens carry this number; bumping it revokes all of them
+    token_version = models.PositiveIntegerField(default=0)
 
     objects = UserManager()
 
@@ -52,3 +61,28 @@ class CustomUser(AbstractBaseUser):
 
     def __str__(self):
         return self.email
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the user's tokens were issued against, see save()
+        instance._token_fields = {name: instance.__dict__[name] for name in TOKEN_FIELDS if name in instance.__dict__}
+        return instance
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, '_token_fields', {})
+        if any(self.__dict__.get(name, value) != value for name, value in loaded.items()):
+            self.token_version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'token_version'}
+        super().save(*args, **kwargs)
+        self._token_fields = {name: self.__dict__[name] for name in TOKEN_FIELDS if name in self.__dict__}
+        key = TOKEN_VERSION_KEY.format(self.pk)
+        cache.delete(key)
+        # A request may cache the old version before the save commits, so drop it again afterwards
+        transaction.on_commit(lambda: cache.delete(key))
+
+    def revoke_tokens(self):
+        """Invalidate every token issued to this user so far."""
+        self.token_version += 1
+        self.save(update_fields=['token_version'])
@@ -0,0 +1,104 @@
+"""
+Bulk account provisioning.
+
+Password hashing is deliberately slow (PBKDF2 by default), so creating
+thousands of accounts one request at a time is dominated by it. `provision`
+inserts the users in chunks with `bulk_create` and, when given more than one
+worker, hashes each chunk of passwords across a process pool, so the time
+taken shrinks with the number of cores. Only the provision_users command uses
+the pool; the API provisions small batches in the request's own process.
+Accounts can also be created without a password: they get an unusable one,
+which costs nothing to compute, and an activation token that lets the
+student choose a password later (see ActivateAccountView).
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.db import transaction
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .models import CustomUser
+
+CHUNK_SIZE = 1000
+
+# Below this many passwords, starting worker processes costs more than it saves
+POOL_THRESHOLD = 50
+
+WORKERS = getattr(settings, 'PROVISIONING_WORKERS', None) or os.cpu_count() or 1
+
+
+def _init_worker(settings_module):
+    # Workers started with "spawn" (macOS, Windows) begin without Django set up
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+def activation_token(user):
+    """(uid, token) for a user who has not chosen a password yet."""
+    return urlsafe_base64_encode(force_bytes(user.pk)), default_token_generator.make_token(user)
+
+
+def provision(entries, role='student', workers=1, progress=None):
+    """
+    Create accounts for `entries`, dicts with an email and optionally
+    username, first_name, last_name and password. Entries without a password
+    get an activation token instead. Emails that already have an account are
+    skipped; of entries repeating an email, the first is used.
+
+    Returns (created users, skipped emails). `progress(done, total)` is called
+    after every chunk.
+    """
+    unique = {}
+    for entry in entries:
+        unique.setdefault(CustomUser.objects.normalize_email(entry['email']), entry)
+    entries = list(unique.items())
+    created, skipped = [], []
+    pool = None
+    if workers > 1 and sum(1 for _, entry in entries if entry.get('password')) >= POOL_THRESHOLD:
+        pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(os.environ.get('DJANGO_SETTINGS_MODULE'),),
+        )
+    try:
+        for start in range(0, len(entries), CHUNK_SIZE):
+            chunk = entries[start:start + CHUNK_SIZE]
+            users, existing = _provision_chunk(chunk, role, pool, workers)
+            created.extend(users)
+            skipped.extend(existing)
+            if progress is not None:
+                progress(start + len(chunk), len(entries))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return created, skipped
+
+
+def _provision_chunk(chunk, role, pool, workers):
+    existing = set(CustomUser.objects.filter(email__in=[email for email, _ in chunk]).values_list('email', flat=True))
+    new = [(email, entry) for email, entry in chunk if email not in existing]
+
+    # make_password(None) is an unusable password, so it needs no pool
+    passwords = [entry.get('password') or None for _, entry in new]
+    if pool is not None:
+        hashes = list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+    else:
+        hashes = [make_password(password) for password in passwords]
+
+    users = [
+        CustomUser(
+            email=email,
+            username=entry.get('username'),
+            first_name=entry.get('first_name'),
+            last_name=entry.get('last_name'),
+            role=role,
+            password=password_hash,
+        )
+        for (email, entry), password_hash in zip(new, hashes)
+    ]
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(users)
+    return users, sorted(existing)
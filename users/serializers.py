@@ -1,8 +1,14 @@
 from rest_framework import serializers
+from perksway.sparse import SparseFieldsMixin
 from .models import CustomUser
 from django.contrib.auth import authenticate
+from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ValidationError
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
 
     class Meta:
@@ -39,4 +45,46 @@ class LoginSerializer(serializers.Serializer):
         else:
             raise serializers.ValidationError("Must include 'email' and 'password'")
         data['user'] = user
-        return data
\ No newline at end of file
+        return data
+
+class ProvisionEntrySerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    username = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    first_name = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    last_name = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    # Without one, the student gets an activation link to choose it
+    password = serializers.CharField(write_only=True, required=False)
+
+
+# The API hashes passwords in the request's own process, so it takes small
+# batches; larger imports go through the provision_users command
+MAX_PROVISION_USERS = 1000
+MAX_PROVISION_PASSWORDS = 50
+
+
+class BulkProvisionSerializer(serializers.Serializer):
+    users = ProvisionEntrySerializer(many=True, allow_empty=False, max_length=MAX_PROVISION_USERS)
+
+    def validate_users(self, users):
+        if sum(1 for entry in users if entry.get('password')) > MAX_PROVISION_PASSWORDS:
+            raise serializers.ValidationError(
+                f"At most {MAX_PROVISION_PASSWORDS} entries may set a password; leave it out to send activation links."
+            )
+        return users
+
+
+class ActivationSerializer(serializers.Serializer):
+    uid = serializers.CharField()
+    token = serializers.CharField()
+    password = serializers.CharField(write_only=True)
+
+    def validate(self, data):
+        try:
+            user = CustomUser.objects.get(pk=force_str(urlsafe_base64_decode(data['uid'])))
+        except (CustomUser.DoesNotExist, ValueError, ValidationError):
+            user = None
+        if user is None or user.has_usable_password() or not default_token_generator.check_token(user, data['token']):
+            raise serializers.ValidationError("Invalid or expired activation link")
+        validate_password(data['password'], user)
+        data['user'] = user
+        return data
@@ -1,3 +1,186 @@
-from django.test import TestCase
+import os
+import tempfile
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from perksway.testing import PASSWORD, RouteBudgetTestCase, create_users
+from . import checks, provisioning
+from .models import TOKEN_VERSION_KEY, CustomUser
+from .serializers import MAX_PROVISION_PASSWORDS, MAX_PROVISION_USERS
+
+
+class UserRouteBudgetTests(RouteBudgetTestCase):
+    """Every route in users/urls.py."""
+
+    budgets = {
+        ('register', 'post'): 2,
+        ('login', 'post'): 2,
+        ('user_details', 'get'): 0,
+        # 1,000 users, the most one request takes; SQLite's parameter limit splits the INSERT in 16
+        ('provision', 'post'): 18,
+        ('activate', 'post'): 2,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        create_users('student', 500)
+        cls.user = create_users('member', 1)[0]
+        cls.teacher = create_users('teacher', 1, role='teacher')[0]
+
+    def url(self, path):
+        return f'/api/v1/users/{path}'
+
+    def test_every_route_has_a_budget(self):
+        names = {pattern.name for pattern in get_resolver('users.urls').url_patterns}
+        self.assertEqual(names, {name for name, method in self.budgets})
+
+    def test_register(self):
+        self.assertRouteBudget('register', 'post', self.url('register/'), status=201, data={
+            'username': 'new', 'first_name': 'New', 'last_name': 'User',
+            'email': 'new@example.com', 'password': PASSWORD, 'role': 'student',
+        })
+
+    def test_login(self):
+        response = self.assertRouteBudget('login', 'post', self.url('login/'),
+                                          data={'email': self.user.email, 'password': PASSWORD})
+        self.assertIn('access', response.data)
+
+    def test_provision(self):
+        users = [{'email': f'pupil{i}@example.com'} for i in range(MAX_PROVISION_USERS)]
+        response = self.assertRouteBudget('provision', 'post', self.url('provision/'), user=self.teacher,
+                                          data={'users': users}, status=201)
+        self.assertEqual(response.data['created'], MAX_PROVISION_USERS)
+
+    def test_activate(self):
+        user = CustomUser.objects.create_user('pupil@example.com')
+        uid, token = provisioning.activation_token(user)
+        self.assertRouteBudget('activate', 'post', self.url('activate/'),
+                               data={'uid': uid, 'token': token, 'password': 'a fresh passphrase'})
+
+    def test_user_details(self):
+        response = self.assertRouteBudget('user_details', 'get', self.url('user/'), user=self.user, repeat=3)
+        self.assertEqual(response.data['email'], self.user.email)
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_users('member', 1)[0]
+
+    def login(self):
+        response = APIClient().post('/api/v1/users/login/', {'email': self.user.email, 'password': PASSWORD}, format='json')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return client
+
+    def test_user_is_built_from_claims(self):
+        client = self.login()
+        with CaptureQueriesContext(connection) as context:
+            request = client.get('/api/v1/classes/').wsgi_request
+        self.assertEqual(request.user.role, 'student')
+        self.assertIn('first_name', request.user.get_deferred_fields())
+        self.assertFalse([query['sql'] for query in context.captured_queries if 'FROM "users_customuser"' in query['sql']])
+
+    def test_full_row_is_loaded_on_demand(self):
+        response = self.login().get('/api/v1/users/user/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['first_name'], self.user.first_name)
+
+    def test_claims_answer_sparse_fields(self):
+        client = self.login()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/users/user/', {'fields': 'email,role'})
+        self.assertEqual(response.data, {'email': self.user.email, 'role': 'student'})
+        self.assertFalse([query['sql'] for query in context.captured_queries if 'FROM "users_customuser"' in query['sql']])
+
+    def test_role_change_revokes_tokens(self):
+        client = self.login()
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.role = 'teacher'
+        user.save()
+        self.assertEqual(client.get('/api/v1/users/user/').status_code, 401)
+        self.assertEqual(self.login().get('/api/v1/users/user/').data['role'], 'teacher')
+
+    def test_revoke_tokens(self):
+        client = self.login()
+        self.user.revoke_tokens()
+        self.assertEqual(client.get('/api/v1/users/user/').status_code, 401)
+
+    def test_version_cached_before_commit_is_dropped(self):
+        client = self.login()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.revoke_tokens()
+            # Another request reads the row before the save commits
+            cache.set(TOKEN_VERSION_KEY.format(self.user.pk), self.user.token_version - 1)
+        self.assertEqual(client.get('/api/v1/users/user/').status_code, 401)
+
+    def test_deploy_check_requires_a_shared_cache(self):
+        self.assertEqual([error.id for error in checks.check_shared_cache(None)], ['users.E001'])
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache'}}):
+            self.assertEqual(checks.check_shared_cache(None), [])
+
+    def test_tokens_without_claims_fall_back_to_the_database(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.assertEqual(client.get('/api/v1/users/user/').data['email'], self.user.email)
+
+
+class ProvisioningTests(TestCase):
+    def setUp(self):
+        self.teacher = create_users('teacher', 1, role='teacher')[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def test_passwords_are_hashed_across_processes(self):
+        entries = [{'email': f'pupil{i}@example.com', 'password': f'secret-{i}'} for i in range(provisioning.POOL_THRESHOLD)]
+        created, skipped = provisioning.provision(entries, workers=2)
+        self.assertEqual((len(created), skipped), (provisioning.POOL_THRESHOLD, []))
+        self.assertTrue(CustomUser.objects.get(email='pupil7@example.com').check_password('secret-7'))
+
+    def test_activation_links(self):
+        response = self.client.post('/api/v1/users/provision/', {'users': [
+            {'email': 'new@example.com', 'first_name': 'New'}, {'email': self.teacher.email, 'password': 'x'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['skipped']), (1, 1))
+        activation = response.data['activations'][0]
+
+        data = {'uid': activation['uid'], 'token': activation['token'], 'password': 'a fresh passphrase'}
+        self.assertEqual(APIClient().post('/api/v1/users/activate/', data, format='json').status_code, 200)
+        self.assertTrue(CustomUser.objects.get(email='new@example.com').check_password('a fresh passphrase'))
+        # The link works once
+        self.assertEqual(APIClient().post('/api/v1/users/activate/', data, format='json').status_code, 400)
+
+    def test_duplicates_across_chunks(self):
+        entries = [{'email': f'pupil{i % (provisioning.CHUNK_SIZE + 1)}@example.com'} for i in range(provisioning.CHUNK_SIZE + 2)]
+        created, skipped = provisioning.provision(entries)
+        self.assertEqual((len(created), skipped), (provisioning.CHUNK_SIZE + 1, []))
+
+    def test_request_size_is_bounded(self):
+        entries = [{'email': f'pupil{i}@example.com', 'password': 'x'} for i in range(MAX_PROVISION_PASSWORDS + 1)]
+        response = self.client.post('/api/v1/users/provision/', {'users': entries}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(CustomUser.objects.filter(email='pupil0@example.com').exists())
+
+    def test_only_teachers_provision(self):
+        self.client.force_authenticate(create_users('student', 1)[0])
+        response = self.client.post('/api/v1/users/provision/', {'users': [{'email': 'x@example.com'}]}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('email,first_name,password\nalpha@example.com,Alpha,pw1\nbeta@example.com,Beta,\n')
+        self.addCleanup(os.remove, f.name)
+        out = StringIO()
+        call_command('provision_users', f.name, stdout=out, stderr=StringIO())
+        self.assertIn('Created 2 account(s)', out.getvalue())
+        self.assertIn('beta@example.com,', out.getvalue())
+        self.assertTrue(CustomUser.objects.get(email='alpha@example.com').check_password('pw1'))
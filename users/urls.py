@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import LoginAPIView, RegisterUser, GetUserDetails
+from .views import ActivateAccountView, BulkProvisionView, LoginAPIView, RegisterUser, GetUserDetails
 
 urlpatterns = [
     path('register/', RegisterUser.as_view(), name='register'),
     path('login/', LoginAPIView.as_view(), name='login'),
-    path('user/', GetUserDetails.as_view(), name='user_details')
+    path('user/', GetUserDetails.as_view(), name='user_details'),
+    path('provision/', BulkProvisionView.as_view(), name='provision'),
+    path('activate/', ActivateAccountView.as_view(), name='activate'),
 ]
@@ -1,12 +1,18 @@
+from importlib import import_module
+
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import AllowAny
 from rest_framework.permissions import IsAuthenticated
 
+from perksway import sparse
+
+from . import provisioning
+from .authentication import load_full_user, token_for_user
+from .serializers import ActivationSerializer, BulkProvisionSerializer, LoginSerializer, UserSerializer
 
-from .serializers import LoginSerializer, UserSerializer
+IsTeacher = import_module('class.permissions').IsTeacher
 
 class RegisterUser(APIView):
     permission_classes = [AllowAny]
@@ -25,7 +31,7 @@ class LoginAPIView(APIView):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid(raise_exception=True):
             user = serializer.validated_data['user']
-            refresh = RefreshToken.for_user(user)
+            refresh = token_for_user(user)
 
             return Response({
                 'refresh': str(refresh),
@@ -36,6 +42,42 @@ class LoginAPIView(APIView):
 class GetUserDetails(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request):
-        user = request.user
-        serializer = UserSerializer(user)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        serializer = UserSerializer(request.user, **sparse.options(request))
+        # Often everything asked for came with the token
+        load_full_user(request.user, [field.source for field in serializer.fields.values() if not field.write_only])
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class BulkProvisionView(APIView):
+    permission_classes = [IsAuthenticated, IsTeacher]
+
+    def post(self, request):
+        """Create many student accounts at once; entries without a password get activation links."""
+        serializer = BulkProvisionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        created, skipped = provisioning.provision(serializer.validated_data['users'], role='student')
+        activations = []
+        for user in created:
+            if not user.has_usable_password():
+                uid, token = provisioning.activation_token(user)
+                activations.append({"email": user.email, "uid": uid, "token": token})
+        return Response({
+            "created": len(created),
+            # Only a count, so the response does not reveal who already has an account
+            "skipped": len(skipped),
+            "activations": activations,
+        }, status=status.HTTP_201_CREATED)
+
+
+class ActivateAccountView(APIView):
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        """Set the password of a provisioned account from its activation link."""
+        serializer = ActivationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        user.set_password(serializer.validated_data['password'])
+        user.save(update_fields=['password'])
+        return Response({"message": "Account activated."}, status=status.HTTP_200_OK)